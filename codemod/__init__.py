@@ -0,0 +1,4 @@
+"""
+Shared engine for the TypeScript fixer scripts (fix-types.py,
+fix-types-phase2.py, fix-all-types.py).
+"""
@@ -0,0 +1,122 @@
+"""
+In-process API over the rule registry.
+
+Fixer holds the stages built from the three scripts and applies them to
+content handed to it, never touching disk: the caller gets the rewritten
+content, the stages that changed it and the messages the rules printed
+while doing so, as diagnostics. Build one Fixer and reuse it; loading the
+scripts, the schema and the regexes is the expensive part.
+
+    from codemod.api import Fixer
+    result = Fixer().fix('app/blog/page.tsx', source)
+
+`python -m codemod.api PATH...` prints the fixed content of one file (or
+a JSON list for several), for hooks that want a single one-shot run.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Iterable, List, Mapping, NamedTuple, Optional, Union
+
+from codemod.rules import Stage, build_registry
+from codemod.schema import load_schema
+
+_ANSI = re.compile(r'\x1b\[[0-9;]*m')
+
+
+class Diagnostic(NamedTuple):
+    stage: str
+    severity: str  # 'info' for a fix a rule reported, 'error' for a failure
+    message: str
+
+
+class FixResult(NamedTuple):
+    path: str
+    content: str
+    changed: bool
+    stages: List[str]
+    diagnostics: List[Diagnostic]
+
+    def to_dict(self) -> dict:
+        return {
+            'path': self.path,
+            'content': self.content,
+            'changed': self.changed,
+            'stages': self.stages,
+            'diagnostics': [diagnostic._asdict() for diagnostic in self.diagnostics],
+        }
+
+
+class Fixer:
+    """The rule registry, ready to apply to in-memory files"""
+
+    def __init__(self, project_root: Optional[Path] = None,
+                 stages: Optional[List[Stage]] = None):
+        self.project_root = Path(project_root or Path.cwd()).resolve()
+        # The rules look tables up in the schema of the project they fix
+        self.stages = stages if stages is not None else \
+            build_registry(schema=load_schema(project_root))
+
+    def _relative(self, path: Union[str, Path]) -> Path:
+        path = Path(path)
+        if path.is_absolute():
+            return path.resolve().relative_to(self.project_root)
+        return path
+
+    def fix(self, path: Union[str, Path], content: str) -> FixResult:
+        """Apply every stage covering `path` (project-relative or absolute) to content"""
+        diagnostics: List[Diagnostic] = []
+        try:
+            relative = self._relative(path)
+        except ValueError:
+            diagnostics.append(Diagnostic('', 'error', f"{path} is outside {self.project_root}"))
+            return FixResult(str(path), content, False, [], diagnostics)
+
+        # Rules look tables up from the path, as they would for a file on disk
+        file_path = str(self.project_root / relative)
+        original = content
+        changed_by = []
+        for stage in self.stages:
+            if not stage.covers(relative.as_posix()):
+                continue
+            output = io.StringIO()
+            try:
+                with contextlib.redirect_stdout(output):
+                    content, modified, _ = stage.apply(content, file_path)
+            except Exception as e:
+                diagnostics.append(Diagnostic(stage.name, 'error', str(e)))
+                continue
+            if modified:
+                changed_by.append(stage.name)
+            for line in _ANSI.sub('', output.getvalue()).splitlines():
+                if line.strip():
+                    diagnostics.append(Diagnostic(stage.name, 'info', line.strip()))
+
+        return FixResult(str(path), content, content != original, changed_by, diagnostics)
+
+    def fix_batch(self, files: Iterable[Mapping[str, str]]) -> List[FixResult]:
+        """fix() every {path, content} mapping, in order"""
+        return [self.fix(item['path'], item['content']) for item in files]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print the fixed content of TypeScript files')
+    parser.add_argument('paths', nargs='+', type=Path)
+    args = parser.parse_args()
+
+    fixer = Fixer()
+    results = [fixer.fix(path, path.read_text(encoding='utf-8')) for path in args.paths]
+    if len(results) == 1:
+        sys.stdout.write(results[0].content)
+    else:
+        json.dump([result.to_dict() for result in results], sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,358 @@
+"""
+Audit of the static assets under public/ and assets/.
+
+Every asset is hashed (in a process pool) and every literal path to one in
+app/ and components/ is indexed: quoted strings, CSS url()s and template
+literals, whose ${...} parts match any name. From the two the audit
+reports
+
+  - exact duplicates: files with the same bytes, one kept per group;
+  - unreferenced files: nothing in the sources names them;
+  - missing files: a reference resolves to nothing, or only to a file
+    whose name differs in case (which breaks on case-sensitive hosts);
+  - oversized images: more pixels than --max-width allows, or more bytes
+    per pixel than --bytes-per-pixel (the size of a quality-80 JPEG);
+  - files whose content is not the format their extension says;
+
+and ranks files by the bytes each could save. Savings of oversized images
+are estimates; duplicates and unreferenced files save their whole size.
+
+With --dedupe, references to a duplicate are rewritten to the canonical
+copy of its group (the most referenced one, then the shortest path), in
+the same directory tree: a public URL never becomes an import or back.
+The copies are left in place for review and show up as unreferenced on
+the next run.
+
+    python -m codemod.assets --top 20
+    python -m codemod.assets --dedupe
+"""
+
+import argparse
+import fnmatch
+import json
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import unquote
+
+from codemod.cache import read_source
+from codemod.edits import EditBuffer
+from codemod.images import DERIVATIVES_DIR, IMAGE_DIRS, ImageInfo, load_images, stamp_file
+from codemod.output import write_source
+from codemod.parallel import map_files
+from codemod.walk import EXCLUDED_DIRS, walk_files
+
+SOURCE_DIRS = ('app', 'components')
+SOURCE_SUFFIXES = ('.ts', '.tsx', '.js', '.jsx', '.css')
+ASSET_EXTENSIONS = ('jpg', 'jpeg', 'png', 'gif', 'webp', 'avif', 'svg', 'ico', 'mp4', 'webm',
+                    'pdf', 'woff', 'woff2', 'ttf', 'otf')
+# Served at a well-known URL without being referenced
+CONVENTIONAL = ('favicon.ico', 'robots.txt', 'sitemap.xml', 'manifest.json', 'site.webmanifest',
+                'apple-touch-icon*.png', 'icon*.png', 'og-image*')
+
+DEFAULT_MAX_WIDTH = 1920
+DEFAULT_BYTES_PER_PIXEL = 0.25
+MIN_SAVING = 16 * 1024
+
+_EXTENSION = '|'.join(ASSET_EXTENSIONS)
+_REFERENCE = re.compile(
+    rf'''(?:(["'`])|url\(\s*(["']?))((?:@/assets/|/)[^"'`()<>\n]*?\.(?:{_EXTENSION}))'''
+    rf'''(?=[?#"'`)])''', re.IGNORECASE)
+_EXTENSION_FORMATS = {'jpg': 'jpeg', 'jpeg': 'jpeg', 'png': 'png', 'gif': 'gif', 'webp': 'webp',
+                      'svg': 'svg'}
+
+
+class Asset(NamedTuple):
+    path: str  # project-relative, POSIX
+    size: int
+    sha256: str
+    image: Optional[ImageInfo]
+
+
+class Reference(NamedTuple):
+    file: Path
+    start: int  # offset of the path in the source
+    line: int
+    literal: str  # the path as written
+    target: str  # project-relative path, a glob when dynamic
+    dynamic: bool
+
+
+class Saving(NamedTuple):
+    path: str
+    bytes: int
+    reason: str
+
+
+class AuditReport(NamedTuple):
+    assets: Dict[str, Asset]
+    references: List[Reference]
+    duplicates: List[List[str]]  # canonical copy first
+    unreferenced: List[str]
+    missing: List[Tuple[Reference, Optional[str]]]  # with a case-insensitive match, if any
+    oversized: List[Saving]
+    mislabeled: List[Tuple[str, str]]  # path, actual format
+
+    def savings(self) -> List[Saving]:
+        """The largest saving of every file, largest first"""
+        best: Dict[str, Saving] = {}
+        candidates = [Saving(path, self.assets[path].size, 'unreferenced')
+                      for path in self.unreferenced]
+        candidates += [Saving(path, self.assets[path].size, f'duplicate of {group[0]}')
+                       for group in self.duplicates for path in group[1:]]
+        candidates += self.oversized
+        for saving in candidates:
+            if saving.path not in best or saving.bytes > best[saving.path].bytes:
+                best[saving.path] = saving
+        return sorted(best.values(), key=lambda saving: (-saving.bytes, saving.path))
+
+    def to_dict(self) -> dict:
+        return {
+            'assets': len(self.assets),
+            'bytes': sum(asset.size for asset in self.assets.values()),
+            'duplicates': self.duplicates,
+            'unreferenced': self.unreferenced,
+            'missing': [{'file': str(reference.file), 'line': reference.line,
+                         'path': reference.literal, 'case_mismatch': match}
+                        for reference, match in self.missing],
+            'mislabeled': [{'path': path, 'format': actual} for path, actual in self.mislabeled],
+            'savings': [saving._asdict() for saving in self.savings()],
+        }
+
+
+def resolve_literal(literal: str) -> str:
+    """Project-relative path a source literal refers to"""
+    path = unquote(literal.split('?')[0].split('#')[0])
+    if path.startswith('@/'):
+        return path[2:]
+    return 'public' + path
+
+
+def url_for(path: str) -> str:
+    """How sources refer to a project-relative asset path"""
+    if path.startswith('public/'):
+        return path[len('public'):]
+    return '@/' + path
+
+
+def find_references(project_root: Path) -> List[Reference]:
+    """Every literal asset path in the source directories"""
+    references = []
+    for name in SOURCE_DIRS:
+        directory = project_root / name
+        if not directory.is_dir():
+            continue
+        for file_path in walk_files(directory, SOURCE_SUFFIXES, project_root=project_root):
+            try:
+                content, _ = read_source(file_path)
+            except (OSError, UnicodeDecodeError):
+                continue
+            for match in _REFERENCE.finditer(content):
+                literal = match.group(3)
+                dynamic = match.group(1) == '`' and '${' in literal
+                target = resolve_literal(literal)
+                if dynamic:
+                    target = re.sub(r'\$\{[^}]*\}', '*', target)
+                references.append(Reference(file_path, match.start(3),
+                                            content.count('\n', 0, match.start()) + 1,
+                                            literal, target, dynamic))
+    return references
+
+
+def match_references(references: List[Reference], paths: Iterable[str]
+                     ) -> Tuple[Dict[str, int], List[Tuple[Reference, Optional[str]]]]:
+    """References per asset path, and the references that match none
+
+    A reference matching a path only when case is ignored counts for it
+    (it is meant, if broken) and is reported with that path.
+    """
+    paths = list(paths)
+    counts: Dict[str, int] = defaultdict(int)
+    missing = []
+    existing = set(paths)
+    lowercase = {path.lower(): path for path in paths}
+    for reference in references:
+        if reference.dynamic:
+            matched = fnmatch.filter(paths, reference.target)
+            for path in matched:
+                counts[path] += 1
+            if matched:
+                continue
+        elif reference.target in existing:
+            counts[reference.target] += 1
+            continue
+        match = lowercase.get(reference.target.lower())
+        if match:
+            counts[match] += 1
+        missing.append((reference, match))
+    return counts, missing
+
+
+def _hash_assets(project_root: Path, jobs: int) -> Dict[str, Asset]:
+    files = []
+    derivatives = Path(DERIVATIVES_DIR).name
+    for name in IMAGE_DIRS:
+        directory = project_root / name
+        if directory.is_dir():
+            files.extend(path for path in walk_files(directory, ('',), project_root=project_root,
+                                                     excluded=EXCLUDED_DIRS | {derivatives})
+                         if not path.name.startswith('.'))
+    images = load_images(project_root, jobs)
+    assets = {}
+    for path, size, _, sha256 in map_files(stamp_file, files, jobs):
+        key = path.relative_to(project_root).as_posix()
+        assets[key] = Asset(key, size, sha256, images.get(key))
+    return dict(sorted(assets.items()))
+
+
+def _oversized(asset: Asset, max_width: int, bytes_per_pixel: float) -> Optional[Saving]:
+    image = asset.image
+    if image is None or image.format == 'svg' or not image.width or not image.height:
+        return None
+    width, height = image.width, image.height
+    reasons = []
+    if width > max_width:
+        height = round(height * max_width / width)
+        width = max_width
+        reasons.append(f"{image.width}px wide")
+    budget = round(width * height * bytes_per_pixel)
+    if asset.size / (image.width * image.height) > bytes_per_pixel:
+        reasons.append(f"{asset.size / (image.width * image.height):.2f} bytes/pixel")
+    saving = asset.size - budget
+    if not reasons or saving < MIN_SAVING:
+        return None
+    return Saving(asset.path, saving, f"oversized {image.format} ({', '.join(reasons)})")
+
+
+def audit(project_root: Path, jobs: int = 1, max_width: int = DEFAULT_MAX_WIDTH,
+          bytes_per_pixel: float = DEFAULT_BYTES_PER_PIXEL) -> AuditReport:
+    assets = _hash_assets(project_root, jobs)
+    references = find_references(project_root)
+
+    counts, missing = match_references(references, assets)
+
+    by_hash: Dict[str, List[str]] = defaultdict(list)
+    for asset in assets.values():
+        by_hash[asset.sha256].append(asset.path)
+    duplicates = [sorted(paths, key=lambda path: (-counts[path], len(path), path))
+                  for paths in by_hash.values() if len(paths) > 1]
+    duplicates.sort(key=lambda group: -assets[group[0]].size * (len(group) - 1))
+
+    unreferenced = [path for path in assets if not counts[path] and not (
+        path.startswith('public/') and any(fnmatch.fnmatch(path[len('public/'):], pattern)
+                                           for pattern in CONVENTIONAL))]
+
+    oversized = [saving for saving in (_oversized(asset, max_width, bytes_per_pixel)
+                                       for asset in assets.values()) if saving]
+    mislabeled = []
+    for asset in assets.values():
+        expected = _EXTENSION_FORMATS.get(asset.path.rsplit('.', 1)[-1].lower())
+        if asset.image and expected and asset.image.format != expected:
+            mislabeled.append((asset.path, asset.image.format))
+
+    return AuditReport(assets, references, duplicates, unreferenced, missing, oversized,
+                       mislabeled)
+
+
+def dedupe(project_root: Path, report: AuditReport) -> Dict[Path, int]:
+    """Point static references to duplicates at their group's canonical copy
+
+    Returns the number of references rewritten per source file.
+    """
+    canonical = {}
+    for group in report.duplicates:
+        for root in {path.split('/', 1)[0] for path in group}:
+            members = [path for path in group if path.split('/', 1)[0] == root]
+            for path in members[1:]:
+                canonical[path] = members[0]
+
+    by_file: Dict[Path, List[Reference]] = defaultdict(list)
+    for reference in report.references:
+        if not reference.dynamic and reference.target in canonical:
+            by_file[reference.file].append(reference)
+
+    rewritten = {}
+    for file_path, references in sorted(by_file.items()):
+        content, _ = read_source(file_path)
+        edits = EditBuffer(content)
+        for reference in references:
+            path_end = reference.start + len(reference.literal.split('?')[0].split('#')[0])
+            edits.replace(reference.start, path_end, url_for(canonical[reference.target]))
+        if write_source(file_path, edits.apply()):
+            rewritten[file_path] = len(references)
+    return rewritten
+
+
+def _kb(size: int) -> str:
+    return f"{size / 1024:,.0f} KB"
+
+
+def print_report(report: AuditReport, project_root: Path, top: int):
+    total = sum(asset.size for asset in report.assets.values())
+    print(f"{len(report.assets)} assets, {_kb(total)}; {len(report.references)} references "
+          f"in {len({reference.file for reference in report.references})} source files")
+
+    if report.duplicates:
+        print(f"\nExact duplicates ({len(report.duplicates)} groups):")
+        for group in report.duplicates:
+            print(f"  {group[0]} ({_kb(report.assets[group[0]].size)}): "
+                  f"{', '.join(group[1:])}")
+
+    if report.missing:
+        print(f"\nReferences to missing files ({len(report.missing)}):")
+        for reference, match in report.missing:
+            hint = f" (only {match} exists: case differs)" if match else ''
+            print(f"  {reference.file.relative_to(project_root)}:{reference.line}  "
+                  f"{reference.literal}{hint}")
+
+    if report.mislabeled:
+        print("\nExtension does not match the content:")
+        for path, actual in report.mislabeled:
+            print(f"  {path} is a {actual}")
+
+    if report.unreferenced:
+        print(f"\nUnreferenced ({len(report.unreferenced)}):")
+        for path in report.unreferenced:
+            print(f"  {path} ({_kb(report.assets[path].size)})")
+
+    savings = report.savings()
+    print(f"\nPotential savings: {_kb(sum(saving.bytes for saving in savings))} "
+          f"in {len(savings)} files")
+    for saving in savings[:top]:
+        print(f"  {_kb(saving.bytes):>9}  {saving.path}  {saving.reason}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find duplicate, unreferenced and oversized '
+                                                 'static assets')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='number of worker processes, 0 for one per CPU (default: 1)')
+    parser.add_argument('--top', type=int, default=20, help='savings to list (default: 20)')
+    parser.add_argument('--max-width', type=int, default=DEFAULT_MAX_WIDTH, metavar='PX',
+                        help=f'widest image worth serving (default: {DEFAULT_MAX_WIDTH})')
+    parser.add_argument('--bytes-per-pixel', type=float, default=DEFAULT_BYTES_PER_PIXEL,
+                        help=f'image weight above which an image counts as oversized '
+                             f'(default: {DEFAULT_BYTES_PER_PIXEL:g})')
+    parser.add_argument('--json', type=Path, metavar='PATH', help='write the report as JSON')
+    parser.add_argument('--dedupe', action='store_true',
+                        help='rewrite references to duplicates to point at one copy')
+    args = parser.parse_args()
+
+    project_root = Path.cwd()
+    report = audit(project_root, args.jobs, args.max_width, args.bytes_per_pixel)
+    print_report(report, project_root, args.top)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report.to_dict(), f, indent=2)
+
+    if args.dedupe:
+        rewritten = dedupe(project_root, report)
+        print(f"\nRewrote {sum(rewritten.values())} references in {len(rewritten)} files")
+        for file_path, count in rewritten.items():
+            print(f"  {file_path.relative_to(project_root)}: {count}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the codemod engine. Run from the project root, e.g.
+``python -m codemod.benchmarks.parallel``.
+"""
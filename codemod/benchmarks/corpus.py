@@ -0,0 +1,212 @@
+"""
+Synthetic corpus generator for the benchmarks.
+
+Writes N files shaped like this project's sources: detail and listing pages
+under app/<section>/ and admin screens under components/admin/. Each file
+mixes the constructs the rules look for at roughly the densities found in
+the real tree (untyped and `any` useState calls, supabase
+`.from(...).select(...)` chains, useParams() destructuring, dates rendered
+from created_at, <img> tags, custom type/interface blocks, map callbacks)
+with the JSX, comments and copy that make up most of every file. The same
+seed always produces the same corpus.
+
+    python -m codemod.benchmarks.corpus --files 2000 --out /tmp/corpus
+"""
+
+import argparse
+import random
+import shutil
+from pathlib import Path
+from typing import List
+
+from codemod.scripts import PROJECT_ROOT
+from codemod.schema import TYPES_PATH, load_schema
+
+SECTIONS = ['blog', 'destinations', 'experiences', 'journeys', 'our-resort/packages',
+            'our-resort/activities', 'our-resort/menu-meals', 'about', 'contact']
+
+FIELDS = ['id: string;', 'title: string;', 'name: string;', 'description: string | null;',
+          'image_url: string | null;', 'featured: boolean | null;', 'price: number;',
+          'created_at: string;', 'highlights: string[];', 'slug: string;']
+
+LOREM = ('Nestled among the Himalayan foothills, the resort offers quiet mornings, '
+         'guided walks through rhododendron forests and evenings by the fire. '
+         'Every journey is planned with local guides who know the valleys by heart.')
+
+
+def _pascal(table: str) -> str:
+    return ''.join(part.capitalize() for part in table.split('_'))
+
+
+def _singular(word: str) -> str:
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    return word[:-1] if word.endswith('s') else word
+
+
+def _state_lines(rng: random.Random, table: str, count: int) -> List[str]:
+    plural = ''.join(part.capitalize() for part in table.split('_'))
+    single = _singular(plural)
+    choices = [
+        f'const [{plural[0].lower() + plural[1:]}, set{plural}] = useState([]);',
+        f'const [{single[0].lower() + single[1:]}, set{single}] = useState(null);',
+        f'const [{single[0].lower() + single[1:]}, set{single}] = useState<any>(null);',
+        f'const [{plural[0].lower() + plural[1:]}, set{plural}] = useState<any[]>([]);',
+        f'const [{plural[0].lower() + plural[1:]}, set{plural}] = React.useState([]);',
+        'const [categories, setCategories] = useState([]);',
+        'const [loading, setLoading] = useState(true);',
+        'const [search, setSearch] = useState("");',
+        'const [open, setOpen] = React.useState(false);',
+        'const [selected, setSelected] = useState<string | null>(null);',
+    ]
+    return rng.sample(choices, count)
+
+
+def _type_block(rng: random.Random, type_name: str) -> str:
+    fields = rng.sample(FIELDS, rng.randint(4, len(FIELDS)))
+    body = '\n'.join(f'  {field}' for field in fields)
+    if rng.random() < 0.5:
+        return f'type {type_name} = {{\n{body}\n}};\n\n'
+    return f'interface {type_name} {{\n{body}\n}}\n\n'
+
+
+def _fetch_block(rng: random.Random, table: str, setter: str, single: bool) -> str:
+    query = f'.from("{table}")\n        .select("*")'
+    if single:
+        query += '\n        .eq("id", id)\n        .' + rng.choice(['single()', 'maybeSingle()'])
+    else:
+        query += '\n        .order("created_at", { ascending: false })'
+    return (
+        f'  const fetch{setter} = async () => {{\n'
+        f'    try {{\n'
+        f'      // Loads {table}; the old version used useState(null) here\n'
+        f'      const {{ data, error }} = await supabase\n'
+        f'        {query};\n'
+        f'      if (error) throw error;\n'
+        f'      set{setter}(data);\n'
+        f'    }} catch (error) {{\n'
+        f'      console.error("Error fetching {table}:", error);\n'
+        f'    }}\n'
+        f'  }};\n'
+    )
+
+
+def _jsx_section(rng: random.Random, item: str, uses_asset: bool) -> str:
+    parts = ['      <section className="py-12">']
+    if rng.random() < 0.6:
+        parts.append(f'        {{{item}s.map(({item}, index) => (')
+        parts.append('          <Card key={index} className="p-4">')
+        parts.append(f'            <h3 className="text-xl font-semibold">{{{item}.title}}</h3>')
+        if rng.random() < 0.5:
+            parts.append(f'            <p>{{new Date({item}.created_at).toLocaleDateString()}}</p>')
+        if rng.random() < 0.4:
+            parts.append(f'            <img src={{{item}.image_url}} alt="" className="rounded" />')
+        parts.append('          </Card>')
+        parts.append('        ))}')
+    if uses_asset and rng.random() < 0.5:
+        parts.append('        <img src={heroImage} alt="Himalayan sunrise" className="w-full h-96" />')
+    if rng.random() < 0.4:
+        parts.append('        {highlights.map((highlight, i) => (')
+        parts.append('          <Badge key={i}>{highlight}</Badge>')
+        parts.append('        ))}')
+    for _ in range(rng.randint(2, 6)):
+        parts.append(f'        <p className="text-muted-foreground">{LOREM}</p>')
+    parts.append('      </section>')
+    return '\n'.join(parts) + '\n'
+
+
+def render_file(rng: random.Random, table: str, detail: bool, component: str) -> str:
+    """One synthetic source file about `table`"""
+    item = _singular(table.split('_')[-1])
+    plural = ''.join(part.capitalize() for part in table.split('_'))
+    uses_asset = rng.random() < 0.3
+
+    imports = [
+        '"use client";',
+        '',
+        'import React, { useEffect, useState } from "react";',
+        'import { Card } from "@/components/ui/card";',
+        'import { Badge } from "@/components/ui/badge";',
+        'import { supabase } from "@/integrations/supabase/client";',
+    ]
+    if detail:
+        imports.append('import { useParams } from "next/navigation";')
+    if uses_asset:
+        imports.append('import heroImage from "@/assets/hero.jpg";')
+
+    body = ['\n'.join(imports) + '\n\n']
+    if rng.random() < 0.5:
+        body.append(_type_block(rng, _singular(_pascal(table))))
+    if rng.random() < 0.2:
+        body.append(_type_block(rng, 'Props'))
+
+    body.append(f'const {component} = () => {{\n')
+    if detail:
+        body.append(rng.choice([
+            '  const { id } = useParams();\n',
+            '  const { id } = useParams<{ id: string }>();\n',
+        ]))
+    body.extend(f'  {line}\n' for line in _state_lines(rng, table, rng.randint(2, 6)))
+    body.append(f'\n  useEffect(() => {{\n    fetch{plural}();\n  }}, []);\n\n')
+    body.append(_fetch_block(rng, table, plural, detail))
+    if rng.random() < 0.3:
+        body.append('  const updated = {\n    featured: row.featured,\n    approved: row.approved,\n  };\n')
+
+    body.append('\n  return (\n    <div className="min-h-screen">\n')
+    for _ in range(rng.randint(2, 8)):
+        body.append(_jsx_section(rng, item, uses_asset))
+    body.append('    </div>\n  );\n};\n\n')
+    body.append(f'export default {component};\n')
+    return ''.join(body)
+
+
+def generate_corpus(target: Path, files: int, seed: int = 0) -> List[Path]:
+    """Write `files` synthetic sources under target and return their paths
+
+    Roughly 60% are pages under app/, the rest admin components. The
+    project's types.ts is copied alongside so the rules see the real schema.
+    """
+    rng = random.Random(seed)
+    tables = sorted(load_schema().tables) or ['packages']
+    written = []
+
+    for index in range(files):
+        table = rng.choice(tables)
+        if rng.random() < 0.6:
+            section = rng.choice(SECTIONS)
+            detail = rng.random() < 0.5
+            directory = target / 'app' / section / f'group{index}'
+            if detail:
+                directory = directory / '[id]'
+            path = directory / 'page.tsx'
+            component = 'Page'
+        else:
+            detail = rng.random() < 0.2
+            component = f'{_pascal(table)}{index}Admin'
+            path = target / 'components' / 'admin' / f'{component}.tsx'
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(render_file(rng, table, detail, component), encoding='utf-8')
+        written.append(path)
+
+    if (PROJECT_ROOT / TYPES_PATH).exists():
+        (target / TYPES_PATH).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(PROJECT_ROOT / TYPES_PATH, target / TYPES_PATH)
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic TSX corpus')
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=Path, required=True)
+    args = parser.parse_args()
+
+    written = generate_corpus(args.out, args.files, args.seed)
+    total_bytes = sum(path.stat().st_size for path in written)
+    print(f"Wrote {len(written)} files ({total_bytes / 1024:.0f} KiB) under {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Cold versus warm builds of the responsive image derivatives.
+
+Copies the project's sources and images to a scratch directory and runs
+codemod.derivatives.build() three times:
+
+- cold: empty cache, every derivative is encoded;
+- warm: cache kept but public/_img/ deleted, as on a fresh checkout or CI
+  runner that restores only the cache; nothing is encoded;
+- no-op: cache and output both in place.
+
+Only images a plain <img> uses by literal path get derivatives, and the
+pages mostly render next/image, so the copy gets one more page with an
+<img> for every raster image under public/. The image index cache is
+dropped before each run, so every run also hashes and probes the sources.
+
+    python -m codemod.benchmarks.derivatives --jobs 0 --formats webp
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from codemod import derivatives, images
+from codemod.cache import CACHE_DIR
+from codemod.assets import url_for
+from codemod.derivatives import (DEFAULT_FORMATS, DEFAULT_QUALITY, DEFAULT_WIDTHS,
+                                 SOURCE_FORMATS, build)
+from codemod.scripts import PROJECT_ROOT
+
+COPIED = ('app', 'components', 'assets', 'public')
+GALLERY = 'app/derivatives-benchmark/page.tsx'
+
+
+def write_gallery(workdir: Path):
+    """A page that shows every raster image in public/ with a plain <img>"""
+    index = images.load_images(workdir)
+    tags = [f'      <img src="{url_for(path)}" alt="" />'
+            for path, info in sorted(index.images.items())
+            if path.startswith('public/') and info is not None and info.format in SOURCE_FORMATS]
+    page = workdir / GALLERY
+    page.parent.mkdir(parents=True, exist_ok=True)
+    page.write_text('export default function Gallery() {\n  return (\n    <div>\n'
+                    + '\n'.join(tags) + '\n    </div>\n  )\n}\n')
+
+
+def run(workdir: Path, args: argparse.Namespace, encoders) -> derivatives.Build:
+    images._indexes.clear()
+    (workdir / CACHE_DIR / 'images.json').unlink(missing_ok=True)
+    return build(workdir, args.widths, args.formats, args.quality, encoders, args.jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold vs warm derivative builds')
+    parser.add_argument('--jobs', '-j', type=int, default=0)
+    parser.add_argument('--formats', type=lambda value: value.split(','),
+                        default=list(DEFAULT_FORMATS))
+    parser.add_argument('--widths', type=lambda value: [int(part) for part in value.split(',')],
+                        default=list(DEFAULT_WIDTHS))
+    parser.add_argument('--quality', type=int, default=DEFAULT_QUALITY)
+    args = parser.parse_args()
+
+    encoders = derivatives.find_encoders()
+    if not any(set(args.formats) & set(encoder.formats) for encoder in encoders):
+        sys.exit(f"No encoder for {', '.join(args.formats)} found "
+                 f"(install libvips, ImageMagick or cwebp)")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp) / 'project'
+        for name in COPIED:
+            if (PROJECT_ROOT / name).is_dir():
+                shutil.copytree(PROJECT_ROOT / name, workdir / name)
+        write_gallery(workdir)
+
+        results['cold'] = run(workdir, args, encoders)
+        shutil.rmtree(workdir / derivatives.DERIVATIVES_DIR)
+        results['warm'] = run(workdir, args, encoders)
+        results['no-op'] = run(workdir, args, encoders)
+
+    print(f"{', '.join(encoder.name for encoder in encoders)}; formats {','.join(args.formats)}, "
+          f"widths {','.join(map(str, args.widths))}\n")
+    print(f"{'build':<8} {'images':>7} {'encoded':>8} {'cached':>7} {'seconds':>8}")
+    for name, result in results.items():
+        print(f"{name:<8} {len(result.manifest['images']):>7} {result.encoded:>8} "
+              f"{result.reused:>7} {result.seconds:>8.2f}")
+    warm = results['warm'].seconds
+    if warm > 0:
+        print(f"\nWarm build is {results['cold'].seconds / warm:.0f}x faster than cold")
+
+
+if __name__ == '__main__':
+    main()
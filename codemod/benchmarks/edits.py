@@ -0,0 +1,84 @@
+"""
+Cost of the useState fixes as the number of matches in one file grows.
+
+Compares the edit-buffer implementation in fix-all-types.py with the old
+per-match content.replace() loop, on generated files with hundreds to
+thousands of useState([]) / useState(null) declarations. With the buffer
+the time per declaration stays flat; with replace() it grows with the file.
+
+    python -m codemod.benchmarks.edits --sizes 200 400 800 1600 3200
+"""
+
+import argparse
+import contextlib
+import os
+import re
+import time
+
+from codemod.scripts import load_script
+
+
+def generate_file(declarations: int) -> str:
+    """A component with `declarations` untyped useState calls"""
+    lines = ['import React, { useState } from "react";', '', 'export default function Page() {']
+    for index in range(declarations):
+        initial = '[]' if index % 2 else 'null'
+        lines.append(f'  const [item{index}, setItem{index}] = useState({initial});')
+        lines.append(f'  // filler comment to keep declarations apart {index:>6}')
+    lines.append('  return null;')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def replace_loop(content: str) -> str:
+    """The old approach: rescan-and-replace the whole string for every match"""
+    for pattern, old, new in [
+        (r'const\s+\[(\w+),\s*set\w+\]\s*=\s*useState\(\[\]\)',
+         'useState([])', 'useState<Tables<"packages">[]>([])'),
+        (r'const\s+\[(\w+),\s*set\w+\]\s*=\s*useState\(null\)',
+         'useState(null)', 'useState<Tables<"packages"> | null>(null)'),
+    ]:
+        for match in re.finditer(pattern, content):
+            if 'useState<' in content[max(0, match.start()-50):match.start()]:
+                continue
+            old_match = match.group(0)
+            content = content.replace(old_match, old_match.replace(old, new), 1)
+    return content
+
+
+def edit_buffer(content: str) -> str:
+    fix_all = load_script('fix_all_types')
+    content, _ = fix_all.fix_use_state_empty_array(content, 'page.tsx')
+    content, _ = fix_all.fix_use_state_null(content, 'page.tsx')
+    return content
+
+
+def best_of(func, content: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Edit buffer versus replace() loop')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200, 400, 800, 1600, 3200])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    load_script('fix_all_types')
+    print(f"{'decls':>7} {'replace ms':>11} {'us/decl':>8} {'buffer ms':>10} {'us/decl':>8}")
+    with open(os.devnull, 'w') as devnull:
+        for size in args.sizes:
+            content = generate_file(size)
+            with contextlib.redirect_stdout(devnull):
+                legacy = best_of(replace_loop, content, args.repeat)
+                buffered = best_of(edit_buffer, content, args.repeat)
+            print(f"{size:>7} {legacy * 1000:>11.1f} {legacy / size * 1e6:>8.1f} "
+                  f"{buffered * 1000:>10.1f} {buffered / size * 1e6:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Cost of the shared lexer on top of the rules.
+
+Runs every rule of the pipeline over app/ and components/ (in memory, no
+writes) twice: once as shipped, where rules consult the lexer to skip
+comments, strings and JSX text, and once with the lexer replaced by one
+that reports everything as code, i.e. the old regex-only behaviour. Also
+reports the time spent lexing alone.
+
+    python -m codemod.benchmarks.lexer --repeat 5
+"""
+
+import argparse
+import contextlib
+import os
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from codemod import lexer
+from codemod.pipeline import apply_stages, find_files
+from codemod.rules import build_registry
+from codemod.scripts import PROJECT_ROOT
+
+
+def load_corpus() -> Tuple[list, List[Tuple[Path, str]]]:
+    stages = build_registry()
+    files = find_files(PROJECT_ROOT, stages)
+    return stages, [(f, f.read_text(encoding='utf-8')) for f in files]
+
+
+def run_rules(stages, corpus) -> float:
+    start = time.perf_counter()
+    for file_path, content in corpus:
+        apply_stages(content, file_path, PROJECT_ROOT, stages)
+    return time.perf_counter() - start
+
+
+def best_of(func, repeat: int) -> float:
+    return min(func() for _ in range(repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lexer plus rules versus regex-only rules')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    stages, corpus = load_corpus()
+    total_bytes = sum(len(content) for _, content in corpus)
+
+    def lex_only() -> float:
+        lexer.lex.cache_clear()
+        start = time.perf_counter()
+        for _, content in corpus:
+            lexer.lex(content)
+        return time.perf_counter() - start
+
+    def with_lexer() -> float:
+        lexer.lex.cache_clear()
+        return run_rules(stages, corpus)
+
+    shipped_lex = lexer.lex
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        lexing = best_of(lex_only, args.repeat)
+        lexed = best_of(with_lexer, args.repeat)
+        lexer.lex = lambda content: lexer.SourceMap(content, [])
+        try:
+            regex_only = best_of(lambda: run_rules(stages, corpus), args.repeat)
+        finally:
+            lexer.lex = shipped_lex
+
+    print(f"Corpus: {len(corpus)} files, {total_bytes / 1024:.0f} KiB")
+    print(f"lexing alone:     {lexing * 1000:8.1f} ms "
+          f"({total_bytes / lexing / 1e6:.1f} MB/s)")
+    print(f"regex-only rules: {regex_only * 1000:8.1f} ms")
+    print(f"lexer + rules:    {lexed * 1000:8.1f} ms "
+          f"({(lexed / regex_only - 1) * 100:+.0f}%)")
+
+
+if __name__ == '__main__':
+    main()
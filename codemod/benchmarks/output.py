@@ -0,0 +1,167 @@
+"""
+Effect of write avoidance on the incremental build that follows a run.
+
+Generates a synthetic corpus and fixes it until a further run has
+nothing left to change. That further run is then done twice on fresh
+copies, once writing every file it processed in place with
+open(path, 'w') and once through codemod.output.write_source(), and
+each is followed by an incremental build of the workspace.
+
+The build is `tsc --incremental --noEmit` when a TypeScript compiler is
+found (on PATH or in node_modules/.bin). Otherwise it is an mtime-driven
+rebuild like the ones bundlers and watchers do: every file whose mtime
+moved since the previous build is read, lexed and indexed again.
+
+    python -m codemod.benchmarks.output --files 500
+"""
+
+import argparse
+import contextlib
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from codemod.benchmarks.corpus import generate_corpus
+from codemod.declarations import scan_declarations
+from codemod.lexer import lex
+from codemod.output import write_source
+from codemod.pipeline import apply_stages, find_files
+from codemod.rules import Stage, build_registry
+from codemod.scripts import PROJECT_ROOT
+
+TSCONFIG = """{
+  "compilerOptions": {
+    "target": "ES2017", "lib": ["dom", "esnext"], "jsx": "preserve",
+    "module": "esnext", "moduleResolution": "bundler", "skipLibCheck": true,
+    "noEmit": true, "incremental": true, "paths": {"@/*": ["./*"]}
+  },
+  "include": ["app", "components", "lib"]
+}
+"""
+
+
+def find_tsc() -> Optional[str]:
+    for candidate in (PROJECT_ROOT / 'node_modules' / '.bin' / 'tsc', shutil.which('tsc')):
+        if candidate and Path(candidate).exists():
+            return str(candidate)
+    return None
+
+
+class MtimeBuild:
+    """Rebuild every file whose mtime changed since the last build"""
+
+    def __init__(self, files: List[Path]):
+        self.files = files
+        self.mtimes: Dict[Path, int] = {}
+
+    def build(self):
+        for path in self.files:
+            mtime = path.stat().st_mtime_ns
+            if self.mtimes.get(path) == mtime:
+                continue
+            self.mtimes[path] = mtime
+            content = path.read_text(encoding='utf-8')
+            lex.cache_clear()
+            scan_declarations.__wrapped__(content)
+
+
+class TscBuild:
+    """`tsc --incremental` over the workspace"""
+
+    def __init__(self, workdir: Path, tsc: str):
+        self.workdir = workdir
+        self.tsc = tsc
+        (workdir / 'tsconfig.json').write_text(TSCONFIG, encoding='utf-8')
+
+    def build(self):
+        # The corpus does not type-check without the project's dependencies;
+        # only the time of the incremental build matters here
+        subprocess.run([self.tsc, '-p', 'tsconfig.json'], cwd=self.workdir,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def truncate_in_place(file_path: Path, content: str) -> bool:
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
+
+
+def fix_tree(workdir: Path, stages: List[Stage], write: Callable[[Path, str], bool]) -> int:
+    """Run every stage over the tree and hand each result to write()"""
+    written = 0
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for file_path in find_files(workdir, stages):
+            content = file_path.read_text(encoding='utf-8')
+            content, _, _ = apply_stages(content, file_path, workdir, stages)
+            if write(file_path, content):
+                written += 1
+    return written
+
+
+def measure(corpus: Path, workdir: Path, stages: List[Stage], tsc: Optional[str],
+            write: Callable[[Path, str], bool]) -> dict:
+    """Files written and touched, and the seconds of the run and of the build after it"""
+    if workdir.exists():
+        shutil.rmtree(workdir)
+    shutil.copytree(corpus, workdir)
+    files = find_files(workdir, stages)
+    builder = TscBuild(workdir, tsc) if tsc else MtimeBuild(files)
+    builder.build()
+    before = {path: path.stat().st_mtime_ns for path in files}
+
+    start = time.perf_counter()
+    written = fix_tree(workdir, stages, write)
+    run_seconds = time.perf_counter() - start
+
+    touched = sum(1 for path in files if path.stat().st_mtime_ns != before[path])
+    start = time.perf_counter()
+    builder.build()
+    build_seconds = time.perf_counter() - start
+    return {'written': written, 'touched': touched, 'run': run_seconds, 'build': build_seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental build after in-place vs '
+                                                 'write-avoiding output')
+    parser.add_argument('--files', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    stages = build_registry()
+    tsc = find_tsc()
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(tmp) / 'corpus'
+        generate_corpus(corpus, args.files, args.seed)
+        # Fix the corpus until the measured runs have nothing left to change
+        # (the synthetic files redeclare state, which takes a few passes)
+        first = fix_tree(corpus, stages, write_source)
+        for _ in range(5):
+            if not fix_tree(corpus, stages, write_source):
+                break
+        # Give the fixed files an mtime the builds cannot confuse with the runs'
+        for path in find_files(corpus, stages):
+            os.utime(path, ns=(0, 1_000_000_000))
+
+        results = {
+            'in place': measure(corpus, Path(tmp) / 'in-place', stages, tsc, truncate_in_place),
+            'write_source': measure(corpus, Path(tmp) / 'write-source', stages, tsc, write_source),
+        }
+
+    builder = f"tsc --incremental ({tsc})" if tsc else 'mtime-driven rebuild (no tsc found)'
+    print(f"{args.files} files, {first} changed by the first run; a run with nothing to change, then {builder}")
+    print(f"\n{'writer':<14} {'written':>8} {'touched':>8} {'run s':>8} {'build s':>8}")
+    for name, result in results.items():
+        print(f"{name:<14} {result['written']:>8} {result['touched']:>8} "
+              f"{result['run']:>8.3f} {result['build']:>8.3f}")
+    in_place, avoided = results['in place']['build'], results['write_source']['build']
+    if avoided > 0:
+        print(f"\nIncremental build after the run is {in_place / avoided:.1f}x faster "
+              f"with write_source")
+
+
+if __name__ == '__main__':
+    main()
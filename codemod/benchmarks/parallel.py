@@ -0,0 +1,68 @@
+"""
+Throughput of the pipeline as the number of worker processes grows.
+
+The app/ and components/ trees are copied several times into a scratch
+directory so there is enough work to spread; every measurement starts from
+a fresh copy because the fixers rewrite files in place.
+
+    python -m codemod.benchmarks.parallel --copies 20 --jobs 1 2 4 8
+"""
+
+import argparse
+import contextlib
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from codemod.pipeline import run
+from codemod.rules import build_registry
+from codemod.scripts import PROJECT_ROOT
+
+
+def build_corpus(target: Path, copies: int):
+    """Replicate app/ and components/ `copies` times under target"""
+    for dir_name in ['app', 'components']:
+        source = PROJECT_ROOT / dir_name
+        for index in range(copies):
+            shutil.copytree(source, target / dir_name / f'copy{index}')
+
+
+def time_run(corpus: Path, workdir: Path, jobs: int) -> tuple:
+    """Run the pipeline on a fresh copy of the corpus and return (files, seconds)"""
+    if workdir.exists():
+        shutil.rmtree(workdir)
+    shutil.copytree(corpus, workdir)
+
+    stages = build_registry()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        total, _, _ = run(workdir, stages, jobs)
+        elapsed = time.perf_counter() - start
+    return total, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pipeline throughput by worker count')
+    parser.add_argument('--copies', type=int, default=20,
+                        help='how many times to replicate app/ and components/')
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='worker counts to measure')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(tmp) / 'corpus'
+        build_corpus(corpus, args.copies)
+
+        print(f"{'jobs':>6} {'files':>8} {'seconds':>9} {'files/s':>9} {'speed-up':>9}")
+        baseline = None
+        for jobs in args.jobs:
+            total, elapsed = time_run(corpus, Path(tmp) / 'work', jobs)
+            baseline = baseline or elapsed
+            print(f"{jobs:>6} {total:>8} {elapsed:>9.3f} {total / elapsed:>9.0f} "
+                  f"{baseline / elapsed:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
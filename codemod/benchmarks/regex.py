@@ -0,0 +1,165 @@
+"""
+Worst-case time of every rule on adversarial inputs.
+
+Each rule of the registry is run directly (no gate, no anchor check, no
+rule budget) on inputs built to hurt backtracking regexes: a minified
+file on one line, unterminated object types, floods of the rule's own
+anchors with no closing token, long whitespace runs, deep nesting, the
+`\\1` date pattern cut short, and random mutations of synthetic sources.
+Every input is generated at doubling sizes, so besides the worst time the
+harness reports how it grows: an exponent near 1 is linear, near 2
+quadratic. A run that exceeds --cap is interrupted by the watchdog and
+counted as --cap.
+
+Exits non-zero when any rule's worst time at the largest size exceeds
+--budget, i.e. when the rule budget would skip it in production.
+
+    python -m codemod.benchmarks.regex --size 4096 --steps 4
+"""
+
+import argparse
+import contextlib
+import math
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from codemod import watchdog
+from codemod.benchmarks.corpus import render_file
+from codemod.instrument import DEFAULT_RULE_BUDGET
+from codemod.rules import Rule, build_registry
+from codemod.schema import load_schema
+
+FILE_PATH = 'app/blog/[id]/page.tsx'
+
+
+def _repeat(unit: str, size: int) -> str:
+    return (unit * (size // max(len(unit), 1) + 1))[:size]
+
+
+def _source(rng: random.Random) -> str:
+    tables = sorted(load_schema().tables) or ['packages']
+    return render_file(rng, rng.choice(tables), rng.random() < 0.5, 'Page')
+
+
+def _mutate(rng: random.Random, source: str, size: int) -> str:
+    """Duplicate slices and drop closing brackets until size is reached"""
+    text = source
+    while len(text) < size:
+        start = rng.randrange(len(source))
+        text += source[start:start + rng.randint(20, 400)]
+    chars = list(text[:size])
+    for _ in range(size // 50):
+        i = rng.randrange(len(chars))
+        if chars[i] in ')}]>"\'':
+            chars[i] = ' '
+    return ''.join(chars)
+
+
+def generators(rule: Rule, seed: int) -> Dict[str, Callable[[int], str]]:
+    """Adversarial input generators for rule, by name, each taking a size"""
+    anchors = rule.anchors or ('useState(',)
+    flood = ''.join(f"{anchor}a, b " for anchor in anchors)
+
+    def minified(size: int) -> str:
+        rng = random.Random(seed)
+        text = ''
+        while len(text) < size:
+            text += ' '.join(_source(rng).split())
+        return text[:size]
+
+    return {
+        'minified': minified,
+        'unclosed object type': lambda size: 'type Destination = {' + _repeat(' name: string;', size),
+        'anchor flood': lambda size: _repeat(flood, size),
+        'unclosed .map((': lambda size: '.map((' + _repeat('item, ', size),
+        'whitespace run': lambda size: _repeat(' ', size) + ''.join(anchors),
+        'deep nesting': lambda size: '{' * (size // 2) + '<' * (size // 2),
+        'date backreference': lambda size: _repeat(
+            '{post.published_date ? new Date(post.published_date) : new Date(', size),
+        'random mutation': lambda size: _mutate(random.Random(seed), _source(random.Random(seed)),
+                                                size),
+    }
+
+
+def time_rule(rule: Rule, content: str, cap: float) -> float:
+    """Seconds rule takes on content, or cap if the watchdog stops it"""
+    args = (content, FILE_PATH) if rule.takes_path else (content,)
+    start = time.perf_counter()
+    try:
+        with watchdog.deadline(cap):
+            rule.func(*args)
+    except watchdog.Timeout:
+        return cap
+    return time.perf_counter() - start
+
+
+def fuzz_rule(rule: Rule, size: int, steps: int, cap: float, repeat: int,
+              seed: int) -> List[Tuple[str, float, float]]:
+    """(input kind, seconds at the largest size, growth exponent) per generator"""
+    results = []
+    for kind, generate in generators(rule, seed).items():
+        sizes = [size * 2 ** step for step in range(steps)]
+        times = []
+        for n in sizes:
+            content = generate(n)
+            seconds = min(time_rule(rule, content, cap) for _ in range(repeat))
+            times.append(seconds)
+            if seconds >= cap:
+                break
+        if len(times) > 1 and times[0] > 0:
+            exponent = math.log(times[-1] / times[0]) / math.log(sizes[len(times) - 1] / sizes[0])
+        else:
+            exponent = float('nan')
+        results.append((kind, times[-1], exponent))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Worst-case rule time on adversarial inputs')
+    parser.add_argument('--size', type=int, default=4096, help='smallest input, in characters')
+    parser.add_argument('--steps', type=int, default=4, help='number of doublings of --size')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cap', type=float, default=10.0,
+                        help='interrupt a single run after this many seconds')
+    parser.add_argument('--budget', type=float, default=DEFAULT_RULE_BUDGET,
+                        help='fail when a rule is slower than this at the largest size')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if not watchdog.available():
+        print("No SIGALRM here: runs cannot be capped", file=sys.stderr)
+
+    rules = []
+    for stage in build_registry():
+        rules.extend(stage.rules + ([stage.finalize] if stage.finalize else []))
+
+    largest = args.size * 2 ** (args.steps - 1)
+    print(f"{len(rules)} rules, inputs of {args.size} to {largest} characters\n")
+    width = max(len(rule.key) for rule in rules)
+    print(f"{'rule'.ljust(width)}  {'worst input':<22} {'ms':>9} {'growth':>7}")
+
+    failed = []
+    with open(os.devnull, 'w') as devnull:
+        for rule in rules:
+            with contextlib.redirect_stdout(devnull):
+                results = fuzz_rule(rule, args.size, args.steps, args.cap, args.repeat, args.seed)
+            kind, seconds, _ = max(results, key=lambda result: result[1])
+            growth = max((result[2] for result in results if not math.isnan(result[2])),
+                         default=float('nan'))
+            capped = '>=' if seconds >= args.cap else ''
+            print(f"{rule.key.ljust(width)}  {kind:<22} {capped}{seconds * 1000:>7.1f} "
+                  f"{growth:>7.2f}")
+            if seconds > args.budget:
+                failed.append(rule.key)
+
+    if failed:
+        print(f"\n{len(failed)} rule(s) over the {args.budget:g}s budget at {largest} characters: "
+              f"{', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Per-file latency of the JSON-RPC server against a process per file.
+
+Generates a synthetic corpus, then fixes every file twice: once as one
+`fix` request each to a single `python -m codemod.server`, and once by
+spawning `python -m codemod.api <file>` per file, the way a hook without
+the server would. Both run in a workspace with the tooling copied in, and
+neither writes to disk.
+
+    python -m codemod.benchmarks.server --files 50
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from codemod.benchmarks.corpus import generate_corpus
+from codemod.benchmarks.suite import prepare_workspace
+
+
+def time_server(workdir: Path, files: List[Path]) -> List[float]:
+    """Seconds per request, the server started (and warmed up) beforehand"""
+    server = subprocess.Popen([sys.executable, '-m', 'codemod.server'], cwd=workdir,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True)
+
+    def call(request_id: int, method: str, params=None) -> dict:
+        request = {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}
+        server.stdin.write(json.dumps(request) + '\n')
+        server.stdin.flush()
+        return json.loads(server.stdout.readline())
+
+    try:
+        call(0, 'ping')
+        latencies = []
+        for request_id, path in enumerate(files, 1):
+            params = {'files': [{'path': path.relative_to(workdir).as_posix(),
+                                 'content': path.read_text(encoding='utf-8')}]}
+            start = time.perf_counter()
+            reply = call(request_id, 'fix', params)
+            latencies.append(time.perf_counter() - start)
+            if 'error' in reply:
+                raise RuntimeError(f"{path}: {reply['error']['message']}")
+        call(len(files) + 1, 'shutdown')
+    finally:
+        server.stdin.close()
+        server.wait()
+    return latencies
+
+
+def time_spawn(workdir: Path, files: List[Path]) -> List[float]:
+    """Seconds per file with a fresh interpreter each time"""
+    latencies = []
+    for path in files:
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-m', 'codemod.api', path.relative_to(workdir).as_posix()],
+                       cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       check=True)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(name: str, latencies: List[float]):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{name:<16} {statistics.median(ordered) * 1000:>9.2f} {p95 * 1000:>9.2f} "
+          f"{sum(ordered):>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON-RPC server latency vs a process per file')
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(tmp) / 'corpus'
+        generate_corpus(corpus, args.files, args.seed)
+        workdir = Path(tmp) / 'work'
+        prepare_workspace(corpus, workdir)
+        files = sorted(path for path in workdir.rglob('*.tsx') if 'codemod' not in path.parts)
+
+        server = time_server(workdir, files)
+        spawn = time_spawn(workdir, files)
+
+    print(f"{'mode':<16} {'median ms':>9} {'p95 ms':>9} {'total s':>9}")
+    summarize('server', server)
+    summarize('process per file', spawn)
+    print(f"\nServer is {statistics.median(spawn) / statistics.median(server):.0f}x faster per file "
+          f"(median)")
+
+
+if __name__ == '__main__':
+    main()
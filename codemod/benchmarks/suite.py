@@ -0,0 +1,271 @@
+"""
+Benchmark suite with a stored baseline.
+
+Generates a synthetic corpus (see codemod.benchmarks.corpus), then measures:
+
+- every rule of the registry, run in memory over the corpus the way the
+  pipeline runs it (gates and anchors included), as cumulative seconds;
+- every script end to end (fix-types.py, fix-types-phase2.py,
+  fix-all-types.py and fix-types-pipeline.py) on a fresh copy of the
+  corpus with the cache disabled, as wall-clock seconds and peak RSS.
+
+Timings are the best of --repeat runs. --save-baseline writes the results
+to baseline.json next to this module; a plain run compares against it and
+exits non-zero when any measurement is more than --threshold slower (or
+larger) than the baseline.
+
+    python -m codemod.benchmarks.suite --files 1000 --save-baseline
+    python -m codemod.benchmarks.suite --files 1000 --threshold 0.2
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from codemod.benchmarks.corpus import generate_corpus
+from codemod.console import Colors, log
+from codemod.pipeline import find_files
+from codemod.rules import Stage, build_registry
+from codemod.scripts import PROJECT_ROOT, SCRIPT_FILES
+
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+BASELINE_VERSION = 1
+# The three scripts are run in this order in practice, the pipeline on its own
+SEQUENCE = ['fix-types.py', 'fix-types-phase2.py', 'fix-all-types.py']
+SCRIPTS = SEQUENCE + ['fix-types-pipeline.py']
+
+# Differences below these are noise whatever the ratio
+MIN_SECONDS = 0.005
+MIN_RSS_KB = 2048
+
+
+def time_rules(corpus: Path, stages: List[Stage]) -> Dict[str, float]:
+    """Cumulative seconds per rule key over every file of the corpus"""
+    files = [(path, path.read_text(encoding='utf-8')) for path in find_files(corpus, stages)]
+    timings: Dict[str, float] = {}
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for file_path, content in files:
+            relative = file_path.relative_to(corpus).as_posix()
+            for stage in stages:
+                if not stage.covers(relative):
+                    continue
+                start = time.perf_counter()
+                passed = stage.gate(content)
+                timings[stage.gate_key] = timings.get(stage.gate_key, 0.0) + \
+                    time.perf_counter() - start
+                if not passed:
+                    continue
+
+                runnable = stage.anchor_index.matching_rules(content)
+                stage_modified = False
+                for rule in stage.rules:
+                    if rule.key not in runnable:
+                        continue
+                    start = time.perf_counter()
+                    content, modified = rule.apply(content, str(file_path))
+                    timings[rule.key] = timings.get(rule.key, 0.0) + time.perf_counter() - start
+                    stage_modified = stage_modified or modified
+
+                if stage_modified and stage.finalize is not None:
+                    start = time.perf_counter()
+                    content, _ = stage.finalize.apply(content, str(file_path))
+                    timings[stage.finalize.key] = timings.get(stage.finalize.key, 0.0) + \
+                        time.perf_counter() - start
+
+    return timings
+
+
+def prepare_workspace(corpus: Path, target: Path):
+    """A fresh copy of the corpus with the tooling needed to run the scripts"""
+    if target.exists():
+        shutil.rmtree(target)
+    shutil.copytree(corpus, target)
+    shutil.copytree(PROJECT_ROOT / 'codemod', target / 'codemod',
+                    ignore=shutil.ignore_patterns('__pycache__'))
+    for script in list(SCRIPT_FILES.values()) + ['fix-types-pipeline.py']:
+        shutil.copy2(PROJECT_ROOT / script, target / script)
+
+
+# Runs a script and reports the peak RSS of its own address space. The
+# rusage of a child is no good here: Linux carries the parent's high-water
+# mark over fork and exec, so every child would report at least the size of
+# this process.
+_RUNNER = """
+import runpy, sys
+sys.argv = sys.argv[1:]
+try:
+    runpy.run_path(sys.argv[0], run_name='__main__')
+finally:
+    try:
+        with open('/proc/self/status') as f:
+            sys.stderr.write(''.join(line for line in f if line.startswith('VmHWM:')))
+    except OSError:
+        pass
+"""
+
+
+def run_script(script: str, cwd: Path) -> Tuple[float, int]:
+    """Run one script to completion and return (seconds, peak RSS in KiB)"""
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', _RUNNER, script, '--no-cache'],
+                               cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                               text=True)
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"{script} exited with status {completed.returncode}:\n"
+                           f"{completed.stderr}")
+
+    peak_rss = 0
+    for line in completed.stderr.splitlines():
+        if line.startswith('VmHWM:'):
+            peak_rss = int(line.split()[1])
+    return elapsed, peak_rss
+
+
+def time_scripts(corpus: Path, workdir: Path, repeat: int) -> Dict[str, dict]:
+    """Wall-clock seconds and peak RSS of every script, best of `repeat`"""
+    results: Dict[str, dict] = {}
+    for script in SCRIPTS:
+        best_seconds, peak_rss = None, 0
+        for _ in range(repeat):
+            prepare_workspace(corpus, workdir)
+            if script in SEQUENCE:
+                # Start from the tree the scripts before it leave behind
+                for previous in SEQUENCE[:SEQUENCE.index(script)]:
+                    run_script(previous, workdir)
+            seconds, rss = run_script(script, workdir)
+            best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+            peak_rss = max(peak_rss, rss)
+        results[script] = {'seconds': best_seconds, 'peak_rss_kb': peak_rss}
+    return results
+
+
+def run_suite(files: int, seed: int, repeat: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(tmp) / 'corpus'
+        written = generate_corpus(corpus, files, seed)
+        total_bytes = sum(path.stat().st_size for path in written)
+
+        stages = build_registry()
+        rules: Dict[str, float] = {}
+        for _ in range(repeat):
+            for key, seconds in time_rules(corpus, stages).items():
+                rules[key] = min(rules.get(key, seconds), seconds)
+
+        scripts = time_scripts(corpus, Path(tmp) / 'work', repeat)
+
+    return {
+        'version': BASELINE_VERSION,
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'corpus': {'files': files, 'seed': seed, 'bytes': total_bytes},
+        'rules': rules,
+        'scripts': scripts,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Measurements more than `threshold` worse than the baseline"""
+    regressions = []
+
+    def check(name: str, current: Optional[float], previous: Optional[float],
+              minimum: float, unit: str):
+        if current is None or previous is None:
+            return
+        if current - previous > minimum and current > previous * (1 + threshold):
+            regressions.append(f"{name}: {previous:.4f} → {current:.4f} {unit} "
+                               f"({(current / previous - 1) * 100:+.0f}%)")
+
+    for key, seconds in results['rules'].items():
+        check(f"rule {key}", seconds, baseline['rules'].get(key), MIN_SECONDS, 's')
+    for script, measured in results['scripts'].items():
+        previous = baseline['scripts'].get(script, {})
+        check(f"{script} time", measured['seconds'], previous.get('seconds'), MIN_SECONDS, 's')
+        check(f"{script} peak RSS", measured['peak_rss_kb'], previous.get('peak_rss_kb'),
+              MIN_RSS_KB, 'KiB')
+    return regressions
+
+
+def report(results: dict):
+    corpus = results['corpus']
+    log(f"Corpus: {corpus['files']} files, {corpus['bytes'] / 1024:.0f} KiB (seed {corpus['seed']})",
+        Colors.MAGENTA)
+
+    width = max(len(key) for key in results['rules'])
+    log(f"\n{'Rule'.ljust(width)}  {'seconds':>9}", Colors.BLUE)
+    for key, seconds in sorted(results['rules'].items(), key=lambda item: -item[1]):
+        log(f"{key.ljust(width)}  {seconds:>9.4f}", Colors.BLUE)
+
+    log(f"\n{'Script'.ljust(24)}  {'seconds':>9}  {'peak RSS':>10}", Colors.BLUE)
+    for script, measured in results['scripts'].items():
+        log(f"{script.ljust(24)}  {measured['seconds']:>9.3f}  "
+            f"{measured['peak_rss_kb'] / 1024:>7.1f} MiB", Colors.BLUE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rule and script benchmarks against a baseline')
+    parser.add_argument('--files', type=int, default=1000,
+                        help='number of synthetic files to generate')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per measurement; the best one counts')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown before a measurement fails (default: 0.2 = 20%%)')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results as the new baseline')
+    args = parser.parse_args()
+
+    results = run_suite(args.files, args.seed, args.repeat)
+    report(results)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        log(f"\nBaseline saved to {args.baseline}", Colors.GREEN)
+        return
+
+    if not args.baseline.exists():
+        log(f"\nNo baseline at {args.baseline}; run with --save-baseline first", Colors.YELLOW)
+        return
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    if baseline.get('corpus', {}).get('files') != args.files \
+            or baseline.get('corpus', {}).get('seed') != args.seed:
+        log(f"\n❌ Baseline was recorded on a different corpus "
+            f"({baseline.get('corpus')}); rerun with matching --files/--seed", Colors.RED)
+        sys.exit(2)
+    if baseline.get('machine') != results['machine']:
+        log("\n⚠️  Baseline was recorded on a different machine; timings may not compare",
+            Colors.YELLOW)
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        log(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}:", Colors.RED)
+        for line in regressions:
+            log(f"   {line}", Colors.RED)
+        sys.exit(1)
+
+    log(f"\n✅ No regressions over {args.threshold:.0%} against {args.baseline}", Colors.GREEN)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Pruned os.scandir walker versus the old glob-then-filter discovery.
+
+Builds a copy of app/ and components/ with a populated node_modules and a
+.next build directory nested inside, then times both approaches and checks
+that they find the same files.
+
+    python -m codemod.benchmarks.walk --packages 300
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from codemod.scripts import PROJECT_ROOT
+from codemod.walk import walk_files
+
+
+def glob_then_filter(directory: Path) -> List[Path]:
+    """The discovery fix-all-types.py used before the shared walker"""
+    files = []
+    for pattern in ['**/*.ts', '**/*.tsx']:
+        files.extend(directory.glob(pattern))
+    excluded = {'node_modules', '.next', 'dist', 'build', '.git'}
+    return [f for f in files if not any(ex in f.parts for ex in excluded)]
+
+
+def populate_vendor_dirs(directory: Path, packages: int):
+    """Fill directory with a node_modules tree and some build output"""
+    for index in range(packages):
+        package = directory / 'node_modules' / f'package-{index}'
+        for sub in ['dist', 'src', 'types', 'lib/internal']:
+            (package / sub).mkdir(parents=True, exist_ok=True)
+            for file_index in range(8):
+                (package / sub / f'module{file_index}.d.ts').write_text('export {};\n')
+                (package / sub / f'module{file_index}.js').write_text('module.exports = {};\n')
+    build = directory / '.next' / 'server' / 'chunks'
+    build.mkdir(parents=True)
+    for index in range(packages):
+        (build / f'chunk{index}.js').write_text('\n')
+        (build / f'chunk{index}.d.ts').write_text('\n')
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Directory walker benchmark')
+    parser.add_argument('--packages', type=int, default=300,
+                        help='number of fake packages inside node_modules')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        for dir_name in ['app', 'components']:
+            shutil.copytree(PROJECT_ROOT / dir_name, root / dir_name)
+        populate_vendor_dirs(root / 'components', args.packages)
+
+        directories = [root / 'app', root / 'components']
+        globbed = sorted(f for d in directories for f in glob_then_filter(d))
+        walked = sorted(f for d in directories for f in walk_files(d, project_root=root))
+
+        glob_time = best_of(lambda: [glob_then_filter(d) for d in directories], args.repeat)
+        walk_time = best_of(lambda: [list(walk_files(d, project_root=root)) for d in directories],
+                            args.repeat)
+
+    print(f"Files found: glob {len(globbed)}, walker {len(walked)} "
+          f"({'identical' if globbed == walked else 'DIFFERENT'})")
+    print(f"glob-then-filter: {glob_time * 1000:8.1f} ms")
+    print(f"pruned walker:    {walk_time * 1000:8.1f} ms")
+    print(f"speed-up:         {glob_time / walk_time:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,438 @@
+"""
+Approximate client JavaScript per route, and the packages that weigh it.
+
+The modules of a route are its page plus the layouts, templates, loading,
+error and not-found files of every directory above it. They are walked
+through the import graph of codemod.client: server modules are followed
+until a 'use client' module is reached, and from there every import is
+client code. Each route is charged
+
+  - the source size of the project modules on its client side;
+  - the installed size of every package they import, and of the packages
+    those import in turn: the package entry (exports, browser, module or
+    main) and the files it reaches through relative imports, read from
+    node_modules.
+
+react, react-dom and next are the framework chunk every route ships and
+are left out. Sizes are unminified and ignore tree shaking, so they are an
+upper bound; packages marked side-effect free in their package.json are
+flagged, since bundlers drop what they do not use. Without node_modules the
+packages are still listed with the import path that pulls them in, with an
+unknown size.
+
+The import graph persists in .codemod-cache/client-graph.json (see
+codemod.client) and package weights in .codemod-cache/bundle.json, keyed by
+installed version, so a re-run only rescans edited modules.
+
+    python -m codemod.bundle
+    python -m codemod.bundle --top 20 --json bundle.json
+"""
+
+import argparse
+import json
+import os
+import re
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from codemod.cache import CACHE_DIR
+from codemod.client import ClientGraph
+
+BUNDLE_VERSION = 1
+# The framework chunk, shipped to every route
+FRAMEWORK = {'react', 'react-dom', 'next'}
+PACKAGE_SUFFIXES = ('', '.js', '.mjs', '.cjs', '.json', '/index.js', '/index.mjs',
+                    '/index.cjs')
+# Export conditions, in the order a browser bundle picks them
+CONDITIONS = ('browser', 'import', 'module', 'default', 'require')
+PAGE_FILE = re.compile(r'(?:^|/)page\.(?:tsx?|jsx?)$')
+ROUTE_FILE = re.compile(r'(?:^|/)(?:layout|template|loading|error|not-found)\.(?:tsx?|jsx?)$')
+
+_PACKAGE_IMPORT = re.compile(
+    r'''(?:\bfrom\s*|\bimport\s*\(?\s*|\brequire\s*\(\s*|\bexport\s*\*\s*from\s*)'''
+    r'''(["'])([^"'\n]+)\1''')
+
+
+def package_name(specifier: str) -> Optional[str]:
+    """The package a bare specifier imports from ('@scope/name' or 'name')"""
+    if specifier.startswith(('.', '/')) or ':' in specifier:
+        return None
+    parts = specifier.split('/')
+    if specifier.startswith('@'):
+        return '/'.join(parts[:2]) if len(parts) > 1 and parts[1] else None
+    return parts[0] or None
+
+
+def _condition(value) -> Optional[str]:
+    """The file an `exports` value points a browser bundle to"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        for item in value:
+            target = _condition(item)
+            if target:
+                return target
+    if isinstance(value, dict):
+        for condition in CONDITIONS:
+            if condition in value:
+                target = _condition(value[condition])
+                if target:
+                    return target
+    return None
+
+
+def _resolve_file(base: Path) -> Optional[Path]:
+    for suffix in PACKAGE_SUFFIXES:
+        candidate = Path(f'{base}{suffix}')
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def _read_manifest(package_dir: Path) -> dict:
+    try:
+        with open(package_dir / 'package.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _entry_file(package_dir: Path, manifest: dict, subpath: str) -> Optional[Path]:
+    """The file `name{subpath}` resolves to in an installed package"""
+    exports = manifest.get('exports')
+    if exports is not None and not (isinstance(exports, dict)
+                                    and any(key.startswith('.') for key in exports)):
+        exports = {'.': exports}
+    if isinstance(exports, dict):
+        key = '.' + subpath
+        target = _condition(exports.get(key))
+        if target is None:
+            for pattern, value in exports.items():
+                prefix, star, suffix = pattern.partition('*')
+                if star and key.startswith(prefix) and key.endswith(suffix):
+                    target = _condition(value)
+                    if target:
+                        target = target.replace('*', key[len(prefix):len(key) - len(suffix)])
+                    break
+        if target:
+            return _resolve_file(package_dir / target)
+        return None
+
+    if subpath:
+        base = package_dir / subpath.lstrip('/')
+        if (base / 'package.json').is_file():
+            return _entry_file(base, _read_manifest(base), '')
+        return _resolve_file(base)
+    for field in ('browser', 'module', 'main'):
+        if isinstance(manifest.get(field), str):
+            return _resolve_file(package_dir / manifest[field])
+    return _resolve_file(package_dir / 'index')
+
+
+class PackageWeight(NamedTuple):
+    key: str  # installed location and subpath, or the specifier when not installed
+    bytes: Optional[int]  # None when the package is not installed
+    files: int
+    dependencies: List[str]  # bare specifiers the package imports
+    side_effect_free: bool
+
+
+class PackageSizes:
+    """Installed size of package entry points, cached per installed version"""
+
+    def __init__(self, project_root: Path):
+        self.project_root = project_root.resolve()
+        self.path = self.project_root / CACHE_DIR / 'bundle.json'
+        self.packages: Dict[str, dict] = {}
+        self.weighed = 0
+        self.dirty = False
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+                if cache.get('version') == BUNDLE_VERSION:
+                    self.packages = cache.get('packages', {})
+            except (OSError, ValueError):
+                self.packages = {}
+
+    def _find_package(self, name: str, from_dir: Path) -> Optional[Path]:
+        """node_modules/<name> nearest to from_dir, as Node looks it up"""
+        directory = from_dir
+        while True:
+            candidate = directory / 'node_modules' / name
+            if (candidate / 'package.json').is_file():
+                return candidate
+            if directory == self.project_root or directory.parent == directory:
+                return None
+            directory = directory.parent
+
+    def weigh(self, specifier: str, from_dir: Optional[Path] = None) -> PackageWeight:
+        name = package_name(specifier)
+        package_dir = self._find_package(name, from_dir or self.project_root)
+        if package_dir is None:
+            return PackageWeight(specifier, None, 0, [], False)
+
+        manifest = _read_manifest(package_dir)
+        subpath = specifier[len(name):]
+        key = package_dir.relative_to(self.project_root).as_posix() + subpath
+        cached = self.packages.get(key)
+        if cached is not None and cached['version'] == manifest.get('version'):
+            return PackageWeight(key, cached['bytes'], cached['files'], cached['dependencies'],
+                                 cached['side_effect_free'])
+
+        entry = _entry_file(package_dir, manifest, subpath)
+        pending = deque([entry] if entry is not None else [])
+        seen = set()
+        size = 0
+        dependencies = set()
+        while pending:
+            file_path = pending.popleft()
+            if file_path in seen:
+                continue
+            seen.add(file_path)
+            try:
+                size += os.path.getsize(file_path)
+                with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                    content = f.read()
+            except OSError:
+                continue
+            if file_path.suffix == '.json':
+                continue
+            for match in _PACKAGE_IMPORT.finditer(content):
+                target_specifier = match.group(2)
+                if target_specifier.startswith('.'):
+                    target = _resolve_file(file_path.parent / target_specifier)
+                elif package_name(target_specifier) == name:
+                    target = _entry_file(package_dir, manifest,
+                                         target_specifier[len(name):])
+                else:
+                    if package_name(target_specifier) not in (None, *FRAMEWORK):
+                        dependencies.add(target_specifier)
+                    continue
+                if target is not None and target not in seen:
+                    pending.append(target)
+
+        self.packages[key] = {
+            'version': manifest.get('version'),
+            'bytes': size,
+            'files': len(seen),
+            'dependencies': sorted(dependencies),
+            'side_effect_free': manifest.get('sideEffects', True) is False,
+        }
+        self.weighed += 1
+        self.dirty = True
+        return self.weigh(specifier, from_dir)
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': BUNDLE_VERSION, 'packages': self.packages}, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+class RouteChunk(NamedTuple):
+    route: str
+    modules: Dict[str, int]  # client modules and their source size
+    packages: Dict[str, PackageWeight]  # by key, dependencies included
+
+    @property
+    def module_bytes(self) -> int:
+        return sum(self.modules.values())
+
+    @property
+    def package_bytes(self) -> int:
+        return sum(weight.bytes or 0 for weight in self.packages.values())
+
+    @property
+    def bytes(self) -> int:
+        return self.module_bytes + self.package_bytes
+
+
+class PackageUse(NamedTuple):
+    weight: PackageWeight
+    routes: List[str]
+    chain: List[str]  # route file > ... > importing module > package
+
+
+class BundleReport(NamedTuple):
+    routes: List[RouteChunk]  # heaviest first
+    packages: List[PackageUse]  # heaviest first
+    modules: int
+    rescanned: int
+    weighed: int
+    installed: bool
+
+
+def route_name(page: str) -> str:
+    """URL of an app/ page, without route groups"""
+    parts = [part for part in Path(page).parent.parts[1:]
+             if not (part.startswith('(') and part.endswith(')'))]
+    return '/' + '/'.join(parts)
+
+
+def route_files(graph: ClientGraph) -> Dict[str, List[str]]:
+    """Route URL -> the page and the layouts, templates, ... that wrap it"""
+    by_dir = defaultdict(list)
+    for key in graph.entries:
+        if key.startswith('app/') and ROUTE_FILE.search(key):
+            by_dir[str(Path(key).parent)].append(key)
+
+    routes = {}
+    for page in sorted(key for key in graph.entries
+                       if key.startswith('app/') and PAGE_FILE.search(key)):
+        directory = Path(page).parent
+        files = [page]
+        for parent in [directory, *directory.parents]:
+            files = sorted(by_dir.get(str(parent), [])) + files
+            if str(parent) == 'app':
+                break
+        routes[route_name(page)] = files
+    return routes
+
+
+def _is_package(graph: ClientGraph, key: str, specifier: str) -> bool:
+    if package_name(specifier) is None or graph.resolve(key, specifier) is not None:
+        return False
+    return not any(specifier.startswith(pattern.partition('*')[0])
+                   for pattern, _ in graph.aliases if '*' in pattern)
+
+
+def route_chunk(graph: ClientGraph, sizes: PackageSizes, route: str,
+                files: List[str]) -> Tuple[RouteChunk, Dict[str, List[str]]]:
+    """The client side of a route, and the import chain that reaches each package"""
+    parents: Dict[Tuple[str, bool], Optional[Tuple[str, bool]]] = {}
+    pending = deque()
+    for key in files:
+        node = (key, graph.entries[key]['directive'] == 'client')
+        parents[node] = None
+        pending.append(node)
+
+    def chain(node) -> List[str]:
+        path = []
+        while node is not None:
+            path.append(node[0])
+            node = parents[node]
+        return path[::-1]
+
+    modules = {}
+    chains: Dict[str, List[str]] = {}
+    packages: Dict[str, PackageWeight] = {}
+    package_queue = deque()
+    while pending:
+        node = pending.popleft()
+        key, client = node
+        entry = graph.entries[key]
+        if client:
+            modules[key] = entry['size']
+        for specifier, type_only in entry['imports']:
+            if type_only:
+                continue
+            target = graph.resolve(key, specifier)
+            if target is not None and target in graph.entries:
+                child = (target, client or graph.entries[target]['directive'] == 'client')
+                if child not in parents:
+                    parents[child] = node
+                    pending.append(child)
+            elif client and _is_package(graph, key, specifier) \
+                    and package_name(specifier) not in FRAMEWORK:
+                package_queue.append((specifier, None, chain(node)))
+
+    while package_queue:
+        specifier, from_dir, path = package_queue.popleft()
+        weight = sizes.weigh(specifier, from_dir)
+        if weight.key in packages:
+            continue
+        packages[weight.key] = weight
+        chains[weight.key] = path + [specifier]
+        if weight.bytes is not None:
+            subpath = specifier[len(package_name(specifier)):]
+            package_dir = graph.project_root / weight.key[:len(weight.key) - len(subpath)]
+            for dependency in weight.dependencies:
+                package_queue.append((dependency, package_dir, path + [specifier]))
+
+    return RouteChunk(route, modules, packages), chains
+
+
+def analyze(project_root: Path) -> BundleReport:
+    graph = ClientGraph(project_root)
+    graph.refresh()
+    graph.save()
+    sizes = PackageSizes(project_root)
+
+    chunks = []
+    uses: Dict[str, PackageUse] = {}
+    for route, files in route_files(graph).items():
+        chunk, chains = route_chunk(graph, sizes, route, files)
+        chunks.append(chunk)
+        for key, weight in chunk.packages.items():
+            use = uses.setdefault(key, PackageUse(weight, [], chains[key]))
+            use.routes.append(route)
+            if len(chains[key]) < len(use.chain):
+                uses[key] = use._replace(chain=chains[key])
+    sizes.save()
+
+    chunks.sort(key=lambda chunk: (-chunk.bytes, -len(chunk.packages), chunk.route))
+    packages = sorted(uses.values(), key=lambda use: (-(use.weight.bytes or 0),
+                                                      -len(use.routes), use.weight.key))
+    installed = (graph.project_root / 'node_modules').is_dir()
+    return BundleReport(chunks, packages, len(graph.entries), graph.rescanned, sizes.weighed,
+                        installed)
+
+
+def _kb(size: Optional[int]) -> str:
+    return f"{size / 1024:,.0f} KB" if size is not None else '?'
+
+
+def print_report(report: BundleReport, top: int):
+    print(f"{report.modules} modules ({report.rescanned} rescanned), "
+          f"{len(report.packages)} packages on the client ({report.weighed} weighed)")
+    if not report.installed:
+        print("node_modules is not installed: package sizes are unknown, "
+              "run npm install for them")
+
+    print(f"\nHeaviest routes ({min(top, len(report.routes))} of {len(report.routes)}):")
+    for chunk in report.routes[:top]:
+        unknown = sum(weight.bytes is None for weight in chunk.packages.values())
+        print(f"  {chunk.route:<40} {_kb(chunk.bytes):>9}  ({len(chunk.modules)} modules "
+              f"{_kb(chunk.module_bytes)}, {len(chunk.packages)} packages "
+              f"{_kb(chunk.package_bytes)}{f', {unknown} of unknown size' if unknown else ''})")
+
+    print(f"\nHeaviest packages ({min(top, len(report.packages))} of "
+          f"{len(report.packages)}; * side-effect free, unused exports are dropped):")
+    for use in report.packages[:top]:
+        flag = '*' if use.weight.side_effect_free else ''
+        print(f"  {use.weight.key + flag:<40} {_kb(use.weight.bytes):>9}  "
+              f"in {len(use.routes)} routes")
+        print(f"      {' > '.join(use.chain)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Approximate client JavaScript per route')
+    parser.add_argument('--top', type=int, default=10, help='routes and packages to list')
+    parser.add_argument('--json', type=Path, metavar='PATH', help='write the report as JSON')
+    args = parser.parse_args()
+
+    report = analyze(Path.cwd())
+    print_report(report, args.top)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'routes': [{'route': chunk.route, 'bytes': chunk.bytes,
+                            'modules': chunk.modules,
+                            'packages': {key: weight.bytes
+                                         for key, weight in chunk.packages.items()}}
+                           for chunk in report.routes],
+                'packages': [{**use.weight._asdict(), 'routes': use.routes, 'chain': use.chain}
+                             for use in report.packages],
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
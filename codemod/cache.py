@@ -0,0 +1,287 @@
+"""
+Persistent manifest that lets runs skip files left clean by the last run.
+
+For every clean file the manifest stores its size, mtime and content hash,
+plus the fingerprints of the rules that were actually evaluated on it. A
+file is skipped without being read when its size and mtime still match and
+every recorded fingerprint equals the current one. Fingerprints cover a
+function's own source and the module-level helpers and constants it uses,
+so editing one fix_* function only invalidates files that reached it, plus
+the codemod modules they import (the lexer, the edit buffer, ...) and
+everything those import from the package, so an engine change invalidates
+the rules built on it.
+Inputs the rules read besides the source file (the parsed Supabase schema)
+are stored with the manifest; when one changes, every entry is dropped.
+"""
+
+import ast
+import hashlib
+import inspect
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+CACHE_DIR = '.codemod-cache'
+# Rules importing from this package are fingerprinted with its sources
+ENGINE_PACKAGE = 'codemod'
+ENGINE_ROOT = Path(__file__).parent
+CACHE_VERSION = 1
+
+# (size, mtime_ns, sha256 hex digest)
+FileStamp = Tuple[int, int, str]
+
+
+@lru_cache(maxsize=None)
+def _module_symbols(source: str) -> Dict[str, Tuple[str, frozenset]]:
+    """Map every top-level def/class/assignment to (source, names it references)"""
+    symbols = {}
+    for node in ast.parse(source).body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            names = [node.name]
+        elif isinstance(node, ast.Assign):
+            names = [t.id for t in node.targets if isinstance(t, ast.Name)]
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+            names = [node.target.id]
+        else:
+            continue
+
+        used = frozenset(n.id for n in ast.walk(node) if isinstance(n, ast.Name))
+        for name in names:
+            symbols[name] = (ast.unparse(node), used)
+    return symbols
+
+
+def _engine_module(value) -> Optional[str]:
+    """The codemod module an imported name comes from, if it is one"""
+    name = value.__name__ if inspect.ismodule(value) else getattr(value, '__module__', None)
+    if isinstance(name, str) and (name == ENGINE_PACKAGE or
+                                  name.startswith(ENGINE_PACKAGE + '.')):
+        return name
+    return None
+
+
+def _engine_source(module_name: str) -> Optional[str]:
+    """Source of a codemod module, or None when the name is not a module"""
+    parts = module_name.split('.')[1:]
+    base = ENGINE_ROOT.joinpath(*parts)
+    for path in (base.with_suffix('.py'), base / '__init__.py'):
+        if path.is_file():
+            return path.read_text(encoding='utf-8')
+    return None
+
+
+def _engine_imports(source: str) -> Iterable[str]:
+    """The codemod modules (or names in them) a module's source imports"""
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            # `from codemod import lexer` imports a module, `from
+            # codemod.lexer import lex` one of its names
+            names = [node.module] + [f'{node.module}.{alias.name}' for alias in node.names]
+        else:
+            continue
+        for name in names:
+            if name == ENGINE_PACKAGE or name.startswith(ENGINE_PACKAGE + '.'):
+                yield name
+
+
+@lru_cache(maxsize=None)
+def _engine_digest(module_name: str) -> str:
+    """Hash of a codemod module's source and of every codemod module it imports"""
+    digest = hashlib.sha256()
+    seen = set()
+    pending = [module_name]
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        source = _engine_source(name)
+        if source is None:
+            continue
+        digest.update(name.encode())
+        digest.update(source.encode())
+        pending.extend(sorted(set(_engine_imports(source)) - seen))
+    return digest.hexdigest()
+
+
+def fingerprint(func: Callable) -> str:
+    """Hash a function together with the module-level symbols it depends on
+
+    Names the function or those symbols import from the codemod package
+    (the lexer, EditBuffer, the import index, ...) bring in the source of
+    their module and of everything it imports from the package in turn.
+    """
+    module_source = inspect.getsource(inspect.getmodule(func))
+    symbols = _module_symbols(module_source)
+
+    digest = hashlib.sha256()
+    seen = set()
+    engine = set()
+    pending = [func.__name__]
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        if name not in symbols:
+            module = _engine_module(func.__globals__.get(name))
+            if module is not None:
+                engine.add(module)
+            continue
+        source, used = symbols[name]
+        digest.update(name.encode())
+        digest.update(source.encode())
+        pending.extend(sorted(used - seen))
+
+    for module in sorted(engine):
+        digest.update(_engine_digest(module).encode())
+    return digest.hexdigest()[:16]
+
+
+def read_source(file_path: Path) -> Tuple[str, FileStamp]:
+    """Read a file once, returning its text (universal newlines) and its stamp"""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+        stat = os.fstat(f.fileno())
+
+    content = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+    return content, (stat.st_size, stat.st_mtime_ns, hashlib.sha256(data).hexdigest())
+
+
+class FileCache:
+    """Manifest of clean files for one tool, stored under .codemod-cache/"""
+
+    def __init__(self, project_root: Path, name: str, fingerprints: Dict[str, str],
+                 enabled: bool = True, inputs: Optional[Dict[str, str]] = None):
+        self.project_root = project_root
+        self.path = project_root / CACHE_DIR / f'{name}.json'
+        self.fingerprints = fingerprints
+        self.inputs = dict(inputs or {})
+        self.enabled = enabled
+        self.entries: Dict[str, dict] = {}
+        # Inputs and entries of a manifest written under different inputs
+        self.previous_inputs: Dict[str, str] = {}
+        self.previous_entries: Dict[str, dict] = {}
+        self.hits = 0
+        self.dirty = False
+
+        if enabled and self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                if manifest.get('version') == CACHE_VERSION:
+                    self.previous_inputs = manifest.get('inputs', {})
+                    if self.previous_inputs == self.inputs:
+                        self.entries = manifest.get('files', {})
+                    else:
+                        self.previous_entries = manifest.get('files', {})
+                        self.dirty = True
+            except (OSError, ValueError):
+                self.entries = {}
+
+    @classmethod
+    def for_script(cls, project_root: Path, stage, enabled: bool = True,
+                   inputs: Optional[Dict[str, str]] = None) -> 'FileCache':
+        """Cache for one of the fixer scripts, keyed per rule of its stage
+        (see codemod.rules.script_stage), as the pipeline's is"""
+        # A disabled cache (--no-cache, --check runs in CI) never compares them
+        fingerprints = stage.fingerprints() if enabled else {}
+        return cls(project_root, stage.name, fingerprints, enabled, inputs)
+
+    def _key(self, file_path: Path) -> str:
+        return Path(file_path).resolve().relative_to(self.project_root.resolve()).as_posix()
+
+    def is_fresh(self, file_path: Path) -> bool:
+        """Check whether a file is unchanged and clean under the current rules"""
+        if not self.enabled:
+            return False
+
+        entry = self.entries.get(self._key(file_path))
+        if entry is None:
+            return False
+
+        if any(self.fingerprints.get(name) != value for name, value in entry['rules'].items()):
+            return False
+
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+
+        if stat.st_size != entry['size']:
+            return False
+
+        if stat.st_mtime_ns != entry['mtime_ns']:
+            # Touched but maybe not edited: confirm by content hash
+            with open(file_path, 'rb') as f:
+                if hashlib.sha256(f.read()).hexdigest() != entry['sha256']:
+                    return False
+            entry['mtime_ns'] = stat.st_mtime_ns
+            self.dirty = True
+
+        self.hits += 1
+        return True
+
+    def record(self, file_path: Path, rule_names: Iterable[str],
+               stamp: Optional[FileStamp] = None):
+        """Remember a file as clean after the given rules were evaluated on it"""
+        if not self.enabled:
+            return
+
+        if stamp is None:
+            _, stamp = read_source(file_path)
+
+        size, mtime_ns, sha256 = stamp
+        self.entries[self._key(file_path)] = {
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'sha256': sha256,
+            'rules': {name: self.fingerprints[name] for name in rule_names},
+        }
+        self.dirty = True
+
+    def record_result(self, file_path: Path, modified: bool, stamp: Optional[FileStamp],
+                      evaluated: Iterable[str]):
+        """Update the manifest after a file was processed
+
+        stamp is that of the content the rules saw (None when the file could
+        not be processed), evaluated the cache keys of the gate and rules
+        they ran; nothing is read again.
+        """
+        if modified or stamp is None:
+            self.forget(file_path)
+        else:
+            self.record(file_path, evaluated, stamp)
+
+    def restore(self, file_path: Path):
+        """Keep a file's entry from before the inputs changed
+
+        For callers that know the change cannot affect this file; the entry
+        is still checked against the file and the rule fingerprints.
+        """
+        key = self._key(file_path)
+        if key in self.previous_entries:
+            self.entries[key] = self.previous_entries[key]
+            self.dirty = True
+
+    def forget(self, file_path: Path):
+        """Drop a file from the manifest, e.g. after it was rewritten"""
+        if self.entries.pop(self._key(file_path), None) is not None:
+            self.dirty = True
+
+    def save(self):
+        """Write the manifest back atomically if anything changed"""
+        if not self.enabled or not self.dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'inputs': self.inputs,
+                       'files': self.entries}, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
@@ -0,0 +1,134 @@
+"""
+Check mode: report files the fixers would change, without writing.
+
+Each file goes through the registry stages of the tool being checked
+(gates and anchors included), but evaluation stops at the first rule whose
+output differs from its input: that rule and the line of its first change
+are all a CI failure needs. With --fail-fast the run stops at the first
+violating file. Files the tool's cache already knows to be clean are
+skipped; the cache is only read, never updated.
+
+    python fix-all-types.py --check
+    python fix-types-pipeline.py --check --fail-fast
+"""
+
+import argparse
+import contextlib
+import os
+import time
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from codemod.cache import FileCache, read_source
+from codemod.console import Colors, log
+from codemod.parallel import map_files
+from codemod.rules import Stage, build_registry
+
+
+class Violation(NamedTuple):
+    path: Path
+    stage: str
+    rule: str
+    line: int
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """The --check and --fail-fast options shared by the fixers"""
+    parser.add_argument('--check', action='store_true',
+                        help='report files that would be changed and exit non-zero; writes nothing')
+    parser.add_argument('--fail-fast', action='store_true',
+                        help='with --check, stop at the first file that would be changed')
+
+
+def check_content(content: str, file_path: Path, project_root: Path,
+                  stages: Sequence[Stage]) -> Optional[Violation]:
+    """The first rule that would change content, or None if it is clean"""
+    relative = Path(file_path).resolve().relative_to(project_root.resolve()).as_posix()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for stage in stages:
+            if not stage.covers(relative):
+                continue
+            found = stage.first_change(content, str(file_path))
+            if found is not None:
+                rule, new_content = found
+                offset = len(os.path.commonprefix([content, new_content]))
+                return Violation(file_path, stage.name, rule.name,
+                                 content.count('\n', 0, offset) + 1)
+    return None
+
+
+def check_file(file_path: Path, project_root: Path,
+               stages: Sequence[Stage]) -> Optional[Violation]:
+    try:
+        content, _ = read_source(file_path)
+    except (OSError, UnicodeDecodeError) as e:
+        log(f"❌ Error reading {file_path}: {e}", Colors.RED)
+        return None
+    return check_content(content, file_path, project_root, stages)
+
+
+# Per-worker state for parallel checks, as in codemod.pipeline
+_worker_root: Optional[Path] = None
+_worker_stages: Optional[List[Stage]] = None
+
+
+def _init_worker(project_root: Path, stage_names: Optional[Sequence[str]]):
+    global _worker_root, _worker_stages
+    _worker_root = project_root
+    _worker_stages = select_stages(stage_names)
+
+
+def _check_in_worker(file_path: Path) -> Optional[Violation]:
+    return check_file(file_path, _worker_root, _worker_stages)
+
+
+def select_stages(stage_names: Optional[Sequence[str]] = None) -> List[Stage]:
+    """The registry stages with the given names (all of them for None)"""
+    return build_registry(stage_names)
+
+
+def check_files(project_root: Path, files: Sequence[Path],
+                stage_names: Optional[Sequence[str]] = None, jobs: int = 1,
+                fail_fast: bool = False) -> Tuple[List[Violation], int]:
+    """Violations in files, in file order, and how many files were checked
+
+    With fail_fast the files are checked one by one up to the first violation.
+    """
+    if fail_fast or jobs == 1:
+        stages = select_stages(stage_names)
+        violations = []
+        for checked, file_path in enumerate(files, 1):
+            violation = check_file(file_path, project_root, stages)
+            if violation is not None:
+                violations.append(violation)
+                if fail_fast:
+                    return violations, checked
+        return violations, len(files)
+
+    results = map_files(_check_in_worker, files, jobs,
+                        initializer=_init_worker, initargs=(project_root, stage_names))
+    return [violation for violation in results if violation is not None], len(files)
+
+
+def run_check(project_root: Path, files: Sequence[Path], stage_names: Optional[Sequence[str]],
+              args: argparse.Namespace, cache: Optional[FileCache] = None) -> int:
+    """Check files for a script's main() and return its exit status"""
+    start = time.perf_counter()
+    pending = [f for f in files if cache is None or not cache.is_fresh(f)]
+    violations, checked_count = check_files(project_root, pending, stage_names,
+                                            getattr(args, 'jobs', 1), args.fail_fast)
+    elapsed = time.perf_counter() - start
+
+    skipped = len(files) - len(pending)
+    checked = f"{checked_count} files checked" + (f", {skipped} clean in cache" if skipped else '')
+    if not violations:
+        log(f"\n✅ No changes needed ({checked}, {elapsed:.2f}s)", Colors.GREEN)
+        return 0
+
+    stopped = ' (stopped at the first, --fail-fast)' if args.fail_fast else ''
+    log(f"\n❌ {len(violations)} file(s) would be changed{stopped}:", Colors.RED)
+    for violation in violations:
+        path = Path(violation.path).resolve().relative_to(project_root.resolve())
+        log(f"   {path}:{violation.line}  {violation.stage}: {violation.rule}", Colors.RED)
+    log(f"   ({checked}, {elapsed:.2f}s)", Colors.RED)
+    return 1
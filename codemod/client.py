@@ -0,0 +1,397 @@
+"""
+Which files need the 'use client' directive, from the import graph.
+
+Every module of app/, components/, hooks/ and lib/ (and any project file
+they import) is scanned once for
+
+  - its directive ('use client' or 'use server', if any);
+  - its imports, static, re-exports and import(), type-only ones dropped;
+  - client-only code: hook calls, JSX event handlers, browser globals
+    (outside `typeof` checks), createContext, class components, and being
+    an error boundary file. JSX props whose value cannot be serialized
+    are noted too (functions, class instances made with `new`, component
+    references, or identifiers bound to any of those): they cannot cross
+    from a server component to a client one.
+
+Imports are resolved like TypeScript does, with the `paths` aliases of
+tsconfig.json. The graph is then walked from the App Router entry files
+(page, layout, template, ...) through server modules. A module reached
+that way with client-only code and no directive is a boundary that is
+missing it; the walk does not enter it, so the hooks and components it
+imports are client code already and need nothing. A module with the
+directive but no client-only code of its own is unnecessary: without it,
+the module renders on the server and only its client children are sent
+to the browser (those without a directive would then need one, and are
+listed).
+
+The scan results persist in .codemod-cache/client-graph.json. A module is
+only rescanned when its size or mtime changed, so re-analysing after an
+edit costs the edited files; resolution and the walk are in memory.
+
+    python -m codemod.client
+    python -m codemod.client --fix     # add the missing directives
+    python -m codemod.client --check   # exit 1 when a directive is missing
+"""
+
+import argparse
+import json
+import os
+import re
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from codemod.cache import CACHE_DIR, read_source
+from codemod.lexer import lex
+from codemod.output import write_source
+from codemod.walk import walk_files
+
+GRAPH_VERSION = 2
+SOURCE_DIRS = ('app', 'components', 'hooks', 'lib')
+SOURCE_SUFFIXES = ('.ts', '.tsx', '.js', '.jsx', '.mts')
+RESOLVE_SUFFIXES = ('', '.ts', '.tsx', '.js', '.jsx', '.mts', '/index.ts', '/index.tsx',
+                    '/index.js', '/index.jsx')
+# Files the App Router renders or runs on its own
+ENTRY_FILE = re.compile(r'(?:page|layout|template|loading|not-found|default|error|global-error'
+                        r'|route)\.(?:tsx?|jsx?)$')
+ERROR_BOUNDARY = re.compile(r'(?:global-)?error\.(?:tsx?|jsx?)$')
+# Kinds of client-only code that make a module a client component
+CLIENT_KINDS = ('hook', 'event handler', 'browser global', 'context', 'class component',
+                'error boundary')
+# Hooks React allows in server components
+SERVER_HOOKS = {'use', 'useId'}
+
+_DIRECTIVE = re.compile(r'''\A(?:\s+|//[^\n]*\n?|/\*.*?\*/)*(["'])use (client|server)\1''',
+                        re.DOTALL)
+_IMPORT = re.compile(
+    r'''(?:^|[;}])\s*(import|export)\s+(type\s+)?(?:[\w$*{},\s]*?\bfrom\s*)?(["'])([^"'\n]+)\3''',
+    re.MULTILINE)
+_DYNAMIC_IMPORT = re.compile(r'''\bimport\s*\(\s*(["'])([^"'\n]+)\1\s*\)''')
+_FEATURES = (
+    ('hook', re.compile(r'(?<![\w$.])(?:React\.)?(use[A-Z][\w$]*)\s*(?:<[^()]*>\s*)?\(')),
+    ('event handler', re.compile(r'\s(on[A-Z][A-Za-z]*)\s*=\s*\{')),
+    ('browser global', re.compile(
+        r'(?<![\w$.])(window|document|localStorage|sessionStorage|navigator)\b(?!\s*:)')),
+    ('context', re.compile(r'(?<![\w$])(?:React\.)?(createContext)\s*[<(]')),
+    ('class component', re.compile(r'\bextends\s+(?:React\.)?((?:Pure)?Component)\b')),
+)
+# A JSX prop and its `{...}` value, when the value has no braces of its own
+_JSX_PROP = re.compile(r'\s([a-z][\w-]*)\s*=\s*\{([^{}]*)\}')
+_INLINE_UNSERIALIZABLE = re.compile(
+    r'\s*(?:new\s|function\b|async\b|(?:\([^()]*\)|[A-Za-z_$][\w$]*)\s*=>)')
+# Component (or class) references: PascalCase, not an ALL_CAPS constant
+_COMPONENT_REFERENCE = re.compile(r'\s*((?:[\w$]+\.)*[A-Z][\w$]*[a-z][\w$]*)\s*$')
+_IDENTIFIER_VALUE = re.compile(r'\s*([A-Za-z_$][\w$]*)\s*$')
+# Module bindings whose value cannot be serialized: functions, classes and
+# `new X(...)` instances
+_UNSERIALIZABLE_BINDING = re.compile(
+    r'\b(?:(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*(?::[^=;]+)?=\s*'
+    r'(?:new\s|function\b|async\b|(?:\([^()]*\)|[A-Za-z_$][\w$]*)\s*(?::[^=;]+)?=>)'
+    r'|(?:function\s*\*?|class)\s+([A-Za-z_$][\w$]*))')
+_TYPEOF = re.compile(r'\btypeof\s*$')
+_FUNCTION_BEFORE = re.compile(r'\bfunction\s*$')
+
+
+def _strip_json_comments(text: str) -> str:
+    text = re.sub(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/',
+                  lambda match: match.group(1) or '', text, flags=re.DOTALL)
+    return re.sub(r',(\s*[}\]])', r'\1', text)
+
+
+def load_aliases(project_root: Path) -> List[Tuple[str, List[Path]]]:
+    """The `paths` of tsconfig.json as (pattern, target directories or files)"""
+    try:
+        with open(project_root / 'tsconfig.json', 'r', encoding='utf-8') as f:
+            options = json.loads(_strip_json_comments(f.read())).get('compilerOptions', {})
+    except (OSError, ValueError):
+        return []
+    base = project_root / options.get('baseUrl', '.')
+    return [(pattern, [base / target for target in targets])
+            for pattern, targets in options.get('paths', {}).items()]
+
+
+def _unserializable_props(code: str) -> List[list]:
+    """JSX props given a value a server component could not hand to a client one"""
+    bindings = {match.group(1) or match.group(2)
+                for match in _UNSERIALIZABLE_BINDING.finditer(code)}
+    features = []
+    for match in _JSX_PROP.finditer(code):
+        name, value = match.group(1), match.group(2)
+        identifier = _IDENTIFIER_VALUE.match(value)
+        if _INLINE_UNSERIALIZABLE.match(value) or _COMPONENT_REFERENCE.match(value) \
+                or (identifier and identifier.group(1) in bindings):
+            features.append(['unserializable prop', name, code.count('\n', 0, match.start()) + 1])
+    return features
+
+
+def scan_module(content: str, file_name: str) -> dict:
+    """Directive, imports and client-only code of one module"""
+    source = lex(content)
+    code = source.code_view()
+    directive = _DIRECTIVE.match(content)
+
+    imports = []
+    for match in _IMPORT.finditer(content):
+        if source.in_code(match.start(1)):
+            imports.append([match.group(4), bool(match.group(2))])
+    for match in _DYNAMIC_IMPORT.finditer(content):
+        if source.in_code(match.start()):
+            imports.append([match.group(2), False])
+
+    features = []
+    seen = set()
+    for kind, pattern in _FEATURES:
+        for match in pattern.finditer(code):
+            name = match.group(1)
+            before = code[max(0, match.start() - 12):match.start()]
+            if kind == 'hook' and (name in SERVER_HOOKS or _FUNCTION_BEFORE.search(before)):
+                continue
+            if kind == 'browser global' and _TYPEOF.search(before):
+                continue
+            if (kind, name) in seen:
+                continue
+            seen.add((kind, name))
+            features.append([kind, name, code.count('\n', 0, match.start()) + 1])
+    if ERROR_BOUNDARY.search(file_name):
+        features.append(['error boundary', file_name, 1])
+    features.extend(_unserializable_props(code))
+
+    return {
+        'directive': directive.group(2) if directive else None,
+        'imports': imports,
+        'features': features,
+    }
+
+
+class Finding(NamedTuple):
+    path: str
+    reasons: List[Tuple[str, str, int]]  # kind, name, line
+    via: Optional[str]  # the server module it was reached from
+    children: List[str]  # for unnecessary directives: client children lacking one
+
+
+class ClientReport(NamedTuple):
+    missing: List[Finding]
+    unnecessary: List[Finding]
+    boundaries: List[str]  # modules with the directive reached from server code
+    server: List[str]  # modules rendered on the server
+    modules: int
+    rescanned: int
+
+
+class ClientGraph:
+    """Persistent import graph of a project's modules, with their client-only code"""
+
+    def __init__(self, project_root: Path):
+        self.project_root = project_root.resolve()
+        self.path = self.project_root / CACHE_DIR / 'client-graph.json'
+        self.aliases = load_aliases(self.project_root)
+        self.entries: Dict[str, dict] = {}
+        self.rescanned = 0
+        self.dirty = False
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    graph = json.load(f)
+                if graph.get('version') == GRAPH_VERSION:
+                    self.entries = graph.get('files', {})
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def _key(self, file_path: Path) -> str:
+        return Path(file_path).resolve().relative_to(self.project_root).as_posix()
+
+    def _scan(self, key: str) -> bool:
+        """Rescan a module if it changed; whether it (still) exists"""
+        file_path = self.project_root / key
+        entry = self.entries.get(key)
+        try:
+            stat = os.stat(file_path)
+            if entry is not None and entry['size'] == stat.st_size \
+                    and entry['mtime_ns'] == stat.st_mtime_ns:
+                return True
+            content, (size, mtime_ns, _) = read_source(file_path)
+        except (OSError, UnicodeDecodeError):
+            if self.entries.pop(key, None) is not None:
+                self.dirty = True
+            return False
+
+        self.entries[key] = {'size': size, 'mtime_ns': mtime_ns,
+                             **scan_module(content, file_path.name)}
+        self.rescanned += 1
+        self.dirty = True
+        return True
+
+    def refresh(self, files: Optional[Iterable[Path]] = None):
+        """Bring the graph up to date, following imports out of the source directories"""
+        if files is None:
+            files = [path for name in SOURCE_DIRS if (self.project_root / name).is_dir()
+                     for path in walk_files(self.project_root / name, SOURCE_SUFFIXES,
+                                            project_root=self.project_root)]
+        pending = deque(self._key(path) for path in files)
+        seen = set()
+        while pending:
+            key = pending.popleft()
+            if key in seen:
+                continue
+            seen.add(key)
+            if self._scan(key):
+                pending.extend(target for target, _ in self.imports(key) if target not in seen)
+
+        for key in set(self.entries) - seen:
+            del self.entries[key]
+            self.dirty = True
+
+    def resolve(self, importer: str, specifier: str) -> Optional[str]:
+        """Project-relative path of the module a specifier imports, if it is a project file"""
+        if specifier.startswith('.'):
+            bases = [(self.project_root / importer).parent / specifier]
+        else:
+            bases = []
+            for pattern, targets in self.aliases:
+                prefix, star, suffix = pattern.partition('*')
+                if star and specifier.startswith(prefix) and specifier.endswith(suffix):
+                    rest = specifier[len(prefix):len(specifier) - len(suffix)]
+                    bases += [Path(str(target).replace('*', rest)) for target in targets]
+                elif specifier == pattern:
+                    bases += targets
+        for base in bases:
+            for suffix in RESOLVE_SUFFIXES:
+                candidate = Path(os.path.normpath(f'{base}{suffix}'))
+                if candidate.suffix in SOURCE_SUFFIXES and candidate.is_file():
+                    try:
+                        return candidate.relative_to(self.project_root).as_posix()
+                    except ValueError:
+                        return None
+        return None
+
+    def imports(self, key: str) -> List[Tuple[str, bool]]:
+        """(module, type only) of every project module key imports"""
+        resolved = []
+        for specifier, type_only in self.entries.get(key, {}).get('imports', []):
+            target = self.resolve(key, specifier)
+            if target is not None:
+                resolved.append((target, type_only))
+        return resolved
+
+    def analyze(self) -> ClientReport:
+        """Walk from the entry files through server modules"""
+        def client_reasons(key: str) -> List[Tuple[str, str, int]]:
+            return [tuple(feature) for feature in self.entries[key]['features']
+                    if feature[0] in CLIENT_KINDS]
+
+        entries = sorted(key for key in self.entries
+                         if key.startswith('app/') and ENTRY_FILE.search(key))
+        server, boundaries, missing = [], set(), []
+        via: Dict[str, Optional[str]] = {key: None for key in entries}
+        pending = deque(entries)
+        seen = set(entries)
+        while pending:
+            key = pending.popleft()
+            entry = self.entries[key]
+            if entry['directive'] == 'client':
+                boundaries.add(key)
+                continue
+            reasons = client_reasons(key) if entry['directive'] != 'server' else []
+            if reasons:
+                missing.append(Finding(key, reasons, via[key], []))
+                continue
+            server.append(key)
+            for target, type_only in self.imports(key):
+                if not type_only and target not in seen:
+                    seen.add(target)
+                    via[target] = key
+                    pending.append(target)
+
+        unnecessary = []
+        for key, entry in sorted(self.entries.items()):
+            if entry['directive'] != 'client' or client_reasons(key):
+                continue
+            if any(feature[0] == 'unserializable prop' for feature in entry['features']):
+                continue  # its props could not be passed to client children
+            children = [target for target, type_only in self.imports(key)
+                        if not type_only and client_reasons(target)
+                        and self.entries[target]['directive'] != 'client']
+            unnecessary.append(Finding(key, [], None, children))
+
+        return ClientReport(missing, unnecessary, sorted(boundaries), sorted(server),
+                            len(self.entries), self.rescanned)
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': GRAPH_VERSION, 'files': self.entries}, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+def add_directive(file_path: Path) -> bool:
+    """Put "use client"; at the top of a module"""
+    content, _ = read_source(file_path)
+    return write_source(file_path, '"use client";\n\n' + content)
+
+
+def _describe(reasons: List[Tuple[str, str, int]]) -> str:
+    shown = [f"{name} ({kind}, line {line})" for kind, name, line in reasons[:3]]
+    if len(reasons) > 3:
+        shown.append(f"+{len(reasons) - 3} more")
+    return ', '.join(shown)
+
+
+def print_report(report: ClientReport):
+    print(f"{report.modules} modules ({report.rescanned} rescanned): {len(report.server)} "
+          f"server, {len(report.boundaries)} client boundaries reached from server code")
+
+    print(f"\nMissing 'use client' ({len(report.missing)}):")
+    for finding in report.missing:
+        via = f" (imported by {finding.via})" if finding.via else ''
+        print(f"  {finding.path}{via}: {_describe(finding.reasons)}")
+
+    print(f"\nUnnecessary 'use client' ({len(report.unnecessary)}):")
+    for finding in report.unnecessary:
+        children = (f"; then needed in {', '.join(finding.children)}"
+                    if finding.children else '')
+        print(f"  {finding.path}{children}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find modules missing 'use client' and ones "
+                                                 "that have it for nothing")
+    parser.add_argument('--fix', action='store_true', help="add the missing directives")
+    parser.add_argument('--check', action='store_true',
+                        help="exit 1 when a module is missing the directive")
+    parser.add_argument('--json', type=Path, metavar='PATH', help='write the report as JSON')
+    args = parser.parse_args()
+
+    project_root = Path.cwd()
+    graph = ClientGraph(project_root)
+    graph.refresh()
+    graph.save()
+    report = graph.analyze()
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'missing': [finding._asdict() for finding in report.missing],
+                'unnecessary': [finding._asdict() for finding in report.unnecessary],
+                'boundaries': report.boundaries,
+                'server': report.server,
+            }, f, indent=2)
+
+    if args.fix and report.missing:
+        for finding in report.missing:
+            add_directive(project_root / finding.path)
+        graph.refresh()
+        graph.save()
+        print(f"\nAdded the directive to {len(report.missing)} files")
+    elif args.check and report.missing:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""
+Coloured console output shared by the fixer scripts and tools.
+"""
+
+import contextlib
+import os
+
+
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    MAGENTA = '\033[95m'
+    END = '\033[0m'
+
+
+def log(message: str, color: str = Colors.BLUE):
+    print(f"{color}{message}{Colors.END}")
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool = True):
+    """Discard everything printed inside the block when enabled (--quiet)"""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
@@ -0,0 +1,304 @@
+"""
+Linear-time index of `type` and `interface` declarations.
+
+scan_declarations() walks a file once and records every top-level or
+nested `type X = ...` and `interface X ...` with its exact span. Object
+bodies are matched by counting the braces the lexer places in code, so
+nested object types, braces inside string literal types and comments do
+not cut a declaration short the way `{[^}]+}` does. Files without a
+declaration keyword are never lexed. The result is a table
+keyed by name, which rules query instead of running one regex per
+candidate type name.
+
+build_symbol_table() does the same across a tree, and shape_matches()
+reports custom object types whose members all exist on the Row of a
+Supabase table, i.e. candidates for `Tables<"...">`.
+
+    python -m codemod.declarations [DIR ...]
+"""
+
+import argparse
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Match, NamedTuple, Optional, Tuple
+
+from codemod.lexer import SourceMap, lex
+from codemod.schema import Schema, load_schema, parse_object
+from codemod.walk import walk_files
+
+# Matched only where str.find() lands on a keyword, which is several times
+# faster than letting the regex scan; `export` (and `declare`) is looked
+# for behind a match
+_DECLARATION = re.compile(r'(type|interface)\s+([A-Za-z_$][\w$]*)\s*')
+_EXPORT_BEFORE = re.compile(r'(?<![\w$.])export\s+(?:declare\s+)?$')
+_BRACE = re.compile(r'[{}]')
+# A union or intersection continued on the next line
+_CONTINUATION = re.compile(r'\s*[|&]')
+# Characters a comment, string, template or regex literal starts with
+_REGION_START = set('/\'"`')
+
+
+class Declaration(NamedTuple):
+    name: str
+    kind: str  # 'type' or 'interface'
+    # From the `type`/`interface` keyword (after any `export`) to just past
+    # the closing brace of the body, or to the end of the aliased type
+    start: int
+    end: int
+    # Offset of the body's `{`, or -1 when the declaration has no object body
+    body_start: int
+    exported: bool
+    params: str  # type parameters, e.g. '<T>'
+    extends: str  # interface heritage, e.g. 'extends Base'
+    members: Tuple[str, ...]  # top-level member names of the object body
+
+    @property
+    def has_body(self) -> bool:
+        return self.body_start >= 0
+
+    @property
+    def is_plain(self) -> bool:
+        """An object type with no type parameters and nothing inherited"""
+        return self.has_body and not self.params and not self.extends
+
+
+class DeclarationTable:
+    """The declarations of one source string, by name"""
+
+    def __init__(self, declarations: List[Declaration]):
+        self.declarations = declarations
+        self.by_name: Dict[str, List[Declaration]] = {}
+        for declaration in declarations:
+            self.by_name.setdefault(declaration.name, []).append(declaration)
+
+    def __iter__(self):
+        return iter(self.declarations)
+
+    def __len__(self) -> int:
+        return len(self.declarations)
+
+    def find(self, name: str, kind: Optional[str] = None) -> List[Declaration]:
+        """Declarations of `name`, optionally only of one kind"""
+        found = self.by_name.get(name, [])
+        if kind is not None:
+            found = [declaration for declaration in found if declaration.kind == kind]
+        return found
+
+
+def _skip_space(content: str, source: SourceMap, i: int) -> int:
+    """Index of the first character at or after i that is neither space nor comment"""
+    length = len(content)
+    while i < length:
+        if content[i].isspace():
+            i += 1
+            continue
+        region = source.region_at(i) if content[i] == '/' else None
+        if region is None:
+            break
+        i = region[1]
+    return i
+
+
+def _match_brace(content: str, source: SourceMap, open_at: int) -> int:
+    """Index just past the `}` closing the `{` at open_at (or len(content)),
+    counting only braces in code"""
+    depth = 0
+    for match in _BRACE.finditer(content, open_at):
+        if not source.in_code(match.start()):
+            continue
+        if match.group() == '{':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return len(content)
+
+
+def _skip_angles(content: str, source: SourceMap, i: int) -> int:
+    """Index just past a `<...>` type parameter list starting at i"""
+    depth = 0
+    length = len(content)
+    while i < length:
+        char = content[i]
+        region = source.region_at(i) if char in _REGION_START else None
+        if region is not None:
+            i = region[1]
+            continue
+        if char == '<':
+            depth += 1
+        elif char == '>' and content[i - 1] != '=':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return length
+
+
+def _alias_end(content: str, source: SourceMap, i: int) -> int:
+    """End of a non-object type alias: `;` or a line break outside brackets"""
+    depth = 0
+    length = len(content)
+    while i < length:
+        char = content[i]
+        region = source.region_at(i) if char in _REGION_START else None
+        if region is not None:
+            i = region[1]
+            continue
+        if char in '([{<':
+            depth += 1
+        elif char in ')]}>' and not (char == '>' and content[i - 1] == '='):
+            depth = max(depth - 1, 0)
+        elif char == ';' and depth == 0:
+            return i
+        elif char == '\n' and depth == 0 and not _CONTINUATION.match(content, i):
+            return i
+        i += 1
+    return i
+
+
+def _body_start(content: str, source: SourceMap, i: int) -> int:
+    """Offset of the first `{` in code at or after i, or -1"""
+    i = content.find('{', i)
+    while i >= 0 and not source.in_code(i):
+        i = content.find('{', i + 1)
+    return i
+
+
+def _candidates(content: str) -> List[Match]:
+    """`type X`/`interface X` matches not preceded by an identifier or `.`, in order"""
+    matches = []
+    for keyword in ('type', 'interface'):
+        i = content.find(keyword)
+        while i >= 0:
+            before = content[i - 1] if i else ' '
+            if not (before.isalnum() or before in '_$.'):
+                match = _DECLARATION.match(content, i)
+                if match is not None:
+                    matches.append(match)
+            i = content.find(keyword, i + 1)
+    matches.sort(key=lambda match: match.start())
+    return matches
+
+
+@lru_cache(maxsize=32)
+def scan_declarations(content: str) -> DeclarationTable:
+    """Every type alias and interface in content, in source order"""
+    declarations = []
+    if 'type ' not in content and 'interface ' not in content:
+        return DeclarationTable(declarations)
+
+    # The declaration regex runs over the raw text; the file is only lexed
+    # once a candidate turns up, to drop those in comments and strings
+    source = None
+    for match in _candidates(content):
+        if source is None:
+            source = lex(content)
+        if not source.in_code(match.start()):
+            continue
+        kind, name = match.group(1), match.group(2)
+        exported = _EXPORT_BEFORE.search(content, max(0, match.start() - 24), match.start())
+        i = _skip_space(content, source, match.end())
+        params = ''
+        if content.startswith('<', i):
+            end = _skip_angles(content, source, i)
+            params = ' '.join(source.code_view(i, end).split())
+            i = _skip_space(content, source, end)
+
+        extends = ''
+        if kind == 'type':
+            if not content.startswith('=', i):
+                continue  # `type` used as an identifier, e.g. `{ type: ... }`
+            i = _skip_space(content, source, i + 1)
+            body_start = i if content.startswith('{', i) else -1
+        else:
+            body_start = _body_start(content, source, i)
+            if body_start < 0:
+                continue
+            extends = ' '.join(source.code_view(i, body_start).split())
+            if extends and not extends.startswith('extends'):
+                continue
+
+        if body_start >= 0:
+            end = _match_brace(content, source, body_start)
+            members = tuple(parse_object(source.code_view(body_start, end), 0)[0].members)
+        else:
+            end = _alias_end(content, source, i)
+            members = ()
+
+        declarations.append(Declaration(name, kind, match.start(), end, body_start,
+                                        bool(exported), params, extends, members))
+
+    return DeclarationTable(declarations)
+
+
+def build_symbol_table(files: Iterable[Path]) -> Dict[str, List[Tuple[Path, Declaration]]]:
+    """Every declaration across files, by name"""
+    symbols: Dict[str, List[Tuple[Path, Declaration]]] = {}
+    for file_path in files:
+        try:
+            content = Path(file_path).read_text(encoding='utf-8')
+        except (OSError, UnicodeDecodeError):
+            continue
+        for declaration in scan_declarations(content):
+            symbols.setdefault(declaration.name, []).append((file_path, declaration))
+    return symbols
+
+
+def shape_match(declaration: Declaration, schema: Schema,
+                min_members: int = 2) -> Optional[Tuple[str, int, int]]:
+    """(table, members, Row columns) of the best table whose Row has every member
+
+    Tables covering more of their Row with the declaration win; None when
+    no Row has all the members.
+    """
+    if not declaration.is_plain or len(declaration.members) < min_members:
+        return None
+
+    members = set(declaration.members)
+    best = None
+    for table in schema.tables.values():
+        if members <= set(table.row):
+            coverage = len(members) / len(table.row)
+            if best is None or coverage > best[0]:
+                best = (coverage, table.name, len(table.row))
+    if best is None:
+        return None
+    return best[1], len(members), best[2]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='List type/interface declarations shaped like a Supabase Row')
+    parser.add_argument('directories', nargs='*', type=Path,
+                        default=[Path('app'), Path('components'), Path('hooks'), Path('lib')])
+    args = parser.parse_args()
+
+    schema = load_schema()
+    files = [f for directory in args.directories if directory.exists()
+             for f in walk_files(directory)]
+    symbols = build_symbol_table(files)
+    total = sum(len(entries) for entries in symbols.values())
+    print(f"{total} declarations ({len(symbols)} names) in {len(files)} files")
+
+    matches = []
+    for name, entries in sorted(symbols.items()):
+        for file_path, declaration in entries:
+            found = shape_match(declaration, schema)
+            if found is not None:
+                matches.append((file_path, declaration, found))
+
+    if not matches:
+        print("No custom types match a Tables<...> Row")
+        return
+    print(f"\n{len(matches)} custom types match a Tables<...> Row:")
+    for file_path, declaration, (table, members, columns) in matches:
+        mapped = schema.table_for_type(declaration.name)
+        note = '' if mapped == table else f"  (name maps to {mapped})" if mapped else ''
+        print(f"  {file_path}: {declaration.kind} {declaration.name} -> "
+              f"Tables<\"{table}\"> ({members}/{columns} columns){note}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,381 @@
+"""
+Responsive derivatives of the referenced images.
+
+For every raster image a plain <img> tag in the sources uses as its
+literal src (`src="/..."` or `src={"/..."}`), the only tags fix-all-types
+can give a srcSet, build resizes at the --widths steps below its intrinsic width, plus one at its
+own width (capped at the largest step), in each of --formats. Encoding is
+done by a command-line encoder found on PATH or in node_modules/.bin:
+libvips (`vips thumbnail`), ImageMagick, or cwebp for WebP only. Each
+format goes to the first encoder that can write it.
+
+Encoded files live in a content-addressed cache under
+.codemod-cache/derivatives/, keyed on the source's content hash, the
+encoder, the format, the width and the quality. A source whose bytes did
+not change is never encoded again, whatever its name or mtime. Missing
+entries are encoded in a process pool.
+
+The derivatives are then published to public/_img/ under names that
+carry the source hash, so they can be served as immutable, and stale ones
+are removed. manifest.json next to them lists, per source, its size and
+its variants per format; fix-all-types reads it to give those <img> tags
+a srcSet and sizes. next/image <Image> elements are resized by Next.js
+itself and are left out.
+
+    python -m codemod.derivatives --jobs 0
+    python -m codemod.derivatives --formats webp,avif --widths 640,1080,1920
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from codemod import stats
+from codemod.assets import SOURCE_DIRS, resolve_literal
+from codemod.cache import CACHE_DIR, read_source
+from codemod.images import DERIVATIVES_DIR, ImageIndex, load_images
+from codemod.lexer import finditer_code
+from codemod.output import write_source
+from codemod.parallel import map_files
+from codemod.scripts import PROJECT_ROOT
+from codemod.walk import walk_files
+
+# Next.js' default deviceSizes up to 1920
+DEFAULT_WIDTHS = (640, 750, 828, 1080, 1200, 1920)
+# What Manifest.src_set picks first; further formats are built but never referenced
+DEFAULT_FORMATS = ('webp',)
+DEFAULT_QUALITY = 75
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+SOURCE_FORMATS = ('jpeg', 'png', 'webp')
+TAG_SUFFIXES = ('.tsx', '.jsx', '.ts', '.js')
+
+# A plain <img> with a literal root-relative src: group 1 runs up to the end
+# of the src attribute, group 4 is the path
+IMG_TAG = re.compile(r'''(<img\b[^<>]*?\ssrc=(\{\s*)?(["'])(/[^"'\n]+)\3(?(2)\s*\}))'''
+                     r'[^<>]*?/?>')
+
+
+class Encoder(NamedTuple):
+    name: str
+    executable: str
+    formats: Tuple[str, ...]
+
+
+class Variant(NamedTuple):
+    format: str
+    width: int
+    height: int
+    key: str  # content address in the cache
+    url: str
+
+
+class Task(NamedTuple):
+    encoder: Encoder
+    source: Path
+    target: Path
+    width: int
+    quality: int
+
+
+def _find_tool(name: str) -> Optional[str]:
+    for candidate in (PROJECT_ROOT / 'node_modules' / '.bin' / name, shutil.which(name)):
+        if candidate and Path(candidate).exists():
+            return str(candidate)
+    return None
+
+
+def _listing(command: List[str]) -> str:
+    try:
+        return subprocess.run(command, capture_output=True, text=True, timeout=30).stdout
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def find_encoders() -> List[Encoder]:
+    """Encoders available here, best first, with the formats each can write"""
+    encoders = []
+    vips = _find_tool('vips')
+    if vips:
+        savers = _listing([vips, '-l', 'foreign'])
+        formats = tuple(name for name, saver in (('avif', 'heifsave'), ('webp', 'webpsave'))
+                        if saver in savers)
+        if formats:
+            encoders.append(Encoder('vips', vips, formats))
+    magick = _find_tool('magick') or _find_tool('convert')
+    if magick:
+        listing = _listing([magick, '-list', 'format'])
+        # Rows read `  WEBP* WEBP  rw+  WebP Image Format`: name, module, mode
+        formats = tuple(name for name in ('avif', 'webp')
+                        if re.search(rf'^\s*{name.upper()}\*?\s+\S+\s+\S*w', listing, re.M))
+        if formats:
+            encoders.append(Encoder('magick', magick, formats))
+    cwebp = _find_tool('cwebp')
+    if cwebp:
+        encoders.append(Encoder('cwebp', cwebp, ('webp',)))
+    return encoders
+
+
+def encode_command(task: Task) -> List[str]:
+    """Command line that writes task.target, task.width wide, from task.source"""
+    encoder, source, target = task.encoder, str(task.source), str(task.target)
+    if encoder.name == 'vips':
+        return [encoder.executable, 'thumbnail', source, f'{target}[Q={task.quality},strip]',
+                str(task.width), '--size', 'down']
+    if encoder.name == 'magick':
+        return [encoder.executable, source, '-auto-orient', '-strip', '-resize',
+                f'{task.width}x>', '-quality', str(task.quality), target]
+    if encoder.name == 'cwebp':
+        return [encoder.executable, '-quiet', '-metadata', 'none', '-q', str(task.quality),
+                '-resize', str(task.width), '0', source, '-o', target]
+    raise ValueError(f"unknown encoder: {encoder.name!r}")
+
+
+def _encode(task: Task) -> Optional[str]:
+    """Run one encoding into the cache; the error, if it failed"""
+    temp = task.target.with_name(f'.{task.target.name}.{os.getpid()}.tmp{task.target.suffix}')
+    try:
+        result = subprocess.run(encode_command(task._replace(target=temp)),
+                                capture_output=True, text=True)
+        if result.returncode != 0 or not temp.exists():
+            output = (result.stderr or result.stdout).strip().splitlines()
+            return output[-1] if output else f"exit status {result.returncode}"
+        os.replace(temp, task.target)
+        return None
+    except OSError as e:
+        return str(e)
+    finally:
+        if temp.exists():
+            temp.unlink()
+
+
+def variant_widths(width: int, steps: Sequence[int]) -> List[int]:
+    """The steps narrower than an image, and the image's own width up to the largest step"""
+    largest = min(width, max(steps))
+    return [step for step in sorted(steps) if step < largest] + [largest]
+
+
+def _key(source_sha: str, encoder: Encoder, format: str, width: int, quality: int) -> str:
+    return hashlib.sha256(f"{source_sha}:{encoder.name}:{format}:{width}:{quality}".encode()
+                          ).hexdigest()[:32]
+
+
+class Build(NamedTuple):
+    manifest: dict
+    encoded: int
+    reused: int
+    failed: List[Tuple[Task, str]]
+    seconds: float
+
+
+def referenced_images(project_root: Path, images: ImageIndex) -> List[str]:
+    """Raster images used as the literal src of a plain <img> tag"""
+    used = set()
+    for name in SOURCE_DIRS:
+        directory = project_root / name
+        if not directory.is_dir():
+            continue
+        for file_path in walk_files(directory, TAG_SUFFIXES, project_root=project_root):
+            try:
+                content, _ = read_source(file_path)
+            except (OSError, UnicodeDecodeError):
+                continue
+            if '<img' in content:
+                used.update(resolve_literal(match.group(4))
+                            for match in finditer_code(IMG_TAG, content))
+    return [path for path, info in images.images.items()
+            if path in used and info is not None and info.format in SOURCE_FORMATS]
+
+
+def build(project_root: Path, widths: Sequence[int] = DEFAULT_WIDTHS,
+          formats: Sequence[str] = DEFAULT_FORMATS, quality: int = DEFAULT_QUALITY,
+          encoders: Optional[List[Encoder]] = None, jobs: int = 1,
+          cache_dir: Optional[Path] = None) -> Build:
+    """Encode what the cache lacks, publish the derivatives and write the manifest"""
+    start = time.perf_counter()
+    encoders = find_encoders() if encoders is None else encoders
+    by_format = {}
+    for format in formats:
+        encoder = next((encoder for encoder in encoders if format in encoder.formats), None)
+        if encoder is not None:
+            by_format[format] = encoder
+    if not by_format:
+        raise RuntimeError(f"no encoder for {', '.join(formats)} found "
+                           f"(install libvips, ImageMagick or cwebp)")
+
+    cache_dir = cache_dir or project_root / CACHE_DIR / 'derivatives'
+    output_dir = project_root / DERIVATIVES_DIR
+    url_prefix = '/' + Path(DERIVATIVES_DIR).relative_to('public').as_posix()
+    images = load_images(project_root, jobs)
+
+    entries, tasks, reused = {}, {}, 0
+    for path in referenced_images(project_root, images):
+        info, sha256 = images.get(path), images.hashes[path]
+        variants = {}
+        for format, encoder in by_format.items():
+            variants[format] = []
+            for width in variant_widths(info.width, widths):
+                key = _key(sha256, encoder, format, width, quality)
+                target = cache_dir / key[:2] / f'{key}.{format}'
+                if target.exists():
+                    reused += 1
+                elif target not in tasks:
+                    tasks[target] = Task(encoder, project_root / path, target, width, quality)
+                name = f'{Path(path).stem}-{sha256[:10]}-{width}.{format}'
+                variants[format].append(Variant(format, width,
+                                                round(info.height * width / info.width), key,
+                                                f'{url_prefix}/{name}'))
+        entries[path] = (info, sha256, variants)
+
+    for target in {task.target.parent for task in tasks.values()}:
+        target.mkdir(parents=True, exist_ok=True)
+    pending = list(tasks.values())
+    errors = map_files(_encode, pending, jobs)
+    failed = [(task, error) for task, error in zip(pending, errors) if error]
+    stats.counters[('derivatives', 'encoded')] += len(pending) - len(failed)
+    stats.counters[('derivatives', 'reused')] += reused
+
+    manifest = {'version': MANIFEST_VERSION, 'quality': quality, 'images': {}}
+    published = set()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for path, (info, sha256, variants) in entries.items():
+        listed = {}
+        for format, format_variants in variants.items():
+            listed[format] = []
+            for variant in format_variants:
+                cached = cache_dir / variant.key[:2] / f'{variant.key}.{format}'
+                if not cached.exists():
+                    continue
+                name = variant.url.rsplit('/', 1)[-1]
+                _publish(cached, output_dir / name)
+                published.add(name)
+                listed[format].append([variant.width, variant.height, variant.url])
+        manifest['images'][path] = {'width': info.width, 'height': info.height,
+                                    'sha256': sha256, 'variants': listed}
+
+    for stale in output_dir.iterdir():
+        if stale.is_file() and stale.name != MANIFEST_NAME and stale.name not in published:
+            stale.unlink()
+    write_source(output_dir / MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True) + '\n')
+    _manifests.pop(project_root.resolve(), None)
+
+    return Build(manifest, len(pending) - len(failed), reused, failed,
+                 time.perf_counter() - start)
+
+
+def _publish(cached: Path, target: Path):
+    """Hard-link (or copy) a cached derivative into the output directory"""
+    try:
+        if os.path.samefile(cached, target) or (
+                target.stat().st_size == cached.stat().st_size
+                and target.read_bytes() == cached.read_bytes()):
+            return
+        target.unlink()
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(cached, target)
+    except OSError:
+        shutil.copyfile(cached, target)
+
+
+class Manifest:
+    """The derivatives manifest of a project, for the fixers"""
+
+    def __init__(self, data: dict, digest: str):
+        self.images = data.get('images', {})
+        self.digest = digest
+
+    def src_set(self, path: str, preferred: Sequence[str] = ('webp', 'avif')) -> Optional[
+            Tuple[str, int]]:
+        """srcSet of an image in the first format listed for it, and its widest variant"""
+        entry = self.images.get(path)
+        if entry is None:
+            return None
+        for format in preferred:
+            variants = entry['variants'].get(format)
+            if variants:
+                return (', '.join(f'{url} {width}w' for width, _, url in variants),
+                        max(width for width, _, _ in variants))
+        return None
+
+
+def _load_manifest(project_root: Path) -> Manifest:
+    try:
+        with open(project_root / DERIVATIVES_DIR / MANIFEST_NAME, 'rb') as f:
+            data = f.read()
+        manifest = json.loads(data)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return Manifest(manifest, hashlib.sha256(data).hexdigest())
+    except (OSError, ValueError):
+        pass
+    return Manifest({}, '')
+
+
+_manifests: Dict[Path, Tuple[Optional[Tuple[int, int]], Manifest]] = {}
+
+
+def load_manifest(project_root: Optional[Path] = None) -> Manifest:
+    """The manifest of a project (default: the current directory), read
+    again whenever the file's size or mtime changes"""
+    root = Path(project_root or Path.cwd()).resolve()
+    try:
+        stat = (root / DERIVATIVES_DIR / MANIFEST_NAME).stat()
+        stamp = (stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        stamp = None
+    cached = _manifests.get(root)
+    if cached is None or cached[0] != stamp:
+        cached = _manifests[root] = (stamp, _load_manifest(root))
+    return cached[1]
+
+
+def _list(value: str) -> List[str]:
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build responsive derivatives of the '
+                                                 'referenced images')
+    parser.add_argument('--jobs', '-j', type=int, default=0,
+                        help='number of worker processes, 0 for one per CPU (default: 0)')
+    parser.add_argument('--widths', type=lambda value: [int(part) for part in _list(value)],
+                        default=list(DEFAULT_WIDTHS),
+                        help=f"width steps (default: {','.join(map(str, DEFAULT_WIDTHS))})")
+    parser.add_argument('--formats', type=_list, default=list(DEFAULT_FORMATS),
+                        help=f"output formats (default: {','.join(DEFAULT_FORMATS)})")
+    parser.add_argument('--quality', type=int, default=DEFAULT_QUALITY)
+    parser.add_argument('--encoder', choices=('vips', 'magick', 'cwebp'),
+                        help='use only this encoder')
+    args = parser.parse_args()
+
+    encoders = [encoder for encoder in find_encoders()
+                if args.encoder is None or encoder.name == args.encoder]
+    project_root = Path.cwd()
+    try:
+        result = build(project_root, args.widths, args.formats, args.quality, encoders,
+                       args.jobs)
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+
+    images = result.manifest['images']
+    variants = sum(len(listed) for entry in images.values()
+                   for listed in entry['variants'].values())
+    print(f"{len(images)} images, {variants} derivatives: {result.encoded} encoded, "
+          f"{result.reused} from the cache, in {result.seconds:.2f}s")
+    for task, error in result.failed:
+        print(f"  failed: {task.source.relative_to(project_root)} at {task.width}px "
+              f"({task.encoder.name}): {error}")
+    if result.failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
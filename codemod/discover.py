@@ -0,0 +1,60 @@
+"""
+Read-once discovery with a literal prefilter.
+
+scan_sources() opens every candidate file exactly once and checks the raw
+bytes for a literal before anything is decoded. Files at or above
+MMAP_THRESHOLD are searched through a memory map, so a large file that
+does not contain the literal is never copied into a Python string at all.
+Matching files are yielded together with their decoded text, which the
+caller hands straight to process_file instead of reading the file again.
+"""
+
+import hashlib
+import mmap
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from codemod.cache import FileStamp
+
+MMAP_THRESHOLD = 64 * 1024
+
+
+class ScannedFile(NamedTuple):
+    path: Path
+    stamp: FileStamp
+    # Decoded text (universal newlines) when the literal was found, else None
+    content: Optional[str]
+
+
+def _decode(data) -> str:
+    return bytes(data).decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def scan_file(file_path: Path, literal: bytes) -> ScannedFile:
+    """Read one file and decode it only if it contains the literal"""
+    with open(file_path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+
+        if stat.st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                stamp = (stat.st_size, stat.st_mtime_ns, hashlib.sha256(mapped).hexdigest())
+                if mapped.find(literal) == -1:
+                    return ScannedFile(file_path, stamp, None)
+                return ScannedFile(file_path, stamp, _decode(mapped))
+
+        data = f.read()
+
+    stamp = (stat.st_size, stat.st_mtime_ns, hashlib.sha256(data).hexdigest())
+    if literal not in data:
+        return ScannedFile(file_path, stamp, None)
+    return ScannedFile(file_path, stamp, _decode(data))
+
+
+def scan_sources(paths: Iterable[Path], literal: bytes) -> Iterator[ScannedFile]:
+    """Stream scan results for every readable file in paths"""
+    for file_path in paths:
+        try:
+            yield scan_file(file_path, literal)
+        except (OSError, UnicodeDecodeError):
+            continue
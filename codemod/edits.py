@@ -0,0 +1,69 @@
+"""
+Span-based edit buffer.
+
+Rules record replacements as (start, end, text) spans against the content
+they matched, instead of calling content.replace() once per match. apply()
+then builds the result in one linear pass. Spans always refer to the
+original string, so later matches never see text rewritten by earlier ones.
+"""
+
+import bisect
+from typing import List, Tuple
+
+from codemod import instrument
+
+
+class EditBuffer:
+    """Non-overlapping edits against one source string"""
+
+    def __init__(self, content: str):
+        self.content = content
+        self.starts: List[int] = []
+        self.edits: List[Tuple[int, int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.edits)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """Check a span against the edits already recorded"""
+        index = bisect.bisect_left(self.starts, start)
+        if index < len(self.edits):
+            next_start, next_end, _ = self.edits[index]
+            if next_start < end or next_start == start:
+                return True
+        if index > 0:
+            _, previous_end, _ = self.edits[index - 1]
+            if previous_end > start:
+                return True
+        return False
+
+    def replace(self, start: int, end: int, text: str) -> bool:
+        """Record a replacement; returns False (and records nothing) on overlap"""
+        if not 0 <= start <= end <= len(self.content):
+            raise ValueError(f"edit span {start}:{end} outside content")
+        if self.overlaps(start, end):
+            return False
+
+        index = bisect.bisect_left(self.starts, start)
+        self.starts.insert(index, start)
+        self.edits.insert(index, (start, end, text))
+        instrument.count('edits')
+        return True
+
+    def insert(self, position: int, text: str) -> bool:
+        """Record an insertion before the character at position"""
+        return self.replace(position, position, text)
+
+    def apply(self) -> str:
+        """Build the edited content in a single pass"""
+        if not self.edits:
+            return self.content
+
+        pieces = []
+        cursor = 0
+        for start, end, text in self.edits:
+            pieces.append(self.content[cursor:start])
+            pieces.append(text)
+            cursor = end
+        pieces.append(self.content[cursor:])
+        return ''.join(pieces)
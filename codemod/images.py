@@ -0,0 +1,344 @@
+"""
+Intrinsic size of the project's images, read from their headers.
+
+probe() reads only as much of a file as its format needs to state its
+size: the IHDR chunk of a PNG, the logical screen of a GIF, the VP8, VP8L
+or VP8X header of a WebP, the start of an SVG up to its root element, and
+for a JPEG the markers up to the first SOF, seeking over every other
+segment (an EXIF orientation that rotates the picture swaps the two).
+Nothing is decoded.
+
+load_images() indexes assets/ and public/. Results are stored under
+.codemod-cache/ by content hash: a file whose size and mtime are unchanged
+is not opened, and one whose bytes were already probed under another name
+or mtime is not probed again. Files that need probing are spread over a
+process pool.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, List, NamedTuple, Optional, Tuple
+
+from codemod import stats
+from codemod.cache import CACHE_DIR
+from codemod.parallel import map_files
+from codemod.walk import EXCLUDED_DIRS, walk_files
+
+IMAGE_DIRS = ('assets', 'public')
+# Generated by codemod.derivatives; not sources
+DERIVATIVES_DIR = 'public/_img'
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg')
+IMAGES_VERSION = 1
+
+# SOF markers carry the frame size; C4, C8 and CC share the range but do not
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Markers without a length field
+_JPEG_STANDALONE = {0x01, 0xD8} | set(range(0xD0, 0xD8))
+_SVG_HEAD = 8192
+_SVG_ROOT = re.compile(rb'<svg\b[^>]*>', re.IGNORECASE)
+_SVG_LENGTH = re.compile(r'^\s*([\d.]+)\s*(px)?\s*$')
+
+
+class ImageInfo(NamedTuple):
+    format: str
+    width: int
+    height: int
+
+
+def _read(f: BinaryIO, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise EOFError()
+    return data
+
+
+def _exif_rotated(segment: bytes) -> bool:
+    """Whether an APP1 Exif segment sets an orientation of 5 to 8 (quarter turns)"""
+    if not segment.startswith(b'Exif\0\0') or len(segment) < 14:
+        return False
+    tiff = segment[6:]
+    order = {b'II': '<', b'MM': '>'}.get(tiff[:2])
+    if order is None:
+        return False
+    offset = struct.unpack(order + 'I', tiff[4:8])[0]
+    if offset + 2 > len(tiff):
+        return False
+    count = struct.unpack(order + 'H', tiff[offset:offset + 2])[0]
+    for i in range(count):
+        entry = tiff[offset + 2 + 12 * i:offset + 14 + 12 * i]
+        if len(entry) < 12:
+            break
+        tag, kind = struct.unpack(order + 'HH', entry[:4])
+        if tag == 0x0112 and kind == 3:
+            return struct.unpack(order + 'H', entry[8:10])[0] in (5, 6, 7, 8)
+    return False
+
+
+def _probe_jpeg(f: BinaryIO) -> Optional[ImageInfo]:
+    rotated = False
+    f.seek(2)
+    while True:
+        byte = _read(f, 1)
+        if byte != b'\xff':
+            return None
+        marker = _read(f, 1)[0]
+        while marker == 0xFF:  # fill bytes
+            marker = _read(f, 1)[0]
+        if marker in _JPEG_STANDALONE:
+            continue
+        if marker == 0xD9:
+            return None
+        length = struct.unpack('>H', _read(f, 2))[0]
+        if length < 2:
+            return None
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack('>xHH', _read(f, 5))
+            if rotated:
+                width, height = height, width
+            return ImageInfo('jpeg', width, height)
+        if marker == 0xE1 and not rotated:
+            rotated = _exif_rotated(_read(f, length - 2))
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def _probe_webp(header: bytes) -> Optional[ImageInfo]:
+    chunk = header[12:16]
+    if chunk == b'VP8 ' and len(header) >= 30:
+        width, height = struct.unpack('<HH', header[26:30])
+        return ImageInfo('webp', width & 0x3FFF, height & 0x3FFF)
+    if chunk == b'VP8L' and len(header) >= 25:
+        b0, b1, b2, b3 = header[21:25]
+        return ImageInfo('webp', 1 + (b0 | (b1 & 0x3F) << 8),
+                         1 + (b1 >> 6 | b2 << 2 | (b3 & 0x0F) << 10))
+    if chunk == b'VP8X' and len(header) >= 30:
+        return ImageInfo('webp', 1 + int.from_bytes(header[24:27], 'little'),
+                         1 + int.from_bytes(header[27:30], 'little'))
+    return None
+
+
+def _svg_length(value: Optional[bytes]) -> Optional[float]:
+    match = _SVG_LENGTH.match(value.decode('ascii', 'replace')) if value else None
+    return float(match.group(1)) if match else None
+
+
+def _probe_svg(head: bytes) -> Optional[ImageInfo]:
+    root = _SVG_ROOT.search(head)
+    if root is None:
+        return None
+    attributes = dict(re.findall(rb'([\w:-]+)\s*=\s*["\']([^"\']*)["\']', root.group()))
+    width, height = _svg_length(attributes.get(b'width')), _svg_length(attributes.get(b'height'))
+    view_box = attributes.get(b'viewBox', b'').replace(b',', b' ').split()
+    if len(view_box) == 4:
+        try:
+            box_width, box_height = float(view_box[2]), float(view_box[3])
+        except ValueError:
+            box_width = box_height = 0
+        if box_width > 0 and box_height > 0:
+            # A single given dimension scales the other by the view box ratio
+            if width is None and height is None:
+                width, height = box_width, box_height
+            elif width is None:
+                width = height * box_width / box_height
+            elif height is None:
+                height = width * box_height / box_width
+    if not width or not height:
+        return None
+    return ImageInfo('svg', round(width), round(height))
+
+
+def probe(f: BinaryIO) -> Optional[ImageInfo]:
+    """Size of the image in an open binary file, from its header only"""
+    try:
+        header = f.read(32)
+        if header.startswith(b'\x89PNG\r\n\x1a\n') and header[12:16] == b'IHDR':
+            return ImageInfo('png', *struct.unpack('>II', header[16:24]))
+        if header[:6] in (b'GIF87a', b'GIF89a') and len(header) >= 10:
+            return ImageInfo('gif', *struct.unpack('<HH', header[6:10]))
+        if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+            return _probe_webp(header)
+        if header[:3] == b'\xff\xd8\xff':
+            return _probe_jpeg(f)
+        return _probe_svg(header + f.read(_SVG_HEAD - len(header)))
+    except (EOFError, struct.error):
+        return None
+
+
+def probe_file(path: Path) -> Optional[ImageInfo]:
+    with open(path, 'rb') as f:
+        return probe(f)
+
+
+def stamp_file(path: Path) -> Tuple[Path, int, int, str]:
+    """(path, size, mtime_ns, sha256) of a file, for a worker"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return path, stat.st_size, stat.st_mtime_ns, digest.hexdigest()
+
+
+def _probe_task(path: Path) -> Optional[ImageInfo]:
+    try:
+        return probe_file(path)
+    except OSError:
+        return None
+
+
+class ImageIndex:
+    """Intrinsic size of every image under a project's image directories"""
+
+    def __init__(self, project_root: Path, images: Dict[str, Optional[ImageInfo]],
+                 hashes: Optional[Dict[str, str]] = None):
+        self.project_root = project_root
+        self.images = images
+        self.hashes = hashes or {}  # content sha256 per path
+        digest = hashlib.sha256(json.dumps(sorted(images.items())).encode())
+        self.digest = digest.hexdigest()
+
+    def get(self, relative_path: str) -> Optional[ImageInfo]:
+        """Size of the image at a project-relative POSIX path"""
+        return self.images.get(relative_path)
+
+    def resolve(self, specifier: str) -> Optional[ImageInfo]:
+        """Size of the image an import source or public URL refers to
+
+        `@/assets/a.jpg` is project-relative (the `@/*` path alias) and
+        `/a.jpg` is served from public/.
+        """
+        if specifier.startswith('@/'):
+            return self.get(specifier[2:])
+        if specifier.startswith('/') and not specifier.startswith('//'):
+            return self.get('public' + specifier.split('?')[0])
+        return None
+
+
+def _cache_path(project_root: Path) -> Path:
+    return project_root / CACHE_DIR / 'images.json'
+
+
+def _image_files(project_root: Path) -> List[Path]:
+    files = []
+    for name in IMAGE_DIRS:
+        directory = project_root / name
+        if directory.is_dir():
+            files.extend(walk_files(directory, IMAGE_SUFFIXES, project_root=project_root,
+                                    excluded=EXCLUDED_DIRS | {Path(DERIVATIVES_DIR).name}))
+    return files
+
+
+def _read_cache(project_root: Path) -> Tuple[dict, dict]:
+    try:
+        with open(_cache_path(project_root), 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('version') == IMAGES_VERSION:
+            return cached['files'], cached['images']
+    except (OSError, ValueError, KeyError):
+        pass
+    return {}, {}
+
+
+def build_index(project_root: Path, jobs: int = 1) -> ImageIndex:
+    """Probe the images under project_root, reusing cached results"""
+    files, known = _read_cache(project_root)
+    stamps, pending = {}, []
+    for path in _image_files(project_root):
+        key = path.relative_to(project_root).as_posix()
+        entry = files.get(key)
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns] and entry[2] in known:
+            stamps[key] = entry
+        else:
+            pending.append(path)
+
+    hashed = map_files(stamp_file, pending, jobs)
+    unprobed = sorted({digest for _, _, _, digest in hashed if digest not in known})
+    paths = {digest: path for path, _, _, digest in hashed}
+    probed = map_files(_probe_task, [paths[digest] for digest in unprobed], jobs)
+    stats.counters[('images', 'cached')] += len(stamps)
+    stats.counters[('images', 'hashed')] += len(hashed)
+    stats.counters[('images', 'probed')] += len(probed)
+
+    known = dict(known)
+    known.update((digest, list(info) if info else None) for digest, info in zip(unprobed, probed))
+    for path, size, mtime_ns, digest in hashed:
+        stamps[path.relative_to(project_root).as_posix()] = [size, mtime_ns, digest]
+
+    if hashed or len(stamps) != len(files):
+        _write_cache(project_root, stamps, {stamp[2]: known[stamp[2]] for stamp in stamps.values()})
+
+    return ImageIndex(project_root, {
+        key: ImageInfo(*known[stamp[2]]) if known[stamp[2]] else None
+        for key, stamp in sorted(stamps.items())
+    }, {key: stamp[2] for key, stamp in stamps.items()})
+
+
+def _write_cache(project_root: Path, files: dict, images: dict):
+    cache_path = _cache_path(project_root)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': IMAGES_VERSION, 'files': files, 'images': images}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+
+
+def _stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+_indexes: Dict[Path, Tuple[Optional[Tuple[int, int]], ImageIndex]] = {}
+
+
+def load_images(project_root: Optional[Path] = None, jobs: int = 1) -> ImageIndex:
+    """The image index of a project (default: the current directory)
+
+    The index is kept for as long as the cached copy under .codemod-cache/
+    is unchanged, so a long-running process picks up a rebuild by any
+    other run; forget_images() drops it when the images themselves change.
+    Call it in the parent before starting workers so they inherit it.
+    """
+    root = Path(project_root or Path.cwd()).resolve()
+    stamp = _stamp(_cache_path(root))
+    cached = _indexes.get(root)
+    if cached is None or cached[0] != stamp:
+        index = build_index(root, jobs)
+        cached = _indexes[root] = (_stamp(_cache_path(root)), index)
+    return cached[1]
+
+
+def forget_images(project_root: Optional[Path] = None):
+    """Drop the index of a project, so that the next load_images() rescans it"""
+    _indexes.pop(Path(project_root or Path.cwd()).resolve(), None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Intrinsic size of the images in assets/ '
+                                                 'and public/')
+    parser.add_argument('project', nargs='?', type=Path, default=Path.cwd())
+    parser.add_argument('--jobs', '-j', type=int, default=1)
+    args = parser.parse_args()
+
+    index = build_index(args.project.resolve(), args.jobs)
+    for key, info in index.images.items():
+        size = f"{info.width}x{info.height} {info.format}" if info else 'unreadable'
+        print(f"{key}  {size}")
+
+
+if __name__ == '__main__':
+    main()
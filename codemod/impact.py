@@ -0,0 +1,278 @@
+"""
+Schema-diff impact analysis.
+
+When integrations/supabase/types.ts is regenerated, the schema digest in
+every cache manifest changes and a normal run re-checks the whole tree.
+Most migrations only touch a table or two, so impact mode instead:
+
+1. diffs the schema the tree was last processed against (its parsed copy
+   is still under .codemod-cache/) with the current one: tables added or
+   removed, columns added or removed, nullability or type changes;
+2. looks the affected tables up in a persistent reverse index of
+   `Tables<"x">` usages and `.from("x")` calls, plus the property names
+   each file reads, so files touching a column that was added, removed or
+   changed are found too, and the identifiers it uses, so files whose type
+   names or paths map to a different table once one is added or removed
+   are found as well;
+3. keeps the cache entries of every other file, so only the affected files
+   (and files edited since the last run) are processed.
+
+The reverse index lives in .codemod-cache/usages.json and is refreshed
+incrementally: a file is only rescanned when its size or mtime changed.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from codemod.cache import CACHE_DIR, FileCache, read_source
+from codemod.console import Colors, log
+from codemod.lexer import finditer_code
+from codemod.schema import Schema, load_cached_schema
+
+USAGE_INDEX_VERSION = 2
+
+_TABLE_USAGE = re.compile(
+    r'''Tables(?:Insert|Update)?<\s*["'](\w+)["']\s*>|\.from\(\s*["'](\w+)["']\s*\)''')
+_PROPERTY_ACCESS = re.compile(r'\??\.\s*([A-Za-z_]\w*)')
+_IDENTIFIER = re.compile(r'[A-Za-z_$][\w$]*')
+
+
+class TableChange(NamedTuple):
+    table: str
+    added_columns: List[str]
+    removed_columns: List[str]
+    # Columns whose Row type or nullability changed
+    changed_columns: List[str]
+
+
+class SchemaDiff:
+    """Differences between two versions of the schema"""
+
+    def __init__(self, old: Schema, new: Schema):
+        self.old = old
+        self.new = new
+        self.added_tables = sorted(set(new.tables) - set(old.tables))
+        self.removed_tables = sorted(set(old.tables) - set(new.tables))
+        self.changes: Dict[str, TableChange] = {}
+
+        for name in sorted(set(old.tables) & set(new.tables)):
+            before, after = old.tables[name], new.tables[name]
+            old_columns = set(before.row) | set(before.insert) | set(before.update)
+            new_columns = set(after.row) | set(after.insert) | set(after.update)
+            changed = sorted(
+                column for column in set(before.row) & set(after.row)
+                if before.row[column] != after.row[column]
+                or before.insert.get(column) != after.insert.get(column)
+                or before.update.get(column) != after.update.get(column)
+            )
+            change = TableChange(name, sorted(new_columns - old_columns),
+                                 sorted(old_columns - new_columns), changed)
+            if change.added_columns or change.removed_columns or change.changed_columns:
+                self.changes[name] = change
+
+    @property
+    def affected_tables(self) -> Set[str]:
+        return set(self.added_tables) | set(self.removed_tables) | set(self.changes)
+
+    @property
+    def changed_columns(self) -> Set[str]:
+        """Existing columns whose type or nullability changed"""
+        return {column for change in self.changes.values() for column in change.changed_columns}
+
+    @property
+    def columns(self) -> Set[str]:
+        """Every column added, removed or changed, with those of added and removed tables
+
+        A rule keyed on a column name (the nullable booleans, say) can
+        change its output for a file that reads the column without ever
+        naming its table.
+        """
+        columns = set(self.changed_columns)
+        for change in self.changes.values():
+            columns.update(change.added_columns, change.removed_columns)
+
+        # Columns of a table added or removed only count when no other table
+        # has the same column, type and nullability: a new table with an `id`
+        # changes nothing for the files reading `.id`
+        for tables, schema, other in ((self.added_tables, self.new, self.old),
+                                      (self.removed_tables, self.old, self.new)):
+            existing = {column for table in other.tables.values()
+                        for column in table.row.values()}
+            for name in tables:
+                columns.update(column.name for column in schema.tables[name].row.values()
+                               if column not in existing)
+        return columns
+
+    def remapped_names(self, names: Iterable[str]) -> Set[str]:
+        """Identifiers that name a different table (or none) under the new schema
+
+        Type names and identifiers map to tables by their words, so adding or
+        removing a table can move them even in files that never name it.
+        """
+        if not self.added_tables and not self.removed_tables:
+            return set()
+        return {
+            name for name in names
+            if self.old.table_for_type(name) != self.new.table_for_type(name)
+            or self.old.table_for_name(name) != self.new.table_for_name(name)
+        }
+
+    def is_empty(self) -> bool:
+        return not self.affected_tables
+
+    def describe(self) -> List[str]:
+        lines = [f"+ table {name}" for name in self.added_tables]
+        lines += [f"- table {name}" for name in self.removed_tables]
+        for change in self.changes.values():
+            lines += [f"+ {change.table}.{column}" for column in change.added_columns]
+            lines += [f"- {change.table}.{column}" for column in change.removed_columns]
+            lines += [f"~ {change.table}.{column}" for column in change.changed_columns]
+        return lines
+
+
+def scan_usages(content: str) -> dict:
+    """Tables a source file refers to, the property names it reads and its identifiers"""
+    tables = set()
+    for match in finditer_code(_TABLE_USAGE, content):
+        tables.add(match.group(1) or match.group(2))
+    return {
+        'tables': sorted(tables),
+        'properties': sorted(set(_PROPERTY_ACCESS.findall(content))),
+        'names': sorted(set(_IDENTIFIER.findall(content))),
+    }
+
+
+class UsageIndex:
+    """Persistent reverse index from tables and properties to source files"""
+
+    def __init__(self, project_root: Path):
+        self.project_root = project_root
+        self.path = project_root / CACHE_DIR / 'usages.json'
+        self.entries: Dict[str, dict] = {}
+        self.rescanned = 0
+        self.dirty = False
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                if index.get('version') == USAGE_INDEX_VERSION:
+                    self.entries = index.get('files', {})
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def _key(self, file_path: Path) -> str:
+        return Path(file_path).resolve().relative_to(self.project_root.resolve()).as_posix()
+
+    def refresh(self, files: Iterable[Path]):
+        """Bring the index up to date with the files, rescanning changed ones"""
+        seen = set()
+        for file_path in files:
+            key = self._key(file_path)
+            seen.add(key)
+            entry = self.entries.get(key)
+            try:
+                stat = os.stat(file_path)
+                if entry is not None and entry['size'] == stat.st_size \
+                        and entry['mtime_ns'] == stat.st_mtime_ns:
+                    continue
+                content, (size, mtime_ns, _) = read_source(file_path)
+            except (OSError, UnicodeDecodeError):
+                self.entries.pop(key, None)
+                continue
+
+            self.entries[key] = {'size': size, 'mtime_ns': mtime_ns, **scan_usages(content)}
+            self.rescanned += 1
+            self.dirty = True
+
+        for key in set(self.entries) - seen:
+            del self.entries[key]
+            self.dirty = True
+
+    def names(self) -> Set[str]:
+        """Every identifier used in any indexed file"""
+        return {name for entry in self.entries.values() for name in entry['names']}
+
+    def files_using(self, tables: Set[str], properties: Set[str] = frozenset(),
+                    names: Set[str] = frozenset()) -> Set[str]:
+        """Project-relative paths that refer to any of the tables, properties or names"""
+        return {
+            key for key, entry in self.entries.items()
+            if tables.intersection(entry['tables'])
+            or properties.intersection(entry['properties'])
+            or names.intersection(entry['names'])
+        }
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': USAGE_INDEX_VERSION, 'files': self.entries}, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+def affected_files(project_root: Path, files: List[Path], diff: SchemaDiff,
+                   old: Schema, new: Schema, index: UsageIndex) -> List[Path]:
+    """Files a schema change can alter the output of"""
+    tables = diff.affected_tables
+    keys = index.files_using(tables, diff.columns, diff.remapped_names(index.names()))
+
+    affected = []
+    for file_path in files:
+        key = file_path.relative_to(project_root).as_posix()
+        # Rules also pick a table from the path when a file has no usages yet
+        old_table, new_table = old.table_for_path(key), new.table_for_path(key)
+        if key in keys or old_table != new_table or new_table in tables or old_table in tables:
+            affected.append(file_path)
+    return affected
+
+
+def limit_to_schema_changes(project_root: Path, files: List[Path], cache: FileCache,
+                            schema: Schema) -> Optional[List[Path]]:
+    """Restore the cache entries of files a schema change cannot affect
+
+    Returns the affected files, or None when there is nothing to diff
+    against (no previous run, or its schema is no longer cached) or other
+    inputs changed too, and the caller has to fall back to a full run.
+    """
+    previous_digest = cache.previous_inputs.get('schema')
+    if previous_digest is None:
+        return None
+    if previous_digest == schema.digest:
+        log("   Schema unchanged since the last run", Colors.BLUE)
+        return []
+    others = {name for name in set(cache.inputs) | set(cache.previous_inputs)
+              if name != 'schema' and cache.inputs.get(name) != cache.previous_inputs.get(name)}
+    if others:
+        log(f"   Inputs besides the schema changed ({', '.join(sorted(others))}), "
+            f"processing every file", Colors.YELLOW)
+        return None
+
+    old = load_cached_schema(project_root, previous_digest)
+    if old is None:
+        log("   Previous schema not found in the cache, processing every file", Colors.YELLOW)
+        return None
+
+    diff = SchemaDiff(old, schema)
+    index = UsageIndex(project_root)
+    index.refresh(files)
+    index.save()
+
+    affected = affected_files(project_root, files, diff, old, schema, index)
+    affected_set = set(affected)
+    for file_path in files:
+        if file_path not in affected_set:
+            cache.restore(file_path)
+
+    log(f"   Schema changes ({len(diff.affected_tables)} tables):", Colors.BLUE)
+    for line in diff.describe():
+        log(f"     {line}", Colors.BLUE)
+    log(f"   Usage index: {index.rescanned} of {len(files)} files rescanned", Colors.BLUE)
+    log(f"   Affected files: {len(affected)}", Colors.BLUE)
+    return affected
@@ -0,0 +1,192 @@
+"""
+Per-file index of the import block.
+
+import_index() parses a file's import statements once, multi-line ones
+included, and keeps their spans, module sources and the local names they
+bind. Rules ask it whether a name or module is already imported and where
+the first import starts or the last one ends, instead of each running its
+own regex or splitting the file into lines.
+
+Adding an import goes through ImportIndex.add(), which returns the new
+content and registers an index for it with the spans shifted, so the next
+rule to ask about the same content gets it without reparsing. Since add()
+refuses names that are already bound, the same import cannot be inserted
+twice however many rules want it.
+"""
+
+import re
+from collections import OrderedDict
+from typing import List, Match, NamedTuple, Optional, Tuple
+
+from codemod.lexer import lex
+
+_IMPORT = re.compile(
+    r'^[ \t]*import\s+'
+    r'(?:(type)\s+)?'
+    r'(?:([A-Za-z_$][\w$]*)\s*,?\s*)?'
+    r'(?:\*\s*as\s+([A-Za-z_$][\w$]*)\s*|\{([^}]*)\}\s*)?'
+    r'(?:from\s*)?(["\'])([^"\'\n]+)\5[ \t]*;?[ \t]*(?:\n|$)',
+    re.MULTILINE)
+_SPECIFIER = re.compile(r'^(?:type\s+)?([\w$]+)(?:\s+as\s+([\w$]+))?$')
+
+_CACHE_SIZE = 32
+_cache: 'OrderedDict[str, ImportIndex]' = OrderedDict()
+
+
+def _names(default: Optional[str], namespace: Optional[str],
+           named: Optional[str]) -> Tuple[str, ...]:
+    names = []
+    if default and default != 'type':
+        names.append(default)
+    if namespace:
+        names.append(namespace)
+    if named:
+        for specifier in named.split(','):
+            specifier = specifier.strip()
+            if specifier.isidentifier():
+                names.append(specifier)
+                continue
+            parts = _SPECIFIER.match(specifier)
+            if parts:
+                names.append(parts.group(2) or parts.group(1))
+    return tuple(names)
+
+
+class ImportStatement(NamedTuple):
+    start: int  # start of the line the statement begins on
+    end: int  # just past its trailing newline (or the end of the file)
+    source: str
+    # The default, namespace and `{...}` clauses as written, split into
+    # names only when asked for, since most statements never are
+    clauses: Tuple[Optional[str], Optional[str], Optional[str]]
+    type_only: bool
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        """Local names bound: default, namespace and named imports"""
+        return _names(*self.clauses)
+
+
+def _matches(content: str) -> List[Match]:
+    """_IMPORT matches at the lines that start with `import`
+
+    str.find() jumps between occurrences of the keyword, which is much
+    faster than letting a MULTILINE `^` pattern try every line.
+    """
+    matches = []
+    position = 0
+    while True:
+        i = content.find('import', position)
+        if i < 0:
+            return matches
+        position = i + 1
+        line_start = content.rfind('\n', 0, i) + 1
+        if not content[line_start:i].strip(' \t'):
+            match = _IMPORT.match(content, line_start)
+            if match is not None:
+                matches.append(match)
+                position = match.end()
+
+
+class ImportIndex:
+    """The import statements of one source string"""
+
+    def __init__(self, content: str, statements: List[ImportStatement]):
+        self.content = content
+        self.statements = statements
+
+    @classmethod
+    def parse(cls, content: str) -> 'ImportIndex':
+        matches = _matches(content)
+        if not matches:
+            return cls(content, [])
+
+        # Imports sit at the top, so lexing up to the last one is enough to
+        # drop lookalikes inside comments and template strings; a line that
+        # starts with `import` can only be one of those inside a block
+        # comment or a template, so without either there is nothing to lex
+        prologue = content[:matches[-1].end()]
+        source = lex(prologue) if '/*' in prologue or '`' in prologue else None
+        statements = []
+        for match in matches:
+            if source is not None:
+                text = match.group()
+                if not source.in_code(match.start() + len(text) - len(text.lstrip())):
+                    continue
+            statements.append(ImportStatement(match.start(), match.end(), match.group(6),
+                                              match.group(2, 3, 4), bool(match.group(1))))
+        return cls(content, statements)
+
+    @property
+    def first_import(self) -> Optional[int]:
+        """Where a statement goes to become the first import"""
+        return self.statements[0].start if self.statements else None
+
+    @property
+    def end_of_imports(self) -> Optional[int]:
+        """Just past the last import statement"""
+        return self.statements[-1].end if self.statements else None
+
+    def imports(self, name: str, source: Optional[str] = None) -> bool:
+        """Whether `name` is bound by an import (from `source`, if given)"""
+        return any((source is None or statement.source == source) and name in statement.names
+                   for statement in self.statements)
+
+    def imports_from(self, source: str) -> bool:
+        return any(statement.source == source for statement in self.statements)
+
+    def add(self, statement: str, at: str = 'first') -> str:
+        """Insert an import statement before the first or after the last import
+
+        Returns the new content, or the content unchanged when the file has
+        no imports to anchor on or already binds one of the statement's
+        names from the same module.
+        """
+        match = _IMPORT.match(statement if statement.endswith('\n') else statement + '\n')
+        if match is None:
+            raise ValueError(f"not an import statement: {statement!r}")
+        clauses, module = match.group(2, 3, 4), match.group(6)
+        names = _names(*clauses)
+        if not self.statements or any(self.imports(name, module) for name in names):
+            return self.content
+
+        text = statement if statement.endswith('\n') else statement + '\n'
+        if at == 'first':
+            position = self.first_import
+            shifted = [statement_._replace(start=statement_.start + len(text),
+                                           end=statement_.end + len(text))
+                       for statement_ in self.statements]
+            added = ImportStatement(position, position + len(text), module, clauses,
+                                    bool(match.group(1)))
+            statements = [added] + shifted
+        elif at == 'last':
+            position = self.end_of_imports
+            if position > 0 and self.content[position - 1] != '\n':
+                text = '\n' + text.rstrip('\n')
+            added = ImportStatement(position, position + len(text), module, clauses,
+                                    bool(match.group(1)))
+            statements = self.statements + [added]
+        else:
+            raise ValueError(f"unknown insertion point: {at!r}")
+
+        content = self.content[:position] + text + self.content[position:]
+        _remember(ImportIndex(content, statements))
+        return content
+
+
+def _remember(index: ImportIndex):
+    _cache[index.content] = index
+    _cache.move_to_end(index.content)
+    while len(_cache) > _CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def import_index(content: str) -> ImportIndex:
+    """The import index of content, parsed at most once per version of a file"""
+    index = _cache.get(content)
+    if index is None:
+        index = ImportIndex.parse(content)
+        _remember(index)
+    else:
+        _cache.move_to_end(content)
+    return index
@@ -0,0 +1,207 @@
+"""
+Per-rule instrumentation and per-file profiling.
+
+Every rule call goes through run_rule(), which records, under the rule's
+name, the number of calls, the bytes of content handed to it and the time
+spent in it. While a rule runs it is the "current rule", so the lexer
+wrappers and EditBuffer can count the matches it found and the edits it
+made without the rules having to report anything themselves. Everything
+is kept in codemod.stats, so the numbers survive --jobs runs.
+
+Each rule call also has a time budget (--rule-budget, 2 seconds by
+default), enforced by codemod.watchdog: a rule still running when it
+expires is interrupted, its file is left as the rule found it, and the
+skip is logged and counted, so one pathological input (a minified vendor
+file, say) cannot stall the run.
+
+FileProfiler runs each file under cProfile and keeps the profiles of the
+slowest N, for `python -m pstats` or snakeviz.
+"""
+
+import argparse
+import cProfile
+import heapq
+import json
+import re
+import time
+import typing
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from codemod import stats, watchdog
+from codemod.cache import CACHE_DIR
+from codemod.console import Colors, log
+
+_current_rule: Optional[str] = None
+
+FIELDS = ('calls', 'matches', 'edits', 'bytes', 'time_ns', 'timeouts')
+
+DEFAULT_RULE_BUDGET = 2.0
+_rule_budget = DEFAULT_RULE_BUDGET
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """The --quiet, --report and --profile options shared by the fixers"""
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help='no per-file or per-match output, only the summary')
+    parser.add_argument('--report', type=Path, metavar='PATH',
+                        help='write a JSON report with per-rule calls, matches, edits, bytes and time')
+    parser.add_argument('--profile', type=int, default=0, metavar='N',
+                        help=f'cProfile every file and keep the slowest N under {CACHE_DIR}/profiles/ '
+                             '(runs in a single process)')
+    parser.add_argument('--rule-budget', type=float, default=DEFAULT_RULE_BUDGET,
+                        metavar='SECONDS',
+                        help='skip and report a rule that runs longer than this on one file, '
+                             f'0 for no limit (default: {DEFAULT_RULE_BUDGET:g})')
+
+
+def set_rule_budget(seconds: float):
+    """Set the per-file budget of every rule call; call before starting workers"""
+    global _rule_budget
+    _rule_budget = seconds
+
+
+@lru_cache(maxsize=None)
+def _returns_flag(func: Callable) -> bool:
+    """Whether func is annotated to return (content, modified)"""
+    try:
+        annotation = typing.get_type_hints(func).get('return')
+    except (NameError, TypeError):
+        return False
+    return typing.get_origin(annotation) is tuple
+
+
+def count(field: str, amount: int = 1):
+    """Add to a counter of the rule that is currently running, if any"""
+    if _current_rule is not None:
+        stats.counters[('rule', _current_rule, field)] += amount
+
+
+def run_rule(name: str, func: Callable, content: str, *args):
+    """Call func(content, *args) and record it as one call of rule `name`
+
+    When the call runs over the rule budget it is interrupted and the
+    content comes back unchanged, shaped like func's return annotation.
+    """
+    global _current_rule
+    previous = _current_rule
+    _current_rule = name
+    start = time.perf_counter_ns()
+    try:
+        with watchdog.deadline(_rule_budget) as owner:
+            return func(content, *args)
+    except watchdog.Timeout:
+        if not owner:
+            raise
+        stats.counters[('rule', name, 'timeouts')] += 1
+        log(f"⏱  {name} ran over its {_rule_budget:g}s budget on {len(content)} bytes; "
+            f"skipped", Colors.RED)
+        return (content, False) if _returns_flag(func) else content
+    finally:
+        elapsed = time.perf_counter_ns() - start
+        _current_rule = previous
+        counters = stats.counters
+        counters[('rule', name, 'calls')] += 1
+        counters[('rule', name, 'bytes')] += len(content)
+        counters[('rule', name, 'time_ns')] += elapsed
+
+
+def rule_stats() -> Dict[str, dict]:
+    """Counters of every rule that ran, slowest first"""
+    rules: Dict[str, dict] = {}
+    for key, value in stats.counters.items():
+        if key[0] == 'rule':
+            _, rule, field = key
+            rules.setdefault(rule, dict.fromkeys(FIELDS, 0))[field] += value
+
+    ordered = sorted(rules.items(), key=lambda item: -item[1]['time_ns'])
+    return {
+        rule: {
+            'calls': values['calls'],
+            'matches': values['matches'],
+            'edits': values['edits'],
+            'bytes': values['bytes'],
+            'seconds': values['time_ns'] / 1e9,
+            'timeouts': values['timeouts'],
+        }
+        for rule, values in ordered
+    }
+
+
+def report_rule_stats(color: str = Colors.BLUE):
+    """Log a table of calls, matches, edits, bytes and time per rule"""
+    rules = rule_stats()
+    if not rules:
+        return
+
+    width = max(len(rule) for rule in rules)
+    log(f"   {'Rule'.ljust(width)}  {'calls':>6}  {'matches':>7}  {'edits':>6}  "
+        f"{'KiB':>8}  {'ms':>9}", color)
+    for rule, values in rules.items():
+        log(f"   {rule.ljust(width)}  {values['calls']:>6}  {values['matches']:>7}  "
+            f"{values['edits']:>6}  {values['bytes'] / 1024:>8.0f}  "
+            f"{values['seconds'] * 1000:>9.1f}", color)
+
+    over_budget = {rule: values['timeouts'] for rule, values in rules.items() if values['timeouts']}
+    if over_budget:
+        log(f"\n   ⏱  Skipped for running over the {_rule_budget:g}s rule budget:", Colors.RED)
+        for rule, timeouts in over_budget.items():
+            log(f"   {rule.ljust(width)}  {timeouts:>6} file(s)", Colors.RED)
+
+
+def write_report(path: Path, **summary):
+    """Write the summary plus per-rule counters as JSON"""
+    report = dict(summary)
+    report['rules'] = rule_stats()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+
+
+class FileProfiler:
+    """Profile every file and keep the cProfile output of the slowest ones"""
+
+    def __init__(self, limit: int, directory: Path):
+        self.limit = limit
+        self.directory = directory
+        # Min-heap of (seconds, order, path, profile)
+        self.slowest: List[Tuple[float, int, str, cProfile.Profile]] = []
+        self.order = 0
+
+    def wrap(self, func: Callable) -> Callable:
+        """func(item) profiled, with str(item) naming the file"""
+        def profiled(item):
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            try:
+                return profile.runcall(func, item)
+            finally:
+                self.keep(time.perf_counter() - start, str(getattr(item, 'path', item)), profile)
+        return profiled
+
+    def keep(self, seconds: float, name: str, profile: cProfile.Profile):
+        self.order += 1
+        entry = (seconds, self.order, name, profile)
+        if len(self.slowest) < self.limit:
+            heapq.heappush(self.slowest, entry)
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def save(self) -> List[Tuple[float, Path]]:
+        """Dump the kept profiles, slowest first, and return (seconds, file) pairs"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for stale in self.directory.glob('*.prof'):
+            stale.unlink()
+        saved = []
+        ranked = sorted(self.slowest, key=lambda entry: -entry[0])
+        for rank, (seconds, _, name, profile) in enumerate(ranked, 1):
+            slug = re.sub(r'[^\w.-]+', '_', name.replace(str(Path.cwd()), '').strip('/'))
+            path = self.directory / f'{rank:02d}-{slug}.prof'
+            profile.dump_stats(path)
+            saved.append((seconds, path))
+        return saved
+
+    def report(self, color: str = Colors.BLUE):
+        for seconds, path in self.save():
+            log(f"   {seconds * 1000:8.1f} ms  {path}", color)
@@ -0,0 +1,294 @@
+"""
+Lightweight, linear-time TS/TSX lexer shared by the rules.
+
+lex() walks a file once and records every region that is not code:
+comments, string literals, template literal text, regex literals and JSX
+text. Rules keep matching their regexes against the original text but
+drop matches that start inside one of those regions, so a pattern such as
+useState\\(null\\) no longer fires inside a comment, a string or a
+paragraph of JSX copy. Spans therefore stay valid for edits on the
+original content.
+
+The lexer only tracks what it needs to tell code from non-code: brace
+depth for `${...}` and JSX `{...}`, the previous significant character to
+decide whether `/` starts a regex and `<` starts a JSX element, and the
+open JSX element stack. If JSX detection goes wrong (an element never
+closes), the file is lexed again without JSX support rather than treating
+the rest of it as text.
+
+Results are memoised per content string, so every rule that looks at the
+same version of a file shares one lex.
+"""
+
+import bisect
+import re
+from functools import lru_cache
+from typing import Callable, Iterator, List, Match, Optional, Pattern, Tuple, Union
+
+from codemod import instrument
+from codemod.edits import EditBuffer
+
+# (start, end, kind) with kind one of: comment, string, template, regex, jsx_text
+Region = Tuple[int, int, str]
+
+_CODE_STOP = re.compile(r'[/\'"`<{}]')
+_TAG_STOP = re.compile(r'[\'"{>/]')
+_JSX_TEXT_STOP = re.compile(r'[<{]')
+_STRING = {
+    '"': re.compile(r'"(?:[^"\\\n]|\\.)*"?', re.DOTALL),
+    "'": re.compile(r"'(?:[^'\\\n]|\\.)*'?", re.DOTALL),
+}
+_TEMPLATE_TEXT = re.compile(r'(?:[^`\\$]|\\.|\$(?!\{))*', re.DOTALL)
+_REGEX_LITERAL = re.compile(r'/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[a-z]*')
+_TAG_NAME = re.compile(r'[\w.:-]*')
+_WORD_BEFORE = re.compile(r'(\w+)\s*$')
+
+# After these characters an expression starts, so `/` is a regex and `<` a tag
+_EXPRESSION_START = set('(,=:[!&|?{};~+-*%^')
+_EXPRESSION_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new',
+                        'delete', 'void', 'throw', 'yield', 'await'}
+
+
+class SourceMap:
+    """Non-code regions of one source string"""
+
+    def __init__(self, content: str, regions: List[Region]):
+        self.content = content
+        self.regions = regions
+        self.starts = [start for start, _, _ in regions]
+
+    def region_at(self, position: int) -> Optional[Region]:
+        """The non-code region containing position, if any"""
+        index = bisect.bisect_right(self.starts, position) - 1
+        if index >= 0:
+            region = self.regions[index]
+            if region[0] <= position < region[1]:
+                return region
+        return None
+
+    def in_code(self, position: int) -> bool:
+        return self.region_at(position) is None
+
+    def code_view(self, start: int = 0, end: Optional[int] = None) -> str:
+        """The content (or content[start:end]) with every non-code region
+        blanked out (newlines kept)"""
+        end = len(self.content) if end is None else end
+        pieces = []
+        cursor = start
+        first = max(bisect.bisect_right(self.starts, start) - 1, 0)
+        for region_start, region_end, _ in self.regions[first:]:
+            if region_start >= end:
+                break
+            if region_end <= cursor:
+                continue
+            region_start, region_end = max(region_start, cursor), min(region_end, end)
+            pieces.append(self.content[cursor:region_start])
+            pieces.append(re.sub(r'[^\n]', ' ', self.content[region_start:region_end]))
+            cursor = region_end
+        pieces.append(self.content[cursor:end])
+        return ''.join(pieces)
+
+
+def _expression_may_start(content: str, position: int) -> bool:
+    """Whether a `/` or `<` at position begins a regex literal or JSX element"""
+    index = position - 1
+    while index >= 0 and content[index] in ' \t\r\n':
+        index -= 1
+    if index < 0:
+        return True
+
+    char = content[index]
+    if char == '>':
+        # Arrow function body: `=> <div>` or `=> /re/`
+        return index > 0 and content[index - 1] == '='
+    if char in _EXPRESSION_START:
+        return True
+    if char.isalnum() or char in '_$':
+        word = _WORD_BEFORE.search(content, max(0, index - 16), index + 1)
+        return word is not None and word.group(1) in _EXPRESSION_KEYWORDS
+    return False
+
+
+class _UnbalancedJsx(Exception):
+    pass
+
+
+def _lex(content: str, jsx: bool) -> List[Region]:
+    regions: List[Region] = []
+    length = len(content)
+    # Context stack entries: ['code', brace depth] | ['template'] |
+    # ['tag', closing?] | ['children']
+    stack: List[list] = [['code', 0]]
+    i = 0
+
+    while i < length:
+        context = stack[-1]
+        kind = context[0]
+
+        if kind == 'code':
+            match = _CODE_STOP.search(content, i)
+            if match is None:
+                break
+            i = match.start()
+            char = content[i]
+
+            if char == '/':
+                following = content[i + 1:i + 2]
+                if following == '/':
+                    end = content.find('\n', i)
+                    end = length if end == -1 else end
+                    regions.append((i, end, 'comment'))
+                    i = end
+                elif following == '*':
+                    end = content.find('*/', i + 2)
+                    end = length if end == -1 else end + 2
+                    regions.append((i, end, 'comment'))
+                    i = end
+                elif _expression_may_start(content, i):
+                    literal = _REGEX_LITERAL.match(content, i)
+                    if literal:
+                        regions.append((i, literal.end(), 'regex'))
+                        i = literal.end()
+                    else:
+                        i += 1
+                else:
+                    i += 1
+            elif char in '"\'':
+                end = _STRING[char].match(content, i).end()
+                regions.append((i, end, 'string'))
+                i = end
+            elif char == '`':
+                stack.append(['template'])
+                i += 1
+            elif char == '{':
+                context[1] += 1
+                i += 1
+            elif char == '}':
+                if context[1] == 0 and len(stack) > 1:
+                    stack.pop()
+                else:
+                    context[1] = max(0, context[1] - 1)
+                i += 1
+            elif char == '<':
+                following = content[i + 1:i + 2]
+                if jsx and (following.isalpha() or following == '>') \
+                        and _expression_may_start(content, i):
+                    stack.append(['tag', False])
+                    i = _TAG_NAME.match(content, i + 1).end()
+                else:
+                    i += 1
+
+        elif kind == 'template':
+            end = _TEMPLATE_TEXT.match(content, i).end()
+            # The backtick that opened the template is code; its text is not
+            if end > i:
+                regions.append((i, end, 'template'))
+            i = end
+            if i >= length:
+                break
+            if content[i] == '`':
+                stack.pop()
+                i += 1
+            else:
+                stack.append(['code', 0])
+                i += 2
+
+        elif kind == 'tag':
+            match = _TAG_STOP.search(content, i)
+            if match is None:
+                raise _UnbalancedJsx()
+            i = match.start()
+            char = content[i]
+
+            if char in '"\'':
+                end = content.find(char, i + 1)
+                end = length if end == -1 else end + 1
+                regions.append((i, end, 'string'))
+                i = end
+            elif char == '{':
+                stack.append(['code', 0])
+                i += 1
+            elif char == '/':
+                if content[i + 1:i + 2] == '>':
+                    # Self-closing element
+                    stack.pop()
+                    i += 2
+                else:
+                    i += 1
+            else:
+                closing = context[1]
+                stack.pop()
+                if closing:
+                    # `</X>` ends the children of the element it closes
+                    if not stack or stack[-1][0] != 'children':
+                        raise _UnbalancedJsx()
+                    stack.pop()
+                else:
+                    stack.append(['children'])
+                i += 1
+
+        else:  # children
+            match = _JSX_TEXT_STOP.search(content, i)
+            if match is None:
+                raise _UnbalancedJsx()
+            end = match.start()
+            if content[i:end].strip():
+                regions.append((i, end, 'jsx_text'))
+            i = end
+
+            if content[i] == '{':
+                stack.append(['code', 0])
+                i += 1
+            elif content[i + 1:i + 2] == '/':
+                stack.append(['tag', True])
+                i = _TAG_NAME.match(content, i + 2).end()
+            else:
+                stack.append(['tag', False])
+                i = _TAG_NAME.match(content, i + 1).end()
+
+    if jsx and any(entry[0] in ('tag', 'children') for entry in stack):
+        raise _UnbalancedJsx()
+
+    return regions
+
+
+@lru_cache(maxsize=32)
+def lex(content: str) -> SourceMap:
+    """Lex a TS/TSX source once; repeated calls with the same text are free"""
+    try:
+        regions = _lex(content, jsx=True)
+    except _UnbalancedJsx:
+        regions = _lex(content, jsx=False)
+    return SourceMap(content, regions)
+
+
+def finditer_code(pattern: Union[str, Pattern], content: str, flags: int = 0) -> Iterator[Match]:
+    """re.finditer, skipping matches that start outside code
+
+    The content is only lexed once a candidate match turns up, so rules
+    that find nothing never pay for lexing.
+    """
+    source = None
+    for match in re.finditer(pattern, content, flags):
+        if source is None:
+            source = lex(content)
+        if source.in_code(match.start()):
+            instrument.count('matches')
+            yield match
+
+
+def search_code(pattern: Union[str, Pattern], content: str, flags: int = 0) -> Optional[Match]:
+    """re.search, ignoring matches that start outside code"""
+    return next(finditer_code(pattern, content, flags), None)
+
+
+def sub_code(pattern: Union[str, Pattern], repl: Union[str, Callable[[Match], str]],
+             content: str, count: int = 0, flags: int = 0) -> str:
+    """re.sub that leaves comments, strings and JSX text untouched"""
+    edits = EditBuffer(content)
+    for match in finditer_code(pattern, content, flags):
+        text = repl(match) if callable(repl) else match.expand(repl)
+        edits.replace(match.start(), match.end(), text)
+        if count and len(edits) >= count:
+            break
+    return edits.apply()
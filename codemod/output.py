@@ -0,0 +1,111 @@
+"""
+Write-avoiding, atomic output for the fixers.
+
+write_source() is the only place the fixers write a source file. It
+encodes the new text the way the file on disk is encoded (CRLF files stay
+CRLF) and compares bytes: a file whose bytes would not change is left
+alone, mtime included, so an incremental build or a watcher sees nothing.
+Otherwise the bytes go to a temporary file in the same directory, which
+then replaces the original with os.replace(): a reader (or an interrupted
+run) sees the old file or the new one, never a truncated one.
+
+Durability is opt-in with --fsync: `each` syncs every file before the
+rename, `batch` renames without syncing and sync_files() syncs all written
+files and their directories once at the end of the run.
+"""
+
+import argparse
+import contextlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable
+
+from codemod import stats
+
+FSYNC_MODES = ('off', 'each', 'batch')
+
+_fsync = 'off'
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """The --fsync option shared by the fixers"""
+    parser.add_argument('--fsync', choices=FSYNC_MODES, default='off',
+                        help='sync written files to disk: after each file, or once at the end '
+                             '(default: off)')
+
+
+def configure(fsync: str):
+    """Set the fsync mode; call before starting worker processes"""
+    global _fsync
+    if fsync not in FSYNC_MODES:
+        raise ValueError(f"unknown fsync mode: {fsync!r}")
+    _fsync = fsync
+
+
+def write_source(file_path: Path, content: str) -> bool:
+    """Write content to file_path unless its bytes are already there
+
+    Returns whether the file was written.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            existing = f.read()
+            mode = os.fstat(f.fileno()).st_mode & 0o7777
+    except FileNotFoundError:
+        existing, mode = None, 0o644
+
+    if existing is not None and b'\r\n' in existing:
+        content = content.replace('\n', '\r\n')
+    data = content.encode('utf-8')
+    if data == existing:
+        stats.counters[('output', 'unchanged')] += 1
+        return False
+
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.codemod-tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            os.fchmod(f.fileno(), mode)
+            if _fsync == 'each':
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp_path)
+        raise
+
+    if _fsync == 'each':
+        _sync_directory(directory)
+    stats.counters[('output', 'written')] += 1
+    stats.counters[('output', 'bytes')] += len(data)
+    return True
+
+
+def _sync_directory(directory: str):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def sync_files(paths: Iterable[Path]):
+    """Sync written files and their directories once, for --fsync batch"""
+    if _fsync != 'batch':
+        return
+    directories = set()
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            continue
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        directories.add(os.path.dirname(os.path.abspath(path)))
+    for directory in sorted(directories):
+        _sync_directory(directory)
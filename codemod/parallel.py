@@ -0,0 +1,59 @@
+"""
+Process-pool execution of per-file work with deterministic output.
+
+Workers capture everything a task prints and hand it back with the result,
+so the parent can replay the logs in input order no matter which worker
+finished first. Counters from codemod.stats travel back the same way.
+"""
+
+import contextlib
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+from codemod import stats
+
+
+def resolve_jobs(jobs: int) -> int:
+    """Turn a --jobs value into a worker count (0 means one per CPU)"""
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def _run_captured(func: Callable, item):
+    """Run func(item) in a worker and return (result, printed output, counters)"""
+    stats.take()
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        result = func(item)
+    return result, buffer.getvalue(), stats.take()
+
+
+def map_files(func: Callable, items: Iterable, jobs: int = 1,
+              initializer: Optional[Callable] = None, initargs: tuple = ()) -> List:
+    """Apply func to every item, in a process pool when jobs > 1
+
+    Results come back in input order and each task's printed log is written
+    to stdout in that same order.
+    """
+    items = list(items)
+    jobs = resolve_jobs(jobs)
+
+    if jobs <= 1 or len(items) <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        return [func(item) for item in items]
+
+    chunksize = max(1, len(items) // (jobs * 4))
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=initializer,
+                             initargs=initargs) as pool:
+        for result, output, counters in pool.map(_run_captured, [func] * len(items), items,
+                                                 chunksize=chunksize):
+            sys.stdout.write(output)
+            stats.merge(counters)
+            results.append(result)
+    return results
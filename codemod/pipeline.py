@@ -0,0 +1,144 @@
+"""
+Single-read, single-write pipeline over the rule registry.
+
+Every file is read once, passed through all stages in memory and written
+back at most once (by codemod.output, which leaves byte-identical files
+alone), instead of each script walking, reading and rewriting the tree on
+its own.
+"""
+
+import multiprocessing
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from codemod.cache import FileCache, FileStamp, read_source
+from codemod.console import Colors, log
+from codemod.instrument import FileProfiler
+from codemod.output import sync_files, write_source
+from codemod.parallel import map_files
+from codemod.rules import Stage, build_registry
+from codemod.walk import walk_files
+
+
+def find_files(project_root: Path, stages: List[Stage]) -> List[Path]:
+    """Find every TypeScript file covered by at least one stage"""
+    roots = []
+    for stage in stages:
+        for root in stage.roots:
+            if root not in roots:
+                roots.append(root)
+
+    files = []
+    for root in roots:
+        directory = project_root / root
+        if directory.exists():
+            files.extend(walk_files(directory, project_root=project_root))
+    return files
+
+
+def apply_stages(content: str, file_path: Path, project_root: Path,
+                 stages: List[Stage]) -> Tuple[str, List[str], List[str]]:
+    """Run every stage covering the file
+
+    Returns the new content, the stages that changed it and the cache keys
+    of every gate and rule that was evaluated.
+    """
+    relative = file_path.relative_to(project_root).as_posix()
+    changed_by = []
+    evaluated = []
+
+    for stage in stages:
+        if not stage.covers(relative):
+            continue
+        content, modified, keys = stage.apply(content, str(file_path))
+        evaluated.extend(keys)
+        if modified:
+            changed_by.append(stage.name)
+
+    return content, changed_by, evaluated
+
+
+# (modified, stamp of the content that was read, evaluated cache keys);
+# the stamp is None when the file could not be processed
+FileResult = Tuple[bool, Optional[FileStamp], List[str]]
+
+
+def process_file(file_path: Path, project_root: Path, stages: List[Stage]) -> FileResult:
+    """Read a file once, apply all stages and write it back at most once"""
+    try:
+        original_content, stamp = read_source(file_path)
+
+        log(f"\n📝 Processing: {file_path.relative_to(project_root)}", Colors.CYAN)
+        content, changed_by, evaluated = apply_stages(original_content, file_path,
+                                                      project_root, stages)
+
+        if content != original_content and write_source(file_path, content):
+            log(f"✅ File updated ({', '.join(changed_by)})", Colors.GREEN)
+            return True, stamp, evaluated
+
+        log("ℹ️  No changes needed", Colors.YELLOW)
+        return False, stamp, evaluated
+
+    except Exception as e:
+        log(f"❌ Error processing {file_path}: {str(e)}", Colors.RED)
+        return False, None, []
+
+
+# Per-worker state for parallel runs. Forked workers inherit the stages
+# they are given; the rules come from scripts loaded by file path, which a
+# spawned worker cannot unpickle, so those get the stage names and rebuild
+# the same stages from the registry once.
+_worker_root: Optional[Path] = None
+_worker_stages: Optional[List[Stage]] = None
+
+
+def _init_worker(project_root: Path, stages: Union[List[Stage], List[str]]):
+    global _worker_root, _worker_stages
+    _worker_root = project_root
+    _worker_stages = build_registry(stages) if stages and isinstance(stages[0], str) else stages
+
+
+def _worker_stage_args(stages: List[Stage]) -> Union[List[Stage], List[str]]:
+    """What _init_worker needs to run exactly these stages"""
+    if multiprocessing.get_start_method() == 'fork':
+        return stages
+    return [stage.name for stage in stages]
+
+
+def _process_in_worker(file_path: Path) -> FileResult:
+    return process_file(file_path, _worker_root, _worker_stages)
+
+
+def run(project_root: Path, stages: List[Stage], jobs: int = 1,
+        cache: Optional[FileCache] = None,
+        profiler: Optional[FileProfiler] = None) -> Tuple[int, int, int]:
+    """Process the whole tree and return (files scanned, files modified, files skipped)
+
+    With a profiler every file is processed in this process under cProfile.
+    """
+    files = find_files(project_root, stages)
+    pending = [f for f in files if cache is None or not cache.is_fresh(f)]
+
+    if profiler is not None:
+        process = profiler.wrap(lambda file_path: process_file(file_path, project_root, stages))
+        results = [process(file_path) for file_path in pending]
+    elif jobs == 1:
+        results = [process_file(file_path, project_root, stages) for file_path in pending]
+    else:
+        results = map_files(_process_in_worker, pending, jobs,
+                            initializer=_init_worker,
+                            initargs=(project_root, _worker_stage_args(stages)))
+
+    sync_files(file_path for file_path, (modified, _, _) in zip(pending, results) if modified)
+
+    modified_count = 0
+    for file_path, (modified, stamp, evaluated) in zip(pending, results):
+        if modified:
+            modified_count += 1
+        if cache is not None:
+            cache.record_result(file_path, modified, stamp, evaluated)
+
+    if cache is not None:
+        cache.save()
+
+    return len(files), modified_count, len(files) - len(pending)
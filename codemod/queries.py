@@ -0,0 +1,657 @@
+"""
+Supabase query analyzer: over-fetching and avoidable round trips.
+
+Every `supabase.from(...)` chain (plus `supabase.auth.*`, `.rpc()` and
+`.storage` calls, which cost a round trip too) is parsed over the lexer's
+code view, so chains split over lines, comments and strings inside the
+arguments do not confuse it. For each query the analyzer records the
+table, the operation, the selected columns (`*` meaning the whole Row of
+the table in types.ts) and where its `data` goes: the variable it is
+destructured into and the state it is stored in. The Row columns read off
+those variables, directly, through array callbacks or by destructuring,
+are the columns actually used; a variable that is passed along as a
+whole (a JSX prop, a spread, a function argument) makes the usage unknown
+rather than a guess.
+
+Queries are then grouped by the `useEffect` that runs them, directly or
+through the local functions it calls. Walking each effect in source order
+gives its critical path in round trips (awaited requests add up, requests
+started without `await` overlap), and the data dependencies between the
+requests give the shortest path they allow. The difference is the number
+of round trips that running independent requests in parallel would save.
+Requests that could be one request are reported too: a table and its
+child table filtered on the same foreign key value (one query with an
+embedded select) and the same table queried more than once.
+
+Pages are ranked by the latency this leaves on the table, from a simple
+model: --rtt per avoidable sequential round trip plus --request-cost per
+avoidable request.
+
+    python -m codemod.queries [DIR ...] [--top 10] [--json report.json]
+"""
+
+import argparse
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from codemod.discover import scan_sources
+from codemod.lexer import lex
+from codemod.schema import Schema, load_schema
+from codemod.walk import walk_files
+
+DEFAULT_RTT_MS = 60.0
+DEFAULT_REQUEST_COST_MS = 15.0
+
+_CLIENT = re.compile(r'(?<![\w$.])supabase\b')
+_LINK = re.compile(r'\s*(\??\.)\s*([A-Za-z_$][\w$]*)\s*')
+_STRING = re.compile(r'''(["'`])((?:\\.|(?!\1).)*)\1''', re.DOTALL)
+_AWAIT_BEFORE = re.compile(r'\bawait\s*$')
+_BINDING = re.compile(r'\b(?:const|let|var)\s+(\{[^;=]*\}|\[[^;=]*\]|[A-Za-z_$][\w$]*)\s*=\s*(?:await\s*)?$')
+_LEAF = re.compile(r'([A-Za-z_$][\w$]*)\s*(?=[,}]|$)')
+_DATA_ALIAS = re.compile(r'\bdata\s*:\s*([A-Za-z_$][\w$]*)')
+_FUNCTION = re.compile(
+    r'\b(?:const|let)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?'
+    r'(?:\([^()]*\)|[A-Za-z_$][\w$]*)\s*(?::[^=;{]+)?=>\s*\{'
+    r'|\b(?:async\s+)?function\s+([A-Za-z_$][\w$]*)\s*\([^()]*\)[^{;]*\{')
+_EFFECT = re.compile(r'(?<![\w$])(?:React\.)?use(?:Layout)?Effect\s*\(')
+_CALL = re.compile(r'(?<![\w$.])([A-Za-z_$][\w$]*)\s*\(')
+_PROMISE_ALL = re.compile(r'\bPromise\.all(?:Settled)?\s*\(')
+_EQ_FILTER = re.compile(r'''\.eq\(\s*["'](\w+)["']\s*,\s*([^)]+?)\s*\)''')
+_SETTER = re.compile(r'set[A-Z][\w$]*')
+_TYPE_ASSERTION = re.compile(r'\s+as\s+[\w$.<>\[\]| ]+$|!$')
+_ARROW = re.compile(r'=>\s*')
+_IF = re.compile(r'\bif\s*\(')
+_CAST = re.compile(r'\s+as\s+[\w$.<>\[\]]+')
+# What may follow a bare mention of a traced value without it leaving the scope:
+# reads, conditions, comparisons, list items, bindings, typed parameters and `(x || [])`
+_HARMLESS_AFTER = re.compile(r'\s*(?:\??\.|\[|&&|\?(?![.?])|[=!]==?|\)|,|\]|\}|=(?![=>])'
+                             r'|=>|\|\|\s*\[\s*\]\s*\)|:\s*[\w$.<>\[\]]+\s*[,)])')
+_HARMLESS_BEFORE = re.compile(r'(?:!|\.\.\.|\b(?:const|let|var))\s*$')
+# ...unless it is the value of a return, an arrow body or a ternary branch
+_ESCAPES_BEFORE = re.compile(r'(?:\b(?:return|yield)|=>|[?:])\s*$')
+_DATA_KEY = re.compile(r'\bdata\s*:\s*$')
+_ACCESS = re.compile(r'\s*(?:\??\.|\[)')
+
+OPERATIONS = ('select', 'insert', 'update', 'upsert', 'delete')
+ARRAY_METHODS = ('map', 'filter', 'find', 'findLast', 'forEach', 'some', 'every', 'flatMap',
+                 'reduce', 'sort', 'slice', 'concat', 'at', 'toSorted', 'reverse')
+# Names the analyzer never treats as a local function call
+_NOT_CALLS = {'if', 'for', 'while', 'switch', 'catch', 'return', 'typeof', 'await', 'async',
+              'function', 'useEffect', 'useLayoutEffect'}
+
+
+class Query(NamedTuple):
+    kind: str  # 'select', 'insert', ..., or 'auth', 'rpc', 'storage'
+    table: Optional[str]
+    start: int
+    end: int
+    line: int
+    awaited: bool
+    # Selected columns, None for `*` (or no select at all)
+    columns: Optional[Tuple[str, ...]]
+    embeds: Tuple[str, ...]
+    eq_filters: Tuple[Tuple[str, str], ...]  # (column, value expression)
+    bindings: Tuple[str, ...]  # names the result is destructured into, errors aside
+    data_name: Optional[str]  # the one bound to `data`
+
+
+class ColumnUsage(NamedTuple):
+    query: Query
+    fetched: Tuple[str, ...]
+    # Row columns read from the data; None when it escapes as a whole
+    used: Optional[Tuple[str, ...]]
+
+    @property
+    def unused(self) -> Tuple[str, ...]:
+        if self.used is None:
+            return ()
+        return tuple(column for column in self.fetched if column not in self.used)
+
+
+class EffectReport(NamedTuple):
+    line: int
+    requests: Tuple[Query, ...]
+    critical_path: int  # round trips in sequence, as written
+    shortest_path: int  # round trips the data dependencies require
+    merges: Tuple[str, ...]  # suggestions for requests that could be one
+
+    @property
+    def avoidable_round_trips(self) -> int:
+        return self.critical_path - self.shortest_path
+
+    @property
+    def avoidable_requests(self) -> int:
+        return len(self.merges)
+
+
+class FileReport(NamedTuple):
+    path: Path
+    queries: Tuple[Query, ...]
+    usages: Tuple[ColumnUsage, ...]
+    effects: Tuple[EffectReport, ...]
+
+    @property
+    def tables(self) -> List[str]:
+        return sorted({query.table for query in self.queries if query.table})
+
+    def avoidable_ms(self, rtt_ms: float = DEFAULT_RTT_MS,
+                     request_cost_ms: float = DEFAULT_REQUEST_COST_MS) -> float:
+        return sum(effect.avoidable_round_trips * rtt_ms + effect.avoidable_requests * request_cost_ms
+                   for effect in self.effects)
+
+    @property
+    def unused_columns(self) -> int:
+        return sum(len(usage.unused) for usage in self.usages)
+
+
+def _match_bracket(code: str, open_at: int) -> int:
+    """Index just past the bracket closing the `(`, `[` or `{` at open_at (or len(code))"""
+    depth = 0
+    for i in range(open_at, len(code)):
+        char = code[i]
+        if char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return len(code)
+
+
+def _first_string(text: str) -> Optional[str]:
+    match = _STRING.search(text)
+    return match.group(2) if match else None
+
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, current = [], 0, ''
+    for char in text:
+        if char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth -= 1
+        if char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+        else:
+            current += char
+    parts.append(current)
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_select(text: str) -> Tuple[Optional[Tuple[str, ...]], Tuple[str, ...]]:
+    """(columns, embedded relations) of a select string; columns None for `*`"""
+    columns, embeds = [], []
+    star = False
+    for part in _split_top_level(' '.join(text.split())):
+        if '(' in part:
+            relation = part.split('(', 1)[0].split(':')[-1].split('!')[0].strip()
+            embeds.append(relation)
+            continue
+        name = part.split('::')[0]
+        name = name.split(':')[-1].strip()  # alias:column
+        if name == '*':
+            star = True
+        elif name:
+            columns.append(name)
+    return (None if star or not columns else tuple(columns)), tuple(embeds)
+
+
+def _chain(code: str, content: str, i: int) -> Tuple[List[Tuple[str, Optional[str]]], int]:
+    """The `.name(args)` links after `supabase` at i: (name, args text or None), end"""
+    links = []
+    while True:
+        match = _LINK.match(code, i)
+        if match is None:
+            return links, i
+        name = match.group(2)
+        i = match.end()
+        if code.startswith('(', i):
+            end = _match_bracket(code, i)
+            links.append((name, content[i + 1:end - 1]))
+            i = end
+        else:
+            links.append((name, None))
+
+
+def _destructured(target: str) -> Tuple[Tuple[str, ...], Optional[str]]:
+    """Names a binding target binds, errors aside, and the one bound to `data`"""
+    if not target.startswith('{'):
+        return (target,), None
+    # Errors only decide whether to go on, which Promise.all preserves
+    errors = {'error'} | set(re.findall(r'\berror\s*:\s*([A-Za-z_$][\w$]*)', target))
+    names = tuple(name for name in _LEAF.findall(target[1:-1].replace('{', ',').replace('}', ','))
+                  if name not in errors)
+    alias = _DATA_ALIAS.search(target)
+    if alias:
+        return names, alias.group(1)
+    return names, 'data' if re.search(r'(?<![\w$:])data(?![\w$]|\s*:)', target) else None
+
+
+def _bound_before(code: str, start: int) -> Optional[str]:
+    """The target of a `const ... = await` ending right before start"""
+    match = _BINDING.search(code, max(0, start - 300), start)
+    return match.group(1) if match else None
+
+
+def _elements(code: str, open_at: int) -> List[Tuple[int, int]]:
+    """Spans of the top-level elements of the bracketed list opening at open_at"""
+    spans, depth, start = [], 0, open_at + 1
+    for i in range(open_at, _match_bracket(code, open_at)):
+        char = code[i]
+        if char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth -= 1
+        if (char == ',' and depth == 1) or depth == 0:
+            spans.append((start, i))
+            start = i + 1
+    return spans
+
+
+def _promise_all_bindings(code: str) -> Dict[int, str]:
+    """Binding target of each element of `const [...] = await Promise.all([...])`, by start"""
+    targets = {}
+    for match in _PROMISE_ALL.finditer(code):
+        target = _bound_before(code, match.start())
+        list_at = code.find('[', match.end())
+        if not target or not target.startswith('[') or list_at < 0 or code[match.end():list_at].strip():
+            continue
+        parts = _split_top_level(target[1:-1])
+        for part, (start, _) in zip(parts, _elements(code, list_at)):
+            targets[start] = part
+    return targets
+
+
+def find_queries(content: str, code: Optional[str] = None) -> List[Query]:
+    """Every Supabase request made in content (whose code view is code), in source order"""
+    code = lex(content).code_view() if code is None else code
+    grouped = _promise_all_bindings(code)
+    queries = []
+    for match in _CLIENT.finditer(code):
+        links, end = _chain(code, content, match.end())
+        if not links:
+            continue
+        head, head_args = links[0]
+        table, columns, embeds, eq_filters = None, None, (), ()
+        if head == 'from' and head_args is not None:
+            table = _first_string(head_args)
+            kind = next((name for name, _ in links[1:] if name in OPERATIONS), 'select')
+            select_args = next((args for name, args in links[1:] if name == 'select'), None)
+            if select_args is not None:
+                selected = _first_string(select_args)
+                if selected is not None:
+                    columns, embeds = parse_select(selected)
+            chain_text = content[match.start():end]
+            eq_filters = tuple((column, _TYPE_ASSERTION.sub('', ' '.join(value.split())))
+                               for column, value in _EQ_FILTER.findall(chain_text))
+        elif head in ('auth', 'storage') and len(links) > 1:
+            if links[-1][1] is None or links[-1][0] in ('onAuthStateChange', 'getPublicUrl'):
+                continue  # no request: a listener or a URL built locally
+            kind = head
+        elif head == 'rpc':
+            kind = 'rpc'
+        else:
+            continue  # realtime channels and the like
+
+        target = _bound_before(code, match.start())
+        if target is None:
+            target = next((part for start, part in grouped.items()
+                           if not code[start:match.start()].strip()), None)
+        bindings, data_name = _destructured(target) if target else ((), None)
+        awaited = bool(_AWAIT_BEFORE.search(code[max(0, match.start() - 20):match.start()]))
+        queries.append(Query(kind, table, match.start(), end, content.count('\n', 0, match.start()) + 1,
+                             awaited, columns, embeds, eq_filters, bindings, data_name))
+    return queries
+
+
+def _functions(code: str) -> Dict[str, Tuple[int, int]]:
+    """Body span of every named local function"""
+    spans = {}
+    for match in _FUNCTION.finditer(code):
+        name = match.group(1) or match.group(2)
+        spans.setdefault(name, (match.end() - 1, _match_bracket(code, match.end() - 1)))
+    return spans
+
+
+def _innermost(spans: Dict[str, Tuple[int, int]], position: int) -> Optional[Tuple[int, int]]:
+    containing = [span for span in spans.values() if span[0] <= position < span[1]]
+    return min(containing, key=lambda span: span[1] - span[0]) if containing else None
+
+
+def _unexplained(text: str, name: str) -> bool:
+    """Whether name is mentioned in text in a way _read_columns cannot follow"""
+    for match in re.finditer(rf'(?<![\w$.]){re.escape(name)}(?![\w$])', text):
+        end = match.end()
+        cast = _CAST.match(text, end)
+        if cast:
+            end = cast.end()
+        before = text[max(0, match.start() - 12):match.start()]
+        if (_ESCAPES_BEFORE.search(before) and not _DATA_KEY.search(before)
+                and not _ACCESS.match(text, end)):
+            return True
+        if not (_HARMLESS_AFTER.match(text, end) or _HARMLESS_BEFORE.search(before)):
+            return True
+    return False
+
+
+def _read_columns(code: str, name: str, scope: Tuple[int, int]) -> Optional[Set[str]]:
+    """Properties read off name within scope
+
+    Follows array callbacks, copies and aliases, and state the value is
+    stored in (file-wide). None when the value is passed along as a whole.
+    """
+    read: Set[str] = set()
+    pending, seen = [(name, scope)], set()
+    while pending:
+        name, scope = pending.pop()
+        if (name, scope) in seen:
+            continue
+        seen.add((name, scope))
+        word = re.escape(name)
+        text = code[scope[0]:scope[1]]
+        if _unexplained(text, name):
+            return None
+        for match in re.finditer(rf'=\{{\s*{word}\s*\}}|(?<!\[)\.\.\.{word}\b(?!\s*\??\.)'
+                                 rf'|([\w$.]+)\s*\(\s*{word}\b(?:{_CAST.pattern})?\s*(?:\|\|\s*\[\s*\]\s*)?[,)](?!\s*=>)',
+                                 text):
+            callee = match.group(1)
+            if callee is not None and _SETTER.fullmatch(callee):
+                state = re.search(rf'\[\s*([A-Za-z_$][\w$]*)\s*,\s*{callee}\s*\]', code)
+                if state:
+                    pending.append((state.group(1), (0, len(code))))
+            elif callee is None or callee not in _NOT_CALLS:
+                return None
+        for match in re.finditer(rf'\b(?:const|let)\s+([A-Za-z_$][\w$]*)\s*=\s*'
+                                 rf'(?:\[\s*\.\.\.{word}\s*\]|\(?\s*{word}\b(?!\s*\??\.\s*\w+\s*[^(\w\s]))',
+                                 text):
+            pending.append((match.group(1), scope))
+        for match in re.finditer(rf'(?:(?:(?<![\w$.])|(?<=\.\.\.)){word}|\[\s*\.\.\.{word}\s*\]'
+                                 rf'|\(\s*{word}\s*\|\|\s*\[\s*\]\s*\))\s*'
+                                 r'(?:\?\.|\.|\?\.\[\d+\]\??\.|\[\d+\]\??\.)'
+                                 r'\s*([A-Za-z_$][\w$]*)(\s*\()?', text):
+            prop, called = match.group(1), match.group(2)
+            if prop in ARRAY_METHODS and called:
+                open_at = match.end() - 1
+                callback = text[open_at + 1:_match_bracket(text, open_at) - 1]
+                params = re.match(r'\s*(?:async\s*)?\(?\s*([A-Za-z_$][\w$]*|\{[^}]*\})', callback)
+                if params and params.group(1).startswith('{'):
+                    read.update(_LEAF.findall(params.group(1)[1:-1]))
+                elif params:
+                    pending.append((params.group(1), scope))
+            elif prop != 'length':
+                read.add(prop)
+        for match in re.finditer(rf'\{{([^{{}}]*)\}}\s*=\s*{word}\b', text):
+            read.update(part.split(':')[0].strip() for part in match.group(1).split(','))
+    return read
+
+
+def column_usage(content: str, query: Query, schema: Schema, code: Optional[str] = None,
+                 spans: Optional[Dict[str, Tuple[int, int]]] = None) -> Optional[ColumnUsage]:
+    """Fetched versus read columns of a select, when its table is known
+
+    code and spans, the code view and the _functions() of content, are
+    computed when not given; analyze_file() passes them once for all
+    queries of a file.
+    """
+    table = schema.tables.get(query.table or '')
+    if query.kind != 'select' or table is None or not table.row:
+        return None
+    fetched = query.columns if query.columns is not None else tuple(table.row)
+    if query.data_name is None:
+        return ColumnUsage(query, fetched, None)
+
+    code = lex(content).code_view() if code is None else code
+    spans = _functions(code) if spans is None else spans
+    function = _innermost(spans, query.start) or (0, len(code))
+    read = _read_columns(code, query.data_name, function)
+    if read is None:
+        return ColumnUsage(query, fetched, None)
+    return ColumnUsage(query, fetched, tuple(column for column in fetched if column in read))
+
+
+def _depends(later: Query, earlier: Query, content: str, code: str) -> bool:
+    """Whether later's arguments use a value bound from earlier's result"""
+    names = earlier.bindings
+    if not names:
+        return False
+    uses = re.compile(r'(?<![\w$.])(?:' + '|'.join(re.escape(name) for name in names) + r')\b')
+    if uses.search(content, later.start, later.end):
+        return True
+    # Or it only runs when a condition on that value holds
+    for match in _IF.finditer(code, earlier.end, later.start):
+        condition_end = _match_bracket(code, match.end() - 1)
+        if uses.search(content, match.end(), condition_end):
+            return True
+    return False
+
+
+def _merges(requests: List[Query], schema: Schema) -> List[str]:
+    """Suggestions for requests of one effect that could be a single request"""
+    suggestions = []
+    selects = [query for query in requests if query.kind == 'select' and query.table]
+    merged: Set[int] = set()
+    for parent in selects:
+        parent_filters = dict(parent.eq_filters)
+        for child in selects:
+            table = schema.tables.get(child.table)
+            if child is parent or table is None or id(child) in merged:
+                continue
+            for relationship in table.relationships:
+                if relationship.referenced_table != parent.table or len(relationship.columns) != 1:
+                    continue
+                value = dict(child.eq_filters).get(relationship.columns[0])
+                if value is not None and parent_filters.get(relationship.referenced_columns[0]) == value:
+                    merged.add(id(child))
+                    suggestions.append(
+                        f"{child.table} (line {child.line}) can be embedded in the {parent.table} "
+                        f"query (line {parent.line}): .select('*, {child.table}(*)')")
+
+    by_table: Dict[str, List[Query]] = {}
+    for query in selects:
+        if id(query) not in merged:
+            by_table.setdefault(query.table, []).append(query)
+    for table, queries in by_table.items():
+        for query in queries[1:]:
+            suggestions.append(
+                f"{table} queried again (line {query.line}, first on line {queries[0].line}): "
+                f"fetch both in one request and split client-side")
+    return suggestions
+
+
+def _callbacks(code: str, span: Tuple[int, int], named: Set[int],
+               own_callback: bool) -> List[Tuple[int, int]]:
+    """Bodies of the anonymous arrow functions in span: handlers, not run on the spot
+
+    With own_callback, the first arrow is the function span itself runs
+    (an effect's callback) and is kept.
+    """
+    bodies = []
+    for match in _ARROW.finditer(code, span[0], span[1]):
+        if own_callback:
+            own_callback = False
+            continue
+        body = match.end()
+        if body in named or any(start <= body < end for start, end in bodies):
+            continue
+        if code.startswith('{', body):
+            bodies.append((body, _match_bracket(code, body)))
+        else:
+            end = re.compile(r'[,;)\n]').search(code, body)
+            bodies.append((body, end.start() if end else span[1]))
+    return bodies
+
+
+def analyze_effects(content: str, queries: List[Query], schema: Schema, code: Optional[str] = None,
+                    spans: Optional[Dict[str, Tuple[int, int]]] = None) -> List[EffectReport]:
+    code = lex(content).code_view() if code is None else code
+    spans = _functions(code) if spans is None else spans
+    named = {start for start, _ in spans.values()}
+    effects = []
+
+    def items_in(span: Tuple[int, int], stack: Tuple[str, ...],
+                 own_callback: bool = False) -> List[Tuple[int, bool, list]]:
+        """(position, awaited, requests as nested items) of what span runs, in order"""
+        items = []
+        inner = [other for other in spans.values() if span[0] < other[0] and other[1] <= span[1]]
+        inner += _callbacks(code, span, named, own_callback)
+        for query in queries:
+            if span[0] <= query.start < span[1] and not any(s[0] <= query.start < s[1] for s in inner):
+                items.append((query.start, query.awaited, [query]))
+        for match in _CALL.finditer(code, span[0], span[1]):
+            name = match.group(1)
+            if (name in _NOT_CALLS or name not in spans or name in stack
+                    or any(s[0] <= match.start() < s[1] for s in inner)):
+                continue
+            nested = items_in(spans[name], stack + (name,))
+            if nested:
+                awaited = bool(_AWAIT_BEFORE.search(code[max(0, match.start() - 20):match.start()]))
+                items.append((match.start(), awaited, nested))
+        for match in _PROMISE_ALL.finditer(code, span[0], span[1]):
+            end = _match_bracket(code, match.end() - 1)
+            awaited = bool(_AWAIT_BEFORE.search(code[max(0, match.start() - 20):match.start()]))
+            grouped = [item for item in items if match.start() < item[0] < end]
+            if grouped:
+                items = [item for item in items if item not in grouped]
+                items.append((match.start(), awaited, [(position, False, nested)
+                                                       for position, _, nested in grouped]))
+        return sorted(items, key=lambda item: item[0])
+
+    def critical(items) -> int:
+        elapsed, finish = 0, 0
+        for _, awaited, nested in items:
+            depth = 1 if len(nested) == 1 and isinstance(nested[0], Query) else critical(nested)
+            if awaited:
+                elapsed += depth
+            finish = max(finish, elapsed + (0 if awaited else depth))
+        return max(elapsed, finish)
+
+    def flatten(items) -> List[Query]:
+        found = []
+        for _, _, nested in items:
+            for entry in nested:
+                for query in [entry] if isinstance(entry, Query) else flatten([entry]):
+                    if query not in found:
+                        found.append(query)
+        return found
+
+    for match in _EFFECT.finditer(code):
+        span = (match.end() - 1, _match_bracket(code, match.end() - 1))
+        items = items_in(span, (), own_callback=True)
+        requests = flatten(items)
+        if not requests:
+            continue
+        longest: Dict[int, int] = {}
+        for index, query in enumerate(requests):
+            longest[index] = 1 + max((longest[earlier] for earlier in range(index)
+                                      if _depends(query, requests[earlier], content, code)), default=0)
+        effects.append(EffectReport(content.count('\n', 0, match.start()) + 1, tuple(requests),
+                                    critical(items), min(max(longest.values()), critical(items)),
+                                    tuple(_merges(requests, schema))))
+    return effects
+
+
+def analyze_file(file_path: Path, content: str, schema: Schema) -> FileReport:
+    code = lex(content).code_view()
+    queries = find_queries(content, code)
+    if not queries:
+        return FileReport(Path(file_path), (), (), ())
+    spans = _functions(code)
+    usages = [usage for usage in (column_usage(content, query, schema, code, spans)
+                                  for query in queries)
+              if usage is not None]
+    effects = analyze_effects(content, queries, schema, code, spans)
+    return FileReport(Path(file_path), tuple(queries), tuple(usages), tuple(effects))
+
+
+def analyze_tree(directories: List[Path], schema: Schema) -> List[FileReport]:
+    files = [f for directory in directories if directory.exists() for f in walk_files(directory)]
+    return [analyze_file(scanned.path, scanned.content, schema)
+            for scanned in scan_sources(files, b'supabase') if scanned.content is not None]
+
+
+def ranked(reports: List[FileReport], rtt_ms: float = DEFAULT_RTT_MS,
+           request_cost_ms: float = DEFAULT_REQUEST_COST_MS) -> List[FileReport]:
+    """Files with queries, most avoidable latency first, then most unused columns"""
+    return sorted((report for report in reports if report.queries),
+                  key=lambda report: (-report.avoidable_ms(rtt_ms, request_cost_ms),
+                                      -report.unused_columns, str(report.path)))
+
+
+def to_dict(report: FileReport, rtt_ms: float, request_cost_ms: float) -> dict:
+    return {
+        'path': report.path.as_posix(),
+        'tables': report.tables,
+        'avoidable_ms': report.avoidable_ms(rtt_ms, request_cost_ms),
+        'queries': [{'line': query.line, 'kind': query.kind, 'table': query.table,
+                     'columns': list(query.columns) if query.columns is not None else '*',
+                     'embeds': list(query.embeds), 'awaited': query.awaited}
+                    for query in report.queries],
+        'columns': [{'line': usage.query.line, 'table': usage.query.table,
+                     'fetched': len(usage.fetched),
+                     'used': list(usage.used) if usage.used is not None else None,
+                     'unused': list(usage.unused)}
+                    for usage in report.usages],
+        'effects': [{'line': effect.line, 'requests': len(effect.requests),
+                     'critical_path': effect.critical_path,
+                     'shortest_path': effect.shortest_path, 'merges': list(effect.merges)}
+                    for effect in report.effects],
+    }
+
+
+def print_report(report: FileReport, rtt_ms: float, request_cost_ms: float):
+    print(f"\n{report.path}  ~{report.avoidable_ms(rtt_ms, request_cost_ms):.0f} ms avoidable, "
+          f"{report.unused_columns} unused columns fetched")
+    print(f"  tables: {', '.join(report.tables) or '-'}")
+    for usage in report.usages:
+        star = ' (*)' if usage.query.columns is None else ''
+        if usage.used is None:
+            detail = 'usage not traceable (passed on as a whole or not bound)'
+        else:
+            detail = f"{len(usage.used)} used" + (f": {', '.join(usage.used)}" if usage.used else '')
+        print(f"  line {usage.query.line}: {usage.query.table} fetches "
+              f"{len(usage.fetched)} columns{star}, {detail}")
+    for effect in report.effects:
+        if not effect.avoidable_round_trips and not effect.merges:
+            continue
+        print(f"  useEffect (line {effect.line}): {len(effect.requests)} requests, "
+              f"{effect.critical_path} round trip(s) in sequence, {effect.shortest_path} needed")
+        for suggestion in effect.merges:
+            print(f"    - {suggestion}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Report over-fetching and avoidable round trips in Supabase queries')
+    parser.add_argument('directories', nargs='*', type=Path,
+                        default=[Path('app'), Path('components'), Path('hooks'), Path('lib')])
+    parser.add_argument('--top', type=int, default=10, help='pages to detail (default: 10)')
+    parser.add_argument('--rtt', type=float, default=DEFAULT_RTT_MS, metavar='MS',
+                        help=f'cost of a sequential round trip (default: {DEFAULT_RTT_MS:g})')
+    parser.add_argument('--request-cost', type=float, default=DEFAULT_REQUEST_COST_MS, metavar='MS',
+                        help='cost of an extra request run in parallel '
+                             f'(default: {DEFAULT_REQUEST_COST_MS:g})')
+    parser.add_argument('--json', type=Path, metavar='PATH', help='write the full report as JSON')
+    args = parser.parse_args()
+
+    schema = load_schema()
+    reports = ranked(analyze_tree(args.directories, schema), args.rtt, args.request_cost)
+    queries = sum(len(report.queries) for report in reports)
+    star = sum(1 for report in reports for query in report.queries
+               if query.kind == 'select' and query.table and query.columns is None)
+    print(f"{queries} requests in {len(reports)} files, {star} selects of every column")
+
+    for report in reports[:args.top]:
+        print_report(report, args.rtt, args.request_cost)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([to_dict(report, args.rtt, args.request_cost) for report in reports], f,
+                      indent=2)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
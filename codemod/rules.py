@@ -0,0 +1,233 @@
+"""
+Ordered rule registry built from the three fixer scripts.
+
+Each script becomes a Stage: the directories it scans, the check it uses to
+decide whether a file is worth processing, and its fix functions in the
+order its process_file applies them. Running the stages in order over one
+in-memory copy of a file gives the same result as running
+fix-types.py, fix-types-phase2.py and fix-all-types.py one after another.
+"""
+
+import hashlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from codemod.anchors import AnchorIndex
+from codemod.cache import fingerprint
+from codemod.instrument import run_rule
+from codemod.schema import Schema
+from codemod.scripts import load_script
+
+
+class Rule:
+    """A single fix function taken from one of the scripts"""
+
+    def __init__(self, name: str, func: Callable, takes_path: bool = True,
+                 returns_flag: bool = True, anchors: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.takes_path = takes_path
+        self.returns_flag = returns_flag
+        self.anchors = tuple(anchors)
+        self.anchors_fingerprint = hashlib.sha256(
+            '\0'.join(self.anchors).encode()).hexdigest()[:16]
+        self._fingerprint: Optional[str] = None
+        self.key = name
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the function's source and anchors, computed on first use
+
+        Only the caches need it, so check mode and the server never pay for
+        parsing the scripts.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = fingerprint(self.func) + self.anchors_fingerprint
+        return self._fingerprint
+
+    def apply(self, content: str, file_path: str) -> Tuple[str, bool]:
+        """Run the fix and return (content, modified) whatever its signature"""
+        if self.takes_path:
+            result = run_rule(self.key, self.func, content, file_path)
+        else:
+            result = run_rule(self.key, self.func, content)
+
+        if self.returns_flag:
+            return result
+
+        return result, result != content
+
+
+class Stage:
+    """The rules of one script plus the directories and gate it uses"""
+
+    def __init__(self, name: str, roots: Tuple[str, ...], gate: Callable[[str], bool],
+                 rules: List[Rule], finalize: Optional[Rule] = None):
+        self.name = name
+        self.roots = roots
+        self.gate = gate
+        self.rules = rules
+        self.finalize = finalize
+
+        # Cache keys include the position so reordering rules invalidates too
+        self.gate_key = f'{name}:gate'
+        for index, rule in enumerate(rules):
+            rule.key = f'{name}:{index}:{rule.name}'
+        if finalize is not None:
+            finalize.key = f'{name}:finalize:{finalize.name}'
+
+        self.anchor_index = AnchorIndex({rule.key: rule.anchors for rule in rules})
+
+    def fingerprints(self) -> Dict[str, str]:
+        """Fingerprint of the gate and of every rule, by cache key
+
+        A rule skipped for lack of anchors only depends on its anchors, so
+        those get a key of their own.
+        """
+        result = {self.gate_key: fingerprint(self.gate)}
+        for rule in self.rules + ([self.finalize] if self.finalize else []):
+            result[rule.key] = rule.fingerprint
+            result[rule.key + ':anchors'] = rule.anchors_fingerprint
+        return result
+
+    def covers(self, relative_path: str) -> bool:
+        """Check whether a project-relative path is inside this stage's roots"""
+        return relative_path.split('/', 1)[0] in self.roots
+
+    def apply(self, content: str, file_path: str) -> Tuple[str, bool, List[str]]:
+        """Apply every rule of the stage to the content
+
+        Returns the new content, whether it changed and the cache keys of
+        everything that was evaluated.
+        """
+        if not self.gate(content):
+            self.anchor_index.select(None)
+            return content, False, [self.gate_key]
+
+        runnable = self.anchor_index.select(content)
+        stage_modified = False
+        evaluated = [self.gate_key]
+        for rule in self.rules:
+            if rule.key not in runnable:
+                evaluated.append(rule.key + ':anchors')
+                continue
+            content, modified = rule.apply(content, file_path)
+            stage_modified = stage_modified or modified
+            evaluated.append(rule.key)
+
+        if stage_modified and self.finalize is not None:
+            content, _ = self.finalize.apply(content, file_path)
+            evaluated.append(self.finalize.key)
+
+        return content, stage_modified, evaluated
+
+    def evaluated_keys(self, content: str) -> List[str]:
+        """Cache keys apply() evaluates on content it leaves unchanged
+
+        For scripts that run the rules themselves: computed from the gate
+        and the anchors alone, without running a rule.
+        """
+        if not self.gate(content):
+            return [self.gate_key]
+        runnable = self.anchor_index.matching_rules(content)
+        return [self.gate_key] + [rule.key if rule.key in runnable else rule.key + ':anchors'
+                                  for rule in self.rules]
+
+    def first_change(self, content: str, file_path: str) -> Optional[Tuple[Rule, str]]:
+        """The first rule that would change the content and its output
+
+        Stops there, so checking a file never runs more rules than needed.
+        """
+        if not self.gate(content):
+            self.anchor_index.select(None)
+            return None
+
+        runnable = self.anchor_index.select(content)
+        for rule in self.rules:
+            if rule.key not in runnable:
+                continue
+            new_content, _ = rule.apply(content, file_path)
+            if new_content != content:
+                return rule, new_content
+        return None
+
+
+def always(content: str) -> bool:
+    """Gate for scripts that process every file"""
+    return True
+
+
+def registry_fingerprints(stages: List[Stage]) -> Dict[str, str]:
+    """Fingerprints of every gate and rule in the registry"""
+    result = {}
+    for stage in stages:
+        result.update(stage.fingerprints())
+    return result
+
+
+def _script_rule(module, func: Callable, **kwargs) -> Rule:
+    return Rule(func.__name__, func, anchors=module.RULE_ANCHORS[func.__name__], **kwargs)
+
+
+def script_stage(name: str, module) -> Stage:
+    """The stage of one fixer script, from its loaded module
+
+    The scripts build their own stage with this to key their caches per
+    rule, the same way the pipeline does.
+    """
+    if name == 'fix-types':
+        return Stage(
+            'fix-types',
+            ('components',),
+            always,
+            [
+                _script_rule(module, module.add_import_after_react,
+                             takes_path=False, returns_flag=False),
+                _script_rule(module, module.replace_type_definitions,
+                             takes_path=False, returns_flag=False),
+                _script_rule(module, module.add_null_coalescing_for_booleans,
+                             takes_path=False, returns_flag=False),
+            ],
+        )
+    if name == 'fix-types-phase2':
+        return Stage(
+            'fix-types-phase2',
+            ('app', 'components'),
+            module.needs_processing,
+            [
+                _script_rule(module, module.fix_blog_page_types),
+                _script_rule(module, module.fix_destinations_page),
+                _script_rule(module, module.fix_experiences_page),
+                _script_rule(module, module.fix_journeys_page),
+                _script_rule(module, module.fix_useState_any),
+            ],
+        )
+    if name == 'fix-all-types':
+        return Stage(
+            'fix-all-types',
+            ('app', 'components'),
+            module.needs_processing,
+            [_script_rule(module, fix, takes_path=takes_path) for fix, takes_path in module.FIXES],
+            finalize=Rule('add_types_import', module.add_types_import, takes_path=False),
+        )
+    raise ValueError(f"unknown stage: {name!r}")
+
+
+# Stage name -> module name of its script, in the order the stages run
+SCRIPTS = {
+    'fix-types': 'fix_types',
+    'fix-types-phase2': 'fix_types_phase2',
+    'fix-all-types': 'fix_all_types',
+}
+
+
+def build_registry(names: Optional[Iterable[str]] = None,
+                   schema: Optional[Schema] = None) -> List[Stage]:
+    """Build the ordered stages from fix-types, phase 2 and fix-all-types
+
+    With names, only those stages are built and only their scripts loaded.
+    With a schema, the rules use it instead of the one the scripts load
+    from the current directory.
+    """
+    names = None if names is None else set(names)
+    return [script_stage(name, load_script(module_name, schema))
+            for name, module_name in SCRIPTS.items() if names is None or name in names]
@@ -0,0 +1,481 @@
+"""
+Indexed view of the Supabase schema in integrations/supabase/types.ts.
+
+The generated `Database` type is parsed once into tables (Row, Insert and
+Update columns with their nullability, and foreign keys), function return
+types and enums.
+The result is stored under .codemod-cache/ keyed by the hash of types.ts,
+so later runs load a small JSON file instead of parsing the TypeScript
+again, and a regenerated types.ts is picked up automatically.
+
+On top of the parsed schema sit the lookups the rules need: type name to
+table (`Enquiry` -> enquiries), identifier or path to table (`journeyDays`
+-> journey_days, `app/blog/[id]/page.tsx` -> packages) and nullable columns
+by type. Names are split into words and looked up in dicts, so a rule asks
+one question instead of walking a chain of substring checks.
+"""
+
+import hashlib
+import json
+import os
+import re
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from codemod.cache import CACHE_DIR
+from codemod.lexer import lex
+
+TYPES_PATH = Path('integrations') / 'supabase' / 'types.ts'
+SCHEMA_VERSION = 2
+
+# Words that name a table without being derived from its name
+NAME_ALIASES = {
+    'blog': 'packages',
+    'post': 'packages',
+    'blog_post': 'packages',
+    'day': 'journey_days',
+}
+
+# Type names the components use for tables whose names differ from them
+TYPE_ALIASES = {
+    'Activity': 'resort_activities',
+    'GalleryItem': 'resort_gallery',
+}
+
+_MEMBER = re.compile(r'(\w+|\[[^\]]*\])(\??)\s*:\s*')
+_WORD = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+')
+_RELATIONSHIP = re.compile(r'\{([^{}]*)\}')
+_QUOTED = re.compile(r'"([^"]*)"')
+
+
+class Column(NamedTuple):
+    name: str
+    type: str
+    nullable: bool
+    optional: bool
+
+
+class Relationship(NamedTuple):
+    """A foreign key from columns of one table to another"""
+    columns: Tuple[str, ...]
+    referenced_table: str
+    referenced_columns: Tuple[str, ...]
+    one_to_one: bool
+
+
+class FunctionReturn(NamedTuple):
+    # The TypeScript type text, or 'object' when columns are given
+    type: str
+    columns: Dict[str, Column]
+    returns_set: bool
+
+
+class Table:
+    """Row, Insert and Update columns of one table, and its foreign keys"""
+
+    def __init__(self, name: str, row: Dict[str, Column], insert: Dict[str, Column],
+                 update: Dict[str, Column], relationships: Tuple[Relationship, ...] = ()):
+        self.name = name
+        self.row = row
+        self.insert = insert
+        self.update = update
+        self.relationships = relationships
+
+
+class ObjectType:
+    """An object type literal, optionally followed by `[]`"""
+
+    def __init__(self, members: Dict[str, Tuple[Union['ObjectType', str], bool]],
+                 array: bool = False):
+        self.members = members
+        self.array = array
+
+
+def _type_end(text: str, i: int) -> int:
+    """End of a member's type expression starting at i
+
+    A type ends at `;` or a newline outside brackets, unless the next line
+    continues a union with `|`.
+    """
+    depth = 0
+    length = len(text)
+    while i < length:
+        char = text[i]
+        if char in '([{<':
+            depth += 1
+        elif char in ')]}>':
+            if depth == 0:
+                return i
+            depth -= 1
+        elif char == ';' and depth == 0:
+            return i
+        elif char == '\n' and depth == 0:
+            following = text[i:].lstrip()
+            if not following.startswith('|'):
+                return i
+        i += 1
+    return i
+
+
+def parse_object(text: str, i: int) -> Tuple[ObjectType, int]:
+    """Parse the object type whose `{` is at i; returns it and the index after `}`"""
+    members = {}
+    i += 1
+    length = len(text)
+    while i < length:
+        while i < length and text[i] in ' \t\r\n;,':
+            i += 1
+        if i >= length or text[i] == '}':
+            break
+
+        match = _MEMBER.match(text, i)
+        if match is None:
+            # Something this parser does not model (call signature etc.)
+            i = _type_end(text, i) + 1
+            continue
+
+        name, optional = match.group(1), bool(match.group(2))
+        i = match.end()
+        if text[i] == '{':
+            value, i = parse_object(text, i)
+            if text.startswith('[]', i):
+                value.array = True
+                i += 2
+        else:
+            end = _type_end(text, i)
+            value = ' '.join(text[i:end].split())
+            i = end
+        members[name] = (value, optional)
+
+    return ObjectType(members), i + 1
+
+
+def _strip_comments(content: str) -> str:
+    """Blank out comments, keeping string literals such as enum values"""
+    source = lex(content)
+    pieces = []
+    cursor = 0
+    for start, end, kind in source.regions:
+        if kind != 'comment':
+            continue
+        pieces.append(content[cursor:start])
+        pieces.append(re.sub(r'[^\n]', ' ', content[start:end]))
+        cursor = end
+    pieces.append(content[cursor:])
+    return ''.join(pieces)
+
+
+def _is_nullable(type_text: str) -> bool:
+    return 'null' in (part.strip() for part in type_text.split('|'))
+
+
+def _columns(value) -> Dict[str, Column]:
+    if not isinstance(value, ObjectType):
+        return {}
+    return {
+        name: Column(name, type_text, _is_nullable(type_text), optional)
+        for name, (type_text, optional) in value.members.items()
+        if isinstance(type_text, str)
+    }
+
+
+def _relationships(value) -> List[list]:
+    """[columns, referenced table, referenced columns, one to one] per foreign key"""
+    if not isinstance(value, str):
+        return []
+    relationships = []
+    for match in _RELATIONSHIP.finditer(value):
+        fields = dict(re.findall(r'(\w+)\s*:\s*(\[[^\]]*\]|"[^"]*"|\w+)', match.group(1)))
+        if 'referencedRelation' not in fields:
+            continue
+        relationships.append([
+            _QUOTED.findall(fields.get('columns', '')),
+            fields['referencedRelation'].strip('"'),
+            _QUOTED.findall(fields.get('referencedColumns', '')),
+            fields.get('isOneToOne') == 'true',
+        ])
+    return relationships
+
+
+def _member(obj: Optional[ObjectType], name: str) -> Optional[ObjectType]:
+    if obj is None or name not in obj.members:
+        return None
+    value = obj.members[name][0]
+    return value if isinstance(value, ObjectType) else None
+
+
+def parse_types(content: str) -> dict:
+    """Parse the public schema of a generated types.ts into plain data"""
+    text = _strip_comments(content)
+    start = re.search(r'export\s+type\s+Database\s*=\s*\{', text)
+    if start is None:
+        return {'tables': {}, 'functions': {}, 'enums': {}}
+
+    database, _ = parse_object(text, start.end() - 1)
+    public = _member(database, 'public')
+
+    tables = {}
+    for name, (value, _) in (_member(public, 'Tables') or ObjectType({})).members.items():
+        if not isinstance(value, ObjectType):
+            continue
+        tables[name] = {
+            section.lower(): [list(column) for column in _columns(_member(value, section)).values()]
+            for section in ('Row', 'Insert', 'Update')
+        }
+        tables[name]['relationships'] = _relationships(
+            value.members.get('Relationships', (None, False))[0])
+
+    functions = {}
+    for name, (value, _) in (_member(public, 'Functions') or ObjectType({})).members.items():
+        if not isinstance(value, ObjectType) or 'Returns' not in value.members:
+            continue
+        returns = value.members['Returns'][0]
+        if isinstance(returns, ObjectType):
+            functions[name] = {
+                'type': 'object',
+                'columns': [list(column) for column in _columns(returns).values()],
+                'returns_set': returns.array,
+            }
+        else:
+            functions[name] = {
+                'type': returns,
+                'columns': [],
+                'returns_set': returns.endswith('[]'),
+            }
+
+    enums = {}
+    for name, (value, _) in (_member(public, 'Enums') or ObjectType({})).members.items():
+        if isinstance(value, str):
+            enums[name] = re.findall(r'"([^"]*)"', value)
+
+    return {'tables': tables, 'functions': functions, 'enums': enums}
+
+
+def _singular(word: str) -> str:
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith(('sses', 'xes', 'ches', 'shes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def name_words(name: str) -> List[str]:
+    """Split an identifier or path segment into singular lowercase words"""
+    return [_singular(word.lower()) for word in _WORD.findall(name)]
+
+
+class Schema:
+    """Tables, functions and enums of the public schema, with lookup indexes"""
+
+    def __init__(self, data: dict, digest: str = '', project_root: Optional[Path] = None):
+        self.digest = digest
+        # Paths given to table_for_path are taken relative to this (or to
+        # the current directory, for files outside it)
+        self.project_root = project_root
+        self.tables: Dict[str, Table] = {}
+        for name, sections in data.get('tables', {}).items():
+            row, insert, update = (
+                {column[0]: Column(*column) for column in sections.get(section, [])}
+                for section in ('row', 'insert', 'update')
+            )
+            relationships = tuple(
+                Relationship(tuple(columns), referenced, tuple(referenced_columns), one_to_one)
+                for columns, referenced, referenced_columns, one_to_one
+                in sections.get('relationships', []))
+            self.tables[name] = Table(name, row, insert, update, relationships)
+
+        self.functions: Dict[str, FunctionReturn] = {
+            name: FunctionReturn(spec['type'],
+                                 {column[0]: Column(*column) for column in spec['columns']},
+                                 spec['returns_set'])
+            for name, spec in data.get('functions', {}).items()
+        }
+        self.enums: Dict[str, List[str]] = dict(data.get('enums', {}))
+
+        # Singular word sequence -> table, e.g. ('journey', 'day') -> journey_days
+        self.tables_by_words: Dict[Tuple[str, ...], str] = {}
+        for name in self.tables:
+            self.tables_by_words[tuple(name_words(name))] = name
+        for alias, table in NAME_ALIASES.items():
+            if table in self.tables:
+                self.tables_by_words.setdefault(tuple(name_words(alias)), table)
+        self.longest_key = max((len(words) for words in self.tables_by_words), default=0)
+
+        # PascalCase singular type name -> table, e.g. MealPlan -> meal_plans
+        self.tables_by_type: Dict[str, str] = {}
+        for name in self.tables:
+            type_name = ''.join(word.capitalize() for word in name_words(name))
+            self.tables_by_type[type_name] = name
+        for type_name, table in TYPE_ALIASES.items():
+            if table in self.tables:
+                self.tables_by_type[type_name] = table
+
+        # Column name -> tables whose Row has it
+        self.tables_by_column: Dict[str, List[str]] = {}
+        for table in self.tables.values():
+            for column in table.row:
+                self.tables_by_column.setdefault(column, []).append(table.name)
+
+    @classmethod
+    def parse(cls, content: str) -> 'Schema':
+        return cls(parse_types(content), hashlib.sha256(content.encode('utf-8')).hexdigest())
+
+    def table_for_type(self, type_name: str) -> Optional[str]:
+        """Table behind a component type name such as `Enquiry`"""
+        return self.tables_by_type.get(type_name)
+
+    def table_for_name(self, name: str) -> Optional[str]:
+        """Table an identifier refers to, e.g. `relatedPosts` -> packages
+
+        Longer word sequences win over shorter ones, and among equally long
+        matches the rightmost (the head of a compound name) wins.
+        """
+        words = name_words(name)
+        for size in range(min(self.longest_key, len(words)), 0, -1):
+            for start in range(len(words) - size, -1, -1):
+                table = self.tables_by_words.get(tuple(words[start:start + size]))
+                if table is not None:
+                    return table
+        return None
+
+    def table_for_path(self, file_path: Union[str, Path]) -> Optional[str]:
+        """Table a source file is about, from its deepest matching path segment"""
+        path = Path(file_path)
+        for root in filter(None, (self.project_root, Path.cwd())):
+            try:
+                path = path.resolve().relative_to(root.resolve())
+                break
+            except (OSError, ValueError):
+                pass
+        for segment in reversed(path.with_suffix('').parts):
+            table = self.table_for_name(segment)
+            if table is not None:
+                return table
+        return None
+
+    def is_singular_name(self, name: str) -> bool:
+        """Whether an identifier is exactly one row of a table (`blogPost`, not `posts`)"""
+        words = [word.lower() for word in _WORD.findall(name)]
+        return bool(words) and words == name_words(name) \
+            and tuple(words) in self.tables_by_words
+
+    def nullable_columns(self, type_name: str) -> List[str]:
+        """Row columns declared as `<type_name> | null` in any table"""
+        return sorted({
+            column.name
+            for table in self.tables.values()
+            for column in table.row.values()
+            if column.nullable and type_name in (
+                part.strip() for part in column.type.split('|'))
+        })
+
+    def to_dict(self) -> dict:
+        return {
+            'tables': {
+                table.name: {
+                    'row': [list(column) for column in table.row.values()],
+                    'insert': [list(column) for column in table.insert.values()],
+                    'update': [list(column) for column in table.update.values()],
+                    'relationships': [[list(relationship.columns), relationship.referenced_table,
+                                       list(relationship.referenced_columns),
+                                       relationship.one_to_one]
+                                      for relationship in table.relationships],
+                }
+                for table in self.tables.values()
+            },
+            'functions': {
+                name: {
+                    'type': spec.type,
+                    'columns': [list(column) for column in spec.columns.values()],
+                    'returns_set': spec.returns_set,
+                }
+                for name, spec in self.functions.items()
+            },
+            'enums': self.enums,
+        }
+
+
+def _cache_path(project_root: Path, digest: str) -> Path:
+    return project_root / CACHE_DIR / f'schema-{digest[:16]}.json'
+
+
+def load_cached_schema(project_root: Path, digest: str) -> Optional[Schema]:
+    """A schema version parsed by an earlier run, if it is still cached"""
+    try:
+        with open(_cache_path(project_root, digest), 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('version') == SCHEMA_VERSION:
+            return Schema(cached['schema'], digest, project_root)
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def _default_root() -> Path:
+    from codemod.scripts import PROJECT_ROOT
+    cwd = Path.cwd()
+    return cwd if (cwd / TYPES_PATH).exists() else PROJECT_ROOT
+
+
+@lru_cache(maxsize=None)
+def _load(project_root: Path) -> Schema:
+    types_path = project_root / TYPES_PATH
+    try:
+        with open(types_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return Schema({}, project_root=project_root)
+
+    digest = hashlib.sha256(data).hexdigest()
+    cached = load_cached_schema(project_root, digest)
+    if cached is not None:
+        return cached
+
+    content = data.decode('utf-8').replace('\r\n', '\n')
+    schema = Schema(parse_types(content), digest, project_root)
+
+    cache_path = _cache_path(project_root, digest)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': SCHEMA_VERSION, 'schema': schema.to_dict()}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+
+    return schema
+
+
+# What load_schema() without a project returns while set, see preset_schema()
+_preset: Optional[Schema] = None
+
+
+@contextmanager
+def preset_schema(schema: Schema) -> Iterator[None]:
+    """Make load_schema() without a project return schema inside the block
+
+    codemod.scripts imports a copy of the fixer scripts this way, so the
+    SCHEMA they load at import time is that of another project.
+    """
+    global _preset
+    previous, _preset = _preset, schema
+    try:
+        yield
+    finally:
+        _preset = previous
+
+
+def load_schema(project_root: Optional[Path] = None) -> Schema:
+    """The schema of a project's types.ts, parsed at most once per version
+
+    Defaults to the current directory when it has a types.ts, otherwise
+    the project the codemod package belongs to.
+    """
+    if project_root is None and _preset is not None:
+        return _preset
+    return _load(Path(project_root or _default_root()).resolve())
@@ -0,0 +1,65 @@
+"""
+Load the hyphenated fixer scripts as importable modules.
+
+The scripts read the Supabase schema at import time. For a project other
+than the one the process runs in, load_script() takes that project's
+schema and imports a separate copy of the script bound to it.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, Optional, Tuple
+
+from codemod.schema import Schema, load_schema, preset_schema
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+SCRIPT_FILES = {
+    'fix_types': 'fix-types.py',
+    'fix_types_phase2': 'fix-types-phase2.py',
+    'fix_all_types': 'fix-all-types.py',
+}
+
+_loaded: Dict[str, ModuleType] = {}
+# Copies bound to another project's schema, by (name, project root, schema digest)
+_bound: Dict[Tuple[str, Optional[Path], str], ModuleType] = {}
+
+
+def load_script(name: str, schema: Optional[Schema] = None) -> ModuleType:
+    """Import one of the fixer scripts by its module-style name
+
+    With a schema other than the one the script loads by default, a copy
+    whose SCHEMA (and everything derived from it) is that schema.
+    """
+    if schema is not None and schema is not load_schema():
+        key = (name, schema.project_root, schema.digest)
+        if key not in _bound:
+            module_name = f'{name}@{schema.digest[:16] or "empty"}'
+            spec = importlib.util.spec_from_file_location(
+                module_name, PROJECT_ROOT / SCRIPT_FILES[name])
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            with preset_schema(schema):
+                spec.loader.exec_module(module)
+            _bound[key] = module
+        return _bound[key]
+
+    if name in _loaded:
+        return _loaded[name]
+
+    path = PROJECT_ROOT / SCRIPT_FILES[name]
+
+    # The script being run (e.g. fix-all-types.py --check) is not loaded twice
+    main = sys.modules.get('__main__')
+    if getattr(main, '__file__', None) and Path(main.__file__).resolve() == path:
+        _loaded[name] = main
+        return main
+
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    _loaded[name] = module
+    return module
@@ -0,0 +1,126 @@
+"""
+Long-lived JSON-RPC 2.0 server over stdin/stdout, one message per line.
+
+Lets a Node build step or an editor save hook run the fixes without paying
+for a fresh interpreter, script import and schema parse on every file:
+
+    python -m codemod.server
+
+Run it from the project root, like the scripts, or pass --project.
+
+Methods:
+
+- `fix` with params `{"files": [{"path": ..., "content": ...}, ...]}`
+  returns `{"files": [{"path", "content", "changed", "stages",
+  "diagnostics"}, ...]}`. Nothing is read from or written to disk; paths
+  are project-relative (or absolute inside the project) and only decide
+  which stages apply and which table a file is about.
+- `ping` returns `"pong"`.
+- `shutdown` returns `null` and stops the server after replying.
+
+Requests without an `id` are notifications and get no reply. Anything the
+rules print goes to stderr so it cannot corrupt the protocol stream.
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+from pathlib import Path
+from typing import Any, Optional, TextIO
+
+from codemod.api import Fixer
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class Server:
+    """Dispatches JSON-RPC requests to a Fixer"""
+
+    def __init__(self, fixer: Fixer):
+        self.fixer = fixer
+        self.running = True
+
+    def rpc_ping(self, params: Any) -> str:
+        return 'pong'
+
+    def rpc_shutdown(self, params: Any) -> None:
+        self.running = False
+        return None
+
+    def rpc_fix(self, params: Any) -> dict:
+        files = params.get('files') if isinstance(params, dict) else None
+        if not isinstance(files, list) or not all(
+                isinstance(item, dict) and isinstance(item.get('path'), str)
+                and isinstance(item.get('content'), str) for item in files):
+            raise RpcError(INVALID_PARAMS, 'expected {"files": [{"path": str, "content": str}]}')
+        return {'files': [result.to_dict() for result in self.fixer.fix_batch(files)]}
+
+    def handle(self, line: str) -> Optional[dict]:
+        """The reply to one line of input, or None for a notification"""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return _error(None, PARSE_ERROR, f'parse error: {e}')
+
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return _error(request.get('id') if isinstance(request, dict) else None,
+                          INVALID_REQUEST, 'invalid request')
+
+        request_id = request.get('id')
+        try:
+            method = getattr(self, 'rpc_' + request['method'], None)
+            if method is None:
+                raise RpcError(METHOD_NOT_FOUND, f"method not found: {request['method']}")
+            result = method(request.get('params'))
+        except RpcError as e:
+            reply = _error(request_id, e.code, e.message)
+        except Exception as e:
+            reply = _error(request_id, INTERNAL_ERROR, str(e))
+        else:
+            reply = {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+        return reply if 'id' in request else None
+
+    def serve(self, input_stream: TextIO, output_stream: TextIO):
+        for line in input_stream:
+            if not line.strip():
+                continue
+            with contextlib.redirect_stdout(sys.stderr):
+                reply = self.handle(line)
+            if reply is not None:
+                output_stream.write(json.dumps(reply) + '\n')
+                output_stream.flush()
+            if not self.running:
+                break
+
+
+def _error(request_id: Any, code: int, message: str) -> dict:
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON-RPC server for the TypeScript fixes')
+    parser.add_argument('--project', type=Path, default=None,
+                        help='project whose files and schema to use (default: the current directory)')
+    args = parser.parse_args()
+
+    output_stream = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        fixer = Fixer(args.project)
+    Server(fixer).serve(sys.stdin, output_stream)
+
+
+if __name__ == '__main__':
+    main()
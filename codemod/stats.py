@@ -0,0 +1,25 @@
+"""
+Process-wide counters that survive --jobs runs.
+
+Code anywhere in the engine adds to `counters`. In a worker process the
+counters are snapshotted and reset around every task and shipped back with
+its result, and the parent merges them, so totals come out the same for
+serial and parallel runs.
+"""
+
+from collections import Counter
+
+counters: Counter = Counter()
+
+
+def take() -> Counter:
+    """Return the counters collected so far and start from zero"""
+    global counters
+    snapshot = counters
+    counters = Counter()
+    return snapshot
+
+
+def merge(delta: Counter):
+    """Add counters collected elsewhere (e.g. in a worker) to this process"""
+    counters.update(delta)
@@ -0,0 +1,178 @@
+"""
+Directory walker shared by the fixer scripts.
+
+Built on os.scandir: excluded directories (node_modules, build output, and
+anything matched by the project .gitignore) are pruned before the walker
+descends into them, instead of globbing the whole tree and filtering the
+results afterwards.
+"""
+
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+EXCLUDED_DIRS = {'node_modules', '.next', 'dist', 'build', '.git'}
+TYPESCRIPT_SUFFIXES = ('.ts', '.tsx')
+PROJECT_MARKER = 'package.json'
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translate a gitignore glob into a regex body"""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('/**', i) and i + 3 == len(pattern):
+            parts.append('/.*')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+            continue
+        if char == '*':
+            parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+        elif char == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                parts.append(f'[{body}]')
+                i = end
+        elif char == '\\' and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return ''.join(parts)
+
+
+class IgnoreRules:
+    """The subset of .gitignore semantics needed to prune a source walk"""
+
+    def __init__(self, lines: Iterable[str]):
+        # (regex, negated, directories only, matched against full path)
+        self.patterns: List[Tuple[re.Pattern, bool, bool, bool]] = []
+
+        for line in lines:
+            line = line.rstrip('\n').rstrip()
+            if not line or line.startswith('#'):
+                continue
+
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+
+            anchored = '/' in line
+            line = line.lstrip('/')
+            if not line:
+                continue
+
+            regex = re.compile(f'^{_glob_to_regex(line)}$')
+            self.patterns.append((regex, negated, dir_only, anchored))
+
+    @classmethod
+    def from_file(cls, path: Path) -> 'IgnoreRules':
+        """Load rules from a .gitignore file (empty rules if it is missing)"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(f.readlines())
+        except OSError:
+            return cls([])
+
+    def is_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        """Check a project-relative posix path; the last matching pattern wins"""
+        name = relative_path.rsplit('/', 1)[-1]
+        ignored = False
+        for regex, negated, dir_only, anchored in self.patterns:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relative_path if anchored else name):
+                ignored = not negated
+        return ignored
+
+
+@lru_cache(maxsize=256)
+def _project_root_above(directory: str) -> Optional[str]:
+    if os.path.isfile(os.path.join(directory, PROJECT_MARKER)):
+        return directory
+    parent = os.path.dirname(directory)
+    return None if parent == directory else _project_root_above(parent)
+
+
+def project_root_of(file_path) -> Path:
+    """The nearest directory above file_path holding a package.json
+    (default: the current directory)
+
+    Rules get only the path of the file they fix; this is how they find
+    the project it belongs to, whichever directory the fixer runs from.
+    """
+    root = _project_root_above(os.path.dirname(os.path.abspath(file_path)))
+    return Path(root) if root is not None else Path.cwd()
+
+
+@lru_cache(maxsize=None)
+def load_gitignore(project_root: Path) -> IgnoreRules:
+    """Rules from the .gitignore at the project root"""
+    return IgnoreRules.from_file(project_root / '.gitignore')
+
+
+def walk_files(directory: Path, suffixes: Tuple[str, ...] = TYPESCRIPT_SUFFIXES,
+               excluded: Iterable[str] = EXCLUDED_DIRS,
+               project_root: Optional[Path] = None) -> Iterator[Path]:
+    """Yield files under directory with one of the suffixes, pruning as it goes
+
+    Paths are yielded in sorted order, joined onto `directory` as given.
+    The .gitignore of `project_root` (default: the current directory) is
+    honoured when `directory` lies inside it.
+    """
+    excluded = set(excluded)
+    project_root = Path(project_root or Path.cwd()).resolve()
+
+    ignore = load_gitignore(project_root)
+    try:
+        prefix = Path(directory).resolve().relative_to(project_root).as_posix()
+        prefix = '' if prefix == '.' else prefix + '/'
+    except ValueError:
+        ignore = None
+        prefix = ''
+
+    stack = [(os.fspath(directory), prefix)]
+    while stack:
+        current, relative = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if is_dir and entry.name in excluded:
+                continue
+            entry_relative = relative + entry.name
+            if ignore is not None and ignore.is_ignored(entry_relative, is_dir):
+                continue
+            if is_dir:
+                subdirs.append((entry.path, entry_relative + '/'))
+            elif entry.name.endswith(suffixes):
+                yield Path(entry.path)
+
+        # Reversed so directories are visited in sorted order off the stack
+        stack.extend(reversed(subdirs))
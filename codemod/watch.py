@@ -0,0 +1,271 @@
+"""
+Watch mode: re-fix TypeScript files as soon as they are saved.
+
+A long-running fixer keeps what a fresh run pays for every time: imported
+scripts, compiled regexes (held by the re module cache), the parsed schema
+and the content hash of every file it has seen. Changes are picked up with
+inotify on Linux (through ctypes, no extra dependency) or by polling file
+stats elsewhere.
+
+Events are debounced: after the first change the watcher keeps collecting
+until the tree has been quiet for `debounce` seconds, so a burst of saves
+(a formatter, a branch switch) is handled as one batch. A file is only
+processed when its content hash differs from the last one this process
+saw or wrote, which is also what keeps the fixer's own writes from
+triggering it again.
+
+With images=True, assets/ and public/ are watched too: a changed image
+drops the image index (codemod.images), which the next rule that needs
+it rebuilds, and the changed image is not handed to `process`.
+"""
+
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from codemod.console import Colors, log
+from codemod.images import DERIVATIVES_DIR, IMAGE_DIRS, IMAGE_SUFFIXES, forget_images
+from codemod.walk import EXCLUDED_DIRS, TYPESCRIPT_SUFFIXES, load_gitignore, walk_files
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF)
+_EVENT = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Changed files under some directories, from the kernel's inotify queue"""
+
+    def __init__(self, directories: Iterable[Path], project_root: Path,
+                 suffixes: Tuple[str, ...] = TYPESCRIPT_SUFFIXES):
+        libc_name = ctypes.util.find_library('c')
+        if libc_name is None:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError("inotify is not available")
+
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.project_root = project_root.resolve()
+        self.suffixes = suffixes
+        self.ignore = load_gitignore(self.project_root)
+        self.directories: Dict[int, Path] = {}
+        self.overflowed = False
+        for directory in directories:
+            self.add_tree(Path(directory))
+
+    def _ignored(self, directory: Path) -> bool:
+        if directory.name in EXCLUDED_DIRS:
+            return True
+        try:
+            relative = directory.resolve().relative_to(self.project_root).as_posix()
+        except ValueError:
+            return False
+        return relative != '.' and self.ignore.is_ignored(relative, True)
+
+    def add_tree(self, directory: Path) -> List[Path]:
+        """Watch a directory and its subdirectories; returns the files already in it"""
+        if self._ignored(directory):
+            return []
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            return []
+        self.directories[wd] = directory
+
+        files = []
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return files
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                files.extend(self.add_tree(Path(entry.path)))
+            elif entry.name.endswith(self.suffixes):
+                files.append(Path(entry.path))
+        return files
+
+    def wait(self, timeout: Optional[float]) -> Set[Path]:
+        """Block up to timeout seconds (None: forever) for changed files"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed: Set[Path] = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    self.overflowed = True
+                    continue
+                directory = self.directories.get(wd)
+                if mask & IN_IGNORED or directory is None:
+                    self.directories.pop(wd, None)
+                    continue
+
+                path = directory / os.fsdecode(name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        changed.update(self.add_tree(path))
+                elif path.name.endswith(self.suffixes):
+                    changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Changed files found by comparing (size, mtime) snapshots"""
+
+    def __init__(self, directories: Iterable[Path], project_root: Path, interval: float = 0.1,
+                 suffixes: Tuple[str, ...] = TYPESCRIPT_SUFFIXES):
+        self.directories = list(directories)
+        self.project_root = project_root
+        self.suffixes = suffixes
+        self.interval = interval
+        self.overflowed = False
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot = {}
+        for directory in self.directories:
+            for file_path in walk_files(directory, self.suffixes, project_root=self.project_root):
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                snapshot[file_path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def wait(self, timeout: Optional[float]) -> Set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self.take_snapshot()
+            changed = {path for path, stamp in current.items()
+                       if self.snapshot.get(path) != stamp}
+            changed |= set(self.snapshot) - set(current)
+            self.snapshot = current
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            pause = self.interval if deadline is None else \
+                min(self.interval, max(0.0, deadline - time.monotonic()))
+            time.sleep(pause)
+
+    def close(self):
+        pass
+
+
+def create_watcher(directories: List[Path], project_root: Path, poll: bool = False,
+                   interval: float = 0.1, suffixes: Tuple[str, ...] = TYPESCRIPT_SUFFIXES):
+    """inotify where the platform has it, polling otherwise (or when asked)"""
+    if not poll:
+        try:
+            return InotifyWatcher(directories, project_root, suffixes)
+        except (OSError, AttributeError):
+            log("   inotify unavailable, falling back to polling", Colors.YELLOW)
+    return PollingWatcher(directories, project_root, interval, suffixes)
+
+
+def content_hash(file_path: Path) -> Optional[str]:
+    try:
+        with open(file_path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def watch(directories: List[Path], project_root: Path, process: Callable[[Path], bool],
+          debounce: float = 0.02, poll: bool = False, interval: float = 0.1,
+          images: bool = False):
+    """Run process(file) on every TypeScript file that changes until interrupted"""
+    watched, suffixes = list(directories), TYPESCRIPT_SUFFIXES
+    if images:
+        watched += [project_root / name for name in IMAGE_DIRS
+                    if (project_root / name).is_dir() and project_root / name not in watched]
+        suffixes += IMAGE_SUFFIXES
+    watcher = create_watcher(watched, project_root, poll, interval, suffixes)
+    hashes: Dict[Path, str] = {}
+    kind = 'inotify' if isinstance(watcher, InotifyWatcher) else f'polling every {interval}s'
+    log(f"\n👀 Watching {', '.join(d.name + '/' for d in directories)} ({kind}); "
+        f"Ctrl+C to stop", Colors.MAGENTA)
+
+    try:
+        while True:
+            changed = watcher.wait(None)
+            if not changed and not watcher.overflowed:
+                continue
+            started = time.perf_counter()
+
+            # Debounce: collect until the tree has been quiet for a moment
+            while True:
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                changed |= more
+
+            if watcher.overflowed:
+                # The kernel dropped events; fall back to checking everything
+                watcher.overflowed = False
+                changed = {f for d in directories for f in walk_files(d, project_root=project_root)}
+                if images:
+                    forget_images(project_root)
+
+            if images:
+                # Derivatives are written by codemod.derivatives, not sources
+                derivatives = project_root / DERIVATIVES_DIR
+                if any(path.name.endswith(IMAGE_SUFFIXES) and derivatives not in path.parents
+                       for path in changed):
+                    forget_images(project_root)
+                changed = {path for path in changed if path.name.endswith(TYPESCRIPT_SUFFIXES)}
+
+            processed = 0
+            for file_path in sorted(changed):
+                digest = content_hash(file_path)
+                if digest is None:
+                    hashes.pop(file_path, None)
+                    continue
+                if hashes.get(file_path) == digest:
+                    # Unchanged content, e.g. the event for our own write
+                    continue
+                process(file_path)
+                processed += 1
+                # Remember what is on disk now, so our own write is ignored
+                hashes[file_path] = content_hash(file_path) or digest
+
+            if processed:
+                elapsed = (time.perf_counter() - started) * 1000
+                log(f"⚡ {processed} file(s) checked in {elapsed:.1f} ms", Colors.MAGENTA)
+    except KeyboardInterrupt:
+        log("\n👋 Stopped watching", Colors.MAGENTA)
+    finally:
+        watcher.close()
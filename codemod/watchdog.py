@@ -0,0 +1,67 @@
+"""
+Wall-clock deadlines for code that may not return in time.
+
+deadline() arms a one-shot SIGALRM timer; when it fires, the handler
+raises Timeout in whatever is running. CPython's regex engine checks for
+pending signals while it backtracks, so this interrupts a catastrophic
+match as well as plain Python code. Deadlines do not nest: inside an
+armed block, deadline() leaves the outer timer in charge and reports that
+it does not own it, so only the owner should handle the Timeout.
+
+Where there is no SIGALRM (Windows) or outside the main thread, nothing
+is armed and the block runs to completion.
+"""
+
+import contextlib
+import signal
+import threading
+
+
+class Timeout(Exception):
+    """Raised in the running code when its deadline passes"""
+
+
+_armed = False
+# The SIGALRM handler found before the first deadline; ours stays installed
+# from then on, since swapping handlers costs more than the rule calls that
+# deadlines usually wrap
+_previous_handler = None
+
+
+def available() -> bool:
+    return (hasattr(signal, 'setitimer')
+            and threading.current_thread() is threading.main_thread())
+
+
+def _expire(signum, frame):
+    if _armed:
+        raise Timeout()
+    # Not ours: hand the signal to whoever had it before
+    if callable(_previous_handler):
+        _previous_handler(signum, frame)
+    elif _previous_handler == signal.SIG_DFL:
+        signal.signal(signal.SIGALRM, signal.SIG_DFL)
+        signal.raise_signal(signal.SIGALRM)
+
+
+@contextlib.contextmanager
+def deadline(seconds: float):
+    """Raise Timeout in the block if it runs longer than seconds
+
+    Yields whether this block owns the timer. With seconds <= 0, inside
+    another deadline or where signals are unavailable it owns nothing.
+    """
+    global _armed, _previous_handler
+    if seconds <= 0 or _armed or not available():
+        yield False
+        return
+
+    if _previous_handler is None:
+        _previous_handler = signal.signal(signal.SIGALRM, _expire)
+    _armed = True
+    try:
+        signal.setitimer(signal.ITIMER_REAL, seconds)
+        yield True
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        _armed = False
@@ -4,10 +4,34 @@ Complete Production-Ready TypeScript Fixer
 Fixes: useState, useParams, dates, array vs single, map callbacks, image imports
 """
 
+import argparse
 import os
+import sys
 import re
+import time
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+from codemod.anchors import AnchorIndex, report_gate_counts
+from codemod import check, output
+from codemod.assets import resolve_literal
+from codemod.cache import CACHE_DIR, FileCache, read_source
+from codemod.console import quiet
+from codemod.declarations import scan_declarations
+from codemod.derivatives import IMG_TAG, load_manifest
+from codemod.edits import EditBuffer
+from codemod.images import load_images
+from codemod.imports import import_index
+from codemod.instrument import (FileProfiler, add_arguments, report_rule_stats, run_rule,
+                                set_rule_budget, write_report)
+from codemod.lexer import finditer_code, search_code, sub_code
+from codemod.output import write_source
+from codemod.parallel import map_files
+from codemod.pipeline import FileResult
+from codemod.rules import script_stage
+from codemod.schema import load_schema
+from codemod.walk import project_root_of, walk_files
+from codemod.watch import watch
 
 class Colors:
     GREEN = '\033[92m'
@@ -21,85 +45,81 @@ class Colors:
 def log(message: str, color: str = Colors.BLUE):
     print(f"{color}{message}{Colors.END}")
 
+SCHEMA = load_schema()
+
 def replace_custom_types_with_supabase(content: str, file_path: str) -> Tuple[str, bool]:
     """Replace custom type definitions with Supabase Tables types"""
-    modified = False
-    
-    # Map of common type names to their Supabase table equivalents
-    type_mappings = {
-        r'type Destination = {[^}]+}': ('Destination', 'destinations'),
-        r'type Experience = {[^}]+}': ('Experience', 'experiences'),
-        r'type Journey = {[^}]+}': ('Journey', 'journeys'),
-        r'type Enquiry = {[^}]+}': ('Enquiry', 'enquiries'),
-        r'type Package = {[^}]+}': ('Package', 'packages'),
-        r'interface MealPlan {[^}]+}': ('MealPlan', 'meal_plans'),
-        r'interface DiningSchedule {[^}]+}': ('DiningSchedule', 'dining_schedule'),
-        r'interface Activity {[^}]+}': ('Activity', 'resort_activities'),
-        r'interface GalleryItem {[^}]+}': ('GalleryItem', 'resort_gallery'),
-        r'interface ResortPackage {[^}]+}': ('ResortPackage', 'resort_packages'),
-    }
+    declarations = scan_declarations(content)
+    imports = import_index(content)
+    removed = []
+    tables_import_at = None
+    type_aliases = ''
     
     # Check if Tables import already exists
-    has_tables_import = 'from "@/integrations/supabase/types"' in content
+    has_tables_import = imports.imports_from('@/integrations/supabase/types')
     
-    for pattern, (type_name, table_name) in type_mappings.items():
-        # Look for the custom type definition
-        match = re.search(pattern, content, re.DOTALL)
-        if match:
+    # Custom type definitions with a Supabase table equivalent
+    for type_name, table_name in SCHEMA.tables_by_type.items():
+        for kind in ('type', 'interface'):
+            found = [d for d in declarations.find(type_name, kind) if d.is_plain]
+            if not found:
+                continue
+            
             # Remove the custom type definition
-            content = re.sub(pattern, '', content)
-            modified = True
+            removed.extend(found)
             log(f"  ✓ Removed custom type: {type_name}", Colors.GREEN)
             
             # Add Tables import if not present
             if not has_tables_import:
-                first_import = re.search(r'^(import\s+.*?;?\n)', content, re.MULTILINE)
-                if first_import:
-                    content = content.replace(
-                        first_import.group(0),
-                        'import type { Tables } from "@/integrations/supabase/types";\n' + first_import.group(0),
-                        1
-                    )
+                if imports.first_import is not None:
+                    tables_import_at = imports.first_import
                     has_tables_import = True
                     log(f"  ✓ Added Tables import", Colors.GREEN)
             
-            # Add type alias after imports
-            imports_end = list(re.finditer(r'^import\s+.*?;?\n', content, re.MULTILINE))
-            if imports_end:
-                last_import = imports_end[-1]
-                insert_pos = last_import.end()
-                type_alias = f'\ntype {type_name} = Tables<"{table_name}">;\n'
-                content = content[:insert_pos] + type_alias + content[insert_pos:]
-                log(f"  ✓ Added type alias: {type_name} = Tables<\"{table_name}\">", Colors.GREEN)
+            # Add type alias after imports (each one ahead of the previous)
+            type_aliases = f'\ntype {type_name} = Tables<"{table_name}">;\n' + type_aliases
+            log(f"  ✓ Added type alias: {type_name} = Tables<\"{table_name}\">", Colors.GREEN)
     
-    # Handle AdminUser and PendingUser (they come from Functions, not Tables)
-    admin_patterns = [
-        (r'interface AdminUser {[^}]+}', 'AdminUser'),
-        (r'interface PendingUser {[^}]+}', 'PendingUser'),
-    ]
+    modified = bool(removed)
+    if modified:
+        aliases_at = imports.end_of_imports
+        
+        edits = EditBuffer(content)
+        if tables_import_at is not None:
+            edits.insert(tables_import_at,
+                         'import type { Tables } from "@/integrations/supabase/types";\n')
+        for declaration in removed:
+            # A declaration right after the imports is replaced by the aliases
+            if declaration.start == aliases_at:
+                edits.replace(declaration.start, declaration.end, type_aliases)
+                aliases_at = None
+            else:
+                edits.replace(declaration.start, declaration.end, '')
+        if aliases_at is not None:
+            edits.insert(aliases_at, type_aliases)
+        content = edits.apply()
     
-    for pattern, type_name in admin_patterns:
-        if re.search(pattern, content, re.DOTALL):
+    # Handle AdminUser and PendingUser (they come from Functions, not Tables)
+    for type_name in ('AdminUser', 'PendingUser'):
+        if declarations.find(type_name, 'interface'):
             # These are return types from functions, leave them but note them
             log(f"  ℹ️  Found {type_name} (function return type, keeping as-is)", Colors.YELLOW)
     
     return content, modified
+
+def add_types_import(content: str) -> Tuple[str, bool]:
     """Add Tables import from Supabase types if not present"""
-    if 'from "@/integrations/supabase/types"' in content:
+    imports = import_index(content)
+    if imports.imports_from('@/integrations/supabase/types'):
         return content, False
     
     if 'Tables<' not in content and 'useState<any' not in content:
         return content, False
     
-    import_pattern = r'^(import\s+.*?from\s+.*?;?\n)'
-    match = re.search(import_pattern, content, re.MULTILINE)
-    
-    if match:
-        first_import = match.group(0)
-        new_import = 'import type { Tables } from "@/integrations/supabase/types";\n'
-        content = content.replace(first_import, new_import + first_import, 1)
+    new_content = imports.add('import type { Tables } from "@/integrations/supabase/types";')
+    if new_content != content:
         log(f"  ✓ Added Tables type import", Colors.GREEN)
-        return content, True
+        return new_content, True
     
     return content, False
 
@@ -118,11 +138,11 @@ def fix_map_any_types(content: str) -> Tuple[str, bool]:
     ]
     
     for pattern, replacement in patterns:
-        if re.search(pattern, content):
+        if search_code(pattern, content):
             # Check if already typed
             check_pattern = pattern.replace(r'\(', r'\([^:)]+:')
-            if not re.search(check_pattern, content):
-                content = re.sub(pattern, replacement, content)
+            if not search_code(check_pattern, content):
+                content = sub_code(pattern, replacement, content)
                 modified = True
                 log(f"  ✓ Fixed implicit 'any' in map callback", Colors.GREEN)
     
@@ -135,32 +155,45 @@ def fix_map_any_types(content: str) -> Tuple[str, bool]:
     }
     
     for pattern, replacement in specific_maps.items():
-        if re.search(pattern, content):
-            content = re.sub(pattern, replacement, content)
+        if search_code(pattern, content):
+            content = sub_code(pattern, replacement, content)
             modified = True
             log(f"  ✓ Fixed specific map type", Colors.GREEN)
     
     return content, modified
 
-def fix_image_imports(content: str) -> Tuple[str, bool]:
+def fix_image_imports(content: str, file_path: str) -> Tuple[str, bool]:
     """Fix static image imports and regular <img> tags to use Next.js Image component"""
     modified = False
     
     # Check if file imports images from assets
-    has_image_import = re.search(r'import\s+\w+\s+from\s+["\']@/assets/.*\.(jpg|png|jpeg|webp|gif)', content)
+    has_image_import = search_code(r'import\s+\w+\s+from\s+["\']@/assets/.*\.(jpg|png|jpeg|webp|gif)', content)
     has_img_tag = '<img' in content
     
+    # Intrinsic size of each imported image, read from the file's header
+    sizes = {}
+    if has_image_import:
+        images = load_images(project_root_of(file_path))
+        for statement in import_index(content).statements:
+            size = images.resolve(statement.source)
+            if size is not None and statement.names:
+                sizes[statement.names[0]] = size
+    
+    def image_tag(attributes: str):
+        def replace(match) -> str:
+            size = sizes.get(match.group(1))
+            width, height = (size.width, size.height) if size else (800, 600)
+            return f'<Image {match.expand(attributes)} width={{{width}}} height={{{height}}} />'
+        return replace
+    
     if has_img_tag:
         # Add Next.js Image import if not present
-        if 'import Image from "next/image"' not in content:
-            # Find first import
-            first_import = re.search(r'^(import\s+.*?;?\n)', content, re.MULTILINE)
-            if first_import:
-                content = content.replace(
-                    first_import.group(0),
-                    'import Image from "next/image";\n' + first_import.group(0),
-                    1
-                )
+        imports = import_index(content)
+        if not imports.imports('Image', 'next/image'):
+            # Before the first import
+            new_content = imports.add('import Image from "next/image";')
+            if new_content != content:
+                content = new_content
                 modified = True
                 log(f"  ✓ Added Next.js Image import", Colors.GREEN)
         
@@ -169,18 +202,18 @@ def fix_image_imports(content: str) -> Tuple[str, bool]:
             patterns = [
                 # With className, self-closing
                 (r'<img\s+src={(\w+)}\s+alt="([^"]+)"\s+className="([^"]+)"\s*/?>',
-                 r'<Image src={\1} alt="\2" className="\3" width={800} height={600} />'),
+                 r'src={\1} alt="\2" className="\3"'),
                 # With className, without self-closing
                 (r'<img\s+src={(\w+)}\s+alt="([^"]+)"\s+className="([^"]+)">',
-                 r'<Image src={\1} alt="\2" className="\3" width={800} height={600} />'),
+                 r'src={\1} alt="\2" className="\3"'),
                 # Without className
                 (r'<img\s+src={(\w+)}\s+alt="([^"]+)"\s*/?>',
-                 r'<Image src={\1} alt="\2" width={800} height={600} />'),
+                 r'src={\1} alt="\2"'),
             ]
             
-            for pattern, replacement in patterns:
-                if re.search(pattern, content):
-                    content = re.sub(pattern, replacement, content)
+            for pattern, attributes in patterns:
+                if search_code(pattern, content):
+                    content = sub_code(pattern, image_tag(attributes), content)
                     modified = True
                     log(f"  ✓ Converted static <img> to <Image>", Colors.GREEN)
         
@@ -191,166 +224,147 @@ def fix_image_imports(content: str) -> Tuple[str, bool]:
         # Pattern 3: <img src="string" ... /> (string URLs should stay as <img>)
         # We don't convert these as they're external URLs
     
+    # <Image>s converted before sizes were known carry the 800x600 placeholder
+    resized = []
+    
+    def true_size(match) -> str:
+        size = sizes.get(match.group(2))
+        if size is None or (size.width, size.height) == (800, 600):
+            return match.group()
+        resized.append(f"{match.group(2)} {size.width}x{size.height}")
+        return f'{match.group(1)}width={{{size.width}}}{match.group(3)}height={{{size.height}}}'
+    
+    if sizes:
+        placeholder = r'(<Image\s+src={(\w+)}(?:\s+\w+=(?:"[^"]*"|{[^{}]*}))*?\s+)width=\{800\}(\s+)height=\{600\}'
+        content = sub_code(placeholder, true_size, content)
+        if resized:
+            modified = True
+            log(f"  ✓ Set intrinsic <Image> size: {', '.join(resized)}", Colors.GREEN)
+    
     return content, modified
 
+def fix_responsive_images(content: str, file_path: str) -> Tuple[str, bool]:
+    """Give <img> tags with a literal src of a built image a srcSet of its derivatives and sizes"""
+    manifest = load_manifest(project_root_of(file_path))
+    if not manifest.images:
+        return content, False
+    added = []
+    
+    def add_src_set(match) -> str:
+        tag = match.group()
+        if re.search(r'\bsrcSet=', tag):
+            return tag
+        src_set = manifest.src_set(resolve_literal(match.group(4)))
+        if src_set is None:
+            return tag
+        urls, widest = src_set
+        added.append(match.group(4))
+        return (f'{match.group(1)} srcSet="{urls}" sizes="(max-width: {widest}px) 100vw, {widest}px"'
+                + tag[len(match.group(1)):])
+    
+    content = sub_code(IMG_TAG, add_src_set, content)
+    for src in added:
+        log(f"  ✓ Added srcSet for {src}", Colors.GREEN)
+    return content, bool(added)
+
 def fix_single_vs_array_types(content: str, file_path: str) -> Tuple[str, bool]:
     """Fix cases where single item is assigned to array state"""
-    modified = False
+    edits = EditBuffer(content)
+    
+    pattern = r'const\s+\[(\w+),\s*set\w+\]\s*=\s*(?:React\.)?useState<Tables<"(\w+)">\[\]>\(\[\]\)'
+    matches = list(finditer_code(pattern, content))
+    
+    def single_item_edit(match) -> bool:
+        table_name = match.group(2)
+        new_code = match.group(0).replace(
+            f'useState<Tables<"{table_name}">[]>([])',
+            f'useState<Tables<"{table_name}"> | null>(null)'
+        )
+        return edits.replace(match.start(), match.end(), new_code)
     
     uses_single = '.single()' in content or '.maybeSingle()' in content
     
     if uses_single:
-        pattern = r'const\s+\[(\w+),\s*set\w+\]\s*=\s*(?:React\.)?useState<Tables<"(\w+)">\[\]>\(\[\]\)'
-        matches = list(re.finditer(pattern, content))
+        # Setters called with a single row, collected in one scan
+        set_with_data = set(re.findall(r'(set\w+)\(data\)', content))
         
         for match in matches:
             var_name = match.group(1)
-            table_name = match.group(2)
             
-            set_pattern = rf'set{var_name[0].upper()}{var_name[1:]}\(data\)'
-            
-            if re.search(set_pattern, content):
-                old_code = match.group(0)
-                new_code = old_code.replace(
-                    f'useState<Tables<"{table_name}">[]>([])',
-                    f'useState<Tables<"{table_name}"> | null>(null)'
-                )
-                content = content.replace(old_code, new_code, 1)
-                modified = True
-                log(f"  ✓ Fixed {var_name}: array → single item type", Colors.GREEN)
+            if f'set{var_name[0].upper()}{var_name[1:]}' in set_with_data:
+                if single_item_edit(match):
+                    log(f"  ✓ Fixed {var_name}: array → single item type", Colors.GREEN)
     
     # Check singular variable names
-    pattern2 = r'const\s+\[(\w+),\s*set\w+\]\s*=\s*(?:React\.)?useState<Tables<"(\w+)">\[\]>\(\[\]\)'
-    for match in re.finditer(pattern2, content):
+    for match in matches:
         var_name = match.group(1)
-        if var_name.lower() in ['destination', 'experience', 'journey', 'blogpost', 'post', 'package']:
-            old_code = match.group(0)
-            table_name = match.group(2)
-            new_code = old_code.replace(
-                f'useState<Tables<"{table_name}">[]>([])',
-                f'useState<Tables<"{table_name}"> | null>(null)'
-            )
-            content = content.replace(old_code, new_code, 1)
-            modified = True
-            log(f"  ✓ Fixed {var_name}: changed to single item type", Colors.GREEN)
+        if SCHEMA.is_singular_name(var_name):
+            if single_item_edit(match):
+                log(f"  ✓ Fixed {var_name}: changed to single item type", Colors.GREEN)
     
-    return content, modified
+    return edits.apply(), len(edits) > 0
+
+def state_type_for_variable(var_name: str, default: Optional[str]) -> Optional[str]:
+    """Guess the table behind a useState variable from its name"""
+    table_name = SCHEMA.table_for_name(var_name)
+    return table_name if table_name is not None else default
 
 def fix_use_state_empty_array(content: str, file_path: str) -> Tuple[str, bool]:
     """Fix useState([]) with proper types"""
-    modified = False
-    
-    table_mappings = {
-        'blog': 'packages',
-        'package': 'packages',
-        'destination': 'destinations',
-        'experience': 'experiences',
-        'journey': 'journeys',
-        'enquir': 'enquiries',
-        'resort_activities': 'resort_activities',
-        'resort_gallery': 'resort_gallery',
-        'resort_packages': 'resort_packages',
-        'meal_plans': 'meal_plans',
-    }
+    edits = EditBuffer(content)
     
-    table_type = 'packages'
-    for key, value in table_mappings.items():
-        if key in file_path.lower():
-            table_type = value
-            break
+    table_type = SCHEMA.table_for_path(file_path) or 'packages'
     
     pattern1 = r'const\s+\[(\w+),\s*set\w+\]\s*=\s*React\.useState\(\[\]\)'
-    matches = re.finditer(pattern1, content)
     
-    for match in matches:
-        var_name = match.group(1).lower()
+    for match in finditer_code(pattern1, content):
+        var_name = match.group(1)
         
         if 'useState<' in content[max(0, match.start()-50):match.start()]:
             continue
         
-        if 'post' in var_name or 'blog' in var_name or 'package' in var_name:
-            specific_type = 'packages'
-        elif 'destination' in var_name:
-            specific_type = 'destinations'
-        elif 'experience' in var_name:
-            specific_type = 'experiences'
-        elif 'journey' in var_name and 'day' not in var_name:
-            specific_type = 'journeys'
-        elif 'day' in var_name:
-            specific_type = 'journey_days'
-        elif 'enquir' in var_name:
-            specific_type = 'enquiries'
-        elif 'categor' in var_name:
+        # Category lists hold plain strings, not rows of the categories table
+        if 'categor' in var_name.lower():
             continue
-        else:
-            specific_type = table_type
         
-        old_match = match.group(0)
-        new_code = old_match.replace(
+        specific_type = state_type_for_variable(var_name, table_type)
+        
+        new_code = match.group(0).replace(
             'React.useState([])',
             f'React.useState<Tables<"{specific_type}">[]>([])'
         )
-        content = content.replace(old_match, new_code, 1)
-        modified = True
+        edits.replace(match.start(), match.end(), new_code)
         log(f"  ✓ Fixed {match.group(1)} type → Tables<\"{specific_type}\">[]", Colors.GREEN)
     
     pattern2 = r'const\s+\[(\w+),\s*set\w+\]\s*=\s*useState\(\[\]\)'
-    matches = re.finditer(pattern2, content)
     
-    for match in matches:
-        var_name = match.group(1).lower()
+    for match in finditer_code(pattern2, content):
+        var_name = match.group(1)
         
         if 'useState<' in content[max(0, match.start()-50):match.start()]:
             continue
         
-        if 'categor' in var_name:
-            old_match = match.group(0)
-            new_code = old_match.replace('useState([])', 'useState<string[]>([])')
-            content = content.replace(old_match, new_code, 1)
-            modified = True
+        if 'categor' in var_name.lower():
+            new_code = match.group(0).replace('useState([])', 'useState<string[]>([])')
+            edits.replace(match.start(), match.end(), new_code)
             log(f"  ✓ Fixed {match.group(1)} type → string[]", Colors.GREEN)
             continue
         
-        if 'post' in var_name or 'blog' in var_name or 'package' in var_name:
-            specific_type = 'packages'
-        elif 'destination' in var_name:
-            specific_type = 'destinations'
-        elif 'experience' in var_name:
-            specific_type = 'experiences'
-        elif 'journey' in var_name and 'day' not in var_name:
-            specific_type = 'journeys'
-        elif 'day' in var_name:
-            specific_type = 'journey_days'
-        elif 'enquir' in var_name:
-            specific_type = 'enquiries'
-        else:
-            specific_type = table_type
-        
-        old_match = match.group(0)
-        new_code = old_match.replace(
+        specific_type = state_type_for_variable(var_name, table_type)
+        new_code = match.group(0).replace(
             'useState([])',
             f'useState<Tables<"{specific_type}">[]>([])'
         )
-        content = content.replace(old_match, new_code, 1)
-        modified = True
+        edits.replace(match.start(), match.end(), new_code)
         log(f"  ✓ Fixed {match.group(1)} type → Tables<\"{specific_type}\">[]", Colors.GREEN)
     
-    return content, modified
+    return edits.apply(), len(edits) > 0
 
 def fix_use_state_null(content: str, file_path: str) -> Tuple[str, bool]:
     """Fix useState(null) with proper types"""
-    modified = False
+    edits = EditBuffer(content)
     
-    if 'blog' in file_path.lower() or 'package' in file_path.lower():
-        table_type = 'packages'
-    elif 'destination' in file_path.lower():
-        table_type = 'destinations'
-    elif 'experience' in file_path.lower():
-        table_type = 'experiences'
-    elif 'journey' in file_path.lower():
-        table_type = 'journeys'
-    else:
-        table_type = 'packages'
+    table_type = SCHEMA.table_for_path(file_path) or 'packages'
     
     patterns = [
         r'const\s+\[(\w+),\s*set\w+\]\s*=\s*React\.useState\(null\)',
@@ -358,23 +372,13 @@ def fix_use_state_null(content: str, file_path: str) -> Tuple[str, bool]:
     ]
     
     for pattern in patterns:
-        matches = re.finditer(pattern, content)
-        for match in matches:
-            var_name = match.group(1).lower()
+        for match in finditer_code(pattern, content):
+            var_name = match.group(1)
             
             if 'useState<' in content[max(0, match.start()-50):match.start()]:
                 continue
             
-            if 'post' in var_name or 'blog' in var_name or 'package' in var_name:
-                specific_type = 'packages'
-            elif 'destination' in var_name:
-                specific_type = 'destinations'
-            elif 'experience' in var_name:
-                specific_type = 'experiences'
-            elif 'journey' in var_name:
-                specific_type = 'journeys'
-            else:
-                specific_type = table_type
+            specific_type = state_type_for_variable(var_name, table_type)
             
             old_match = match.group(0)
             if 'React.useState' in old_match:
@@ -388,11 +392,10 @@ def fix_use_state_null(content: str, file_path: str) -> Tuple[str, bool]:
                     f'useState<Tables<"{specific_type}"> | null>(null)'
                 )
             
-            content = content.replace(old_match, new_code, 1)
-            modified = True
+            edits.replace(match.start(), match.end(), new_code)
             log(f"  ✓ Fixed {match.group(1)} type → Tables<\"{specific_type}\"> | null", Colors.GREEN)
     
-    return content, modified
+    return edits.apply(), len(edits) > 0
 
 def fix_wrong_state_types(content: str) -> Tuple[str, bool]:
     """Fix useState with wrong types (e.g., Tables<packages> when it should be number)"""
@@ -400,8 +403,8 @@ def fix_wrong_state_types(content: str) -> Tuple[str, bool]:
     
     # Pattern: expandedActivity should be number | null, not Tables<"packages"> | null
     pattern = r'const\s+\[expandedActivity,\s*setExpandedActivity\]\s*=\s*useState<Tables<"packages">\s*\|\s*null>\(null\)'
-    if re.search(pattern, content):
-        content = re.sub(
+    if search_code(pattern, content):
+        content = sub_code(
             pattern,
             'const [expandedActivity, setExpandedActivity] = useState<number | null>(null)',
             content
@@ -416,9 +419,9 @@ def fix_use_params(content: str) -> Tuple[str, bool]:
     modified = False
     
     pattern1 = r'const\s+{\s*id\s*}\s*=\s*useParams\(\s*\)'
-    if re.search(pattern1, content):
+    if search_code(pattern1, content):
         if 'Array.isArray(params.id)' not in content:
-            content = re.sub(
+            content = sub_code(
                 pattern1,
                 'const params = useParams();\n  const id = Array.isArray(params.id) ? params.id[0] : params.id',
                 content
@@ -427,9 +430,9 @@ def fix_use_params(content: str) -> Tuple[str, bool]:
             log(f"  ✓ Fixed useParams() destructuring", Colors.GREEN)
     
     pattern2 = r'const\s+{\s*id\s*}\s*=\s*useParams<{\s*id:\s*string\s*}>\(\s*\)'
-    if re.search(pattern2, content):
+    if search_code(pattern2, content):
         if 'Array.isArray(params.id)' not in content:
-            content = re.sub(
+            content = sub_code(
                 pattern2,
                 'const params = useParams<{ id: string }>();\n  const id = Array.isArray(params.id) ? params.id[0] : params.id',
                 content
@@ -444,118 +447,153 @@ def fix_nullable_dates(content: str) -> Tuple[str, bool]:
     modified = False
     
     pattern1 = r'\{new Date\((\w+)\.(published_date|created_at|updated_at)\)\.toLocaleDateString\(\)\}'
-    if re.search(pattern1, content):
+    if search_code(pattern1, content):
         def replace_fn(match):
             var_name = match.group(1)
             field = match.group(2)
             return f'{{{var_name}.{field} ? new Date({var_name}.{field}).toLocaleDateString() : \'N/A\'}}'
-        content = re.sub(pattern1, replace_fn, content)
+        content = sub_code(pattern1, replace_fn, content)
         modified = True
         log(f"  ✓ Fixed nullable date in JSX with .toLocaleDateString()", Colors.GREEN)
     
     pattern2 = r'\{(\w+)\.(published_date|created_at|updated_at)\s*\?\s*new Date\(\1\.\2\)\s*:\s*new Date\(\)\.toLocaleDateString\(\)\}'
-    if re.search(pattern2, content):
+    if search_code(pattern2, content):
         def replace_fn(match):
             var_name = match.group(1)
             field = match.group(2)
             return f'{{{var_name}.{field} ? new Date({var_name}.{field}).toLocaleDateString() : \'N/A\'}}'
-        content = re.sub(pattern2, replace_fn, content)
+        content = sub_code(pattern2, replace_fn, content)
         modified = True
         log(f"  ✓ Fixed incomplete date ternary", Colors.GREEN)
     
     pattern3 = r'\{new Date\((\w+)\.(published_date|created_at|updated_at)\)\}'
-    if re.search(pattern3, content):
+    if search_code(pattern3, content):
         def replace_fn(match):
             var_name = match.group(1)
             field = match.group(2)
             return f'{{{var_name}.{field} ? new Date({var_name}.{field}).toLocaleDateString() : \'N/A\'}}'
-        content = re.sub(pattern3, replace_fn, content)
+        content = sub_code(pattern3, replace_fn, content)
         modified = True
         log(f"  ✓ Fixed Date object in JSX", Colors.GREEN)
     
     return content, modified
 
-def process_file(file_path: Path) -> bool:
-    """Process a single file"""
+def needs_processing(content: str) -> bool:
+    """Quick check for anything the fixers below could act on"""
+    return (
+        'useState(' in content or
+        'useParams()' in content or
+        'new Date(' in content or
+        '.map((' in content or
+        'import' in content and 'from "@/assets' in content or
+        '<img' in content
+    )
+
+# Fixes in the order they are applied, and whether each takes the file path
+FIXES = [
+    (fix_use_params, False),
+    (fix_single_vs_array_types, True),
+    (fix_use_state_empty_array, True),
+    (fix_use_state_null, True),
+    (fix_wrong_state_types, False),
+    (fix_nullable_dates, False),
+    (fix_map_any_types, False),
+    (fix_image_imports, True),
+    (fix_responsive_images, True),
+]
+
+# Literals a fix cannot act without; a fix only runs on files containing at
+# least one of its anchors
+RULE_ANCHORS = {
+    'fix_use_params': ('useParams',),
+    'fix_single_vs_array_types': ('useState<Tables<',),
+    'fix_use_state_empty_array': ('useState([])',),
+    'fix_use_state_null': ('useState(null)',),
+    'fix_wrong_state_types': ('setExpandedActivity',),
+    'fix_nullable_dates': ('new Date(',),
+    'fix_map_any_types': ('.map((',),
+    'fix_image_imports': ('<img', 'height={600}'),
+    'fix_responsive_images': ('<img',),
+}
+
+ANCHOR_INDEX = AnchorIndex(RULE_ANCHORS)
+
+# The fixes above as the pipeline registers them, for per-rule cache keys
+STAGE = script_stage('fix-all-types', sys.modules[__name__])
+
+def process_file(file_path: Path) -> FileResult:
+    """Process a single file
+    
+    Returns whether it was rewritten, the stamp of the content read and the
+    cache keys of the fixes evaluated on it.
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            original_content = f.read()
+        original_content, stamp = read_source(file_path)
         
         content = original_content
         file_modified = False
         
-        needs_processing = (
-            'useState(' in content or
-            'useParams()' in content or
-            'new Date(' in content or
-            '.map((' in content or
-            'import' in content and 'from "@/assets' in content
-        )
-        
-        if not needs_processing:
-            return False
+        if not needs_processing(content):
+            ANCHOR_INDEX.select(None)
+            return False, stamp, [STAGE.gate_key]
         
         log(f"\n📝 Processing: {file_path.relative_to(Path.cwd())}", Colors.CYAN)
         
-        # Apply all fixes
-        content, modified = fix_use_params(content)
-        file_modified = file_modified or modified
-        
-        content, modified = fix_single_vs_array_types(content, str(file_path))
-        file_modified = file_modified or modified
-        
-        content, modified = fix_use_state_empty_array(content, str(file_path))
-        file_modified = file_modified or modified
-        
-        content, modified = fix_use_state_null(content, str(file_path))
-        file_modified = file_modified or modified
-        
-        content, modified = fix_wrong_state_types(content)
-        file_modified = file_modified or modified
-        
-        content, modified = fix_nullable_dates(content)
-        file_modified = file_modified or modified
-        
-        content, modified = fix_map_any_types(content)
-        file_modified = file_modified or modified
-        
-        content, modified = fix_image_imports(content)
-        file_modified = file_modified or modified
+        # Apply the fixes whose anchors occur in the file
+        runnable = ANCHOR_INDEX.select(content)
+        for fix, takes_path in FIXES:
+            if fix.__name__ not in runnable:
+                continue
+            if takes_path:
+                content, modified = run_rule(fix.__name__, fix, content, str(file_path))
+            else:
+                content, modified = run_rule(fix.__name__, fix, content)
+            file_modified = file_modified or modified
         
         # Add imports if needed
         if file_modified:
-            content, modified = add_types_import(content)
+            content, modified = run_rule('add_types_import', add_types_import, content)
         
         # Write back if modified
-        if file_modified and content != original_content:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+        if file_modified and content != original_content and write_source(file_path, content):
             log(f"✅ File updated successfully", Colors.GREEN)
-            return True
+            return True, stamp, []
         elif not file_modified:
             log(f"ℹ️  No issues found", Colors.YELLOW)
         
-        return file_modified
+        return file_modified, stamp, STAGE.evaluated_keys(original_content)
         
     except Exception as e:
         log(f"❌ Error: {str(e)}", Colors.RED)
-        return False
+        return False, None, []
 
 def find_typescript_files(directory: Path) -> List[Path]:
-    """Find all TypeScript/TSX files"""
-    patterns = ['**/*.ts', '**/*.tsx']
-    files = []
-    
-    for pattern in patterns:
-        files.extend(directory.glob(pattern))
-    
-    excluded = {'node_modules', '.next', 'dist', 'build', '.git'}
-    files = [f for f in files if not any(ex in f.parts for ex in excluded)]
-    
-    return files
+    """Find all TypeScript/TSX files, skipping node_modules, build output and .gitignore"""
+    return list(walk_files(directory))
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Complete Production TypeScript Fixer")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='number of worker processes, 0 for one per CPU (default: 1)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='process every file, ignoring the incremental cache')
+    parser.add_argument('--watch', '-w', action='store_true',
+                        help='after the run, keep fixing files as they are saved')
+    parser.add_argument('--poll', type=float, default=None, metavar='SECONDS',
+                        help='watch by polling every SECONDS instead of using inotify')
+    check.add_arguments(parser)
+    output.add_arguments(parser)
+    add_arguments(parser)
+    return parser.parse_args()
 
 def main():
     """Main execution"""
+    args = parse_args()
+    output.configure(args.fsync)
+    set_rule_budget(args.rule_budget)
+    start = time.perf_counter()
+    
     log("🚀 Complete Production TypeScript Fixer", Colors.MAGENTA)
     log("=" * 70, Colors.MAGENTA)
     log("Fixes: useState, useParams, dates, arrays, map callbacks, images", Colors.CYAN)
@@ -580,21 +618,65 @@ def main():
         all_files.extend(files)
         log(f"   Found {len(files)} TypeScript files", Colors.BLUE)
     
-    log(f"\n📊 Total files to process: {len(all_files)}", Colors.BLUE)
+    # Probed once here so that workers inherit the image sizes
+    images = load_images(project_root, args.jobs)
+    cache = FileCache.for_script(project_root, STAGE, enabled=not args.no_cache,
+                                 inputs={'schema': SCHEMA.digest, 'images': images.digest,
+                                         'derivatives': load_manifest(project_root).digest})
+    if args.check:
+        sys.exit(check.run_check(project_root, all_files, ['fix-all-types'], args, cache))
+    
+    pending = [f for f in all_files if not cache.is_fresh(f)]
+    
+    log(f"\n📊 Total files to process: {len(pending)} ({cache.hits} unchanged since last run)", Colors.BLUE)
     log("=" * 70, Colors.BLUE)
     
-    modified_count = 0
-    for file_path in all_files:
-        if process_file(file_path):
-            modified_count += 1
+    profiler = None
+    process, jobs = process_file, args.jobs
+    if args.profile:
+        profiler = FileProfiler(args.profile, Path(CACHE_DIR) / 'profiles' / 'fix-all-types')
+        process, jobs = profiler.wrap(process_file), 1
+    
+    with quiet(args.quiet):
+        results = map_files(process, pending, jobs)
+    modified_count = sum(1 for modified, _, _ in results if modified)
+    output.sync_files(file_path for file_path, (modified, _, _) in zip(pending, results) if modified)
+    
+    for file_path, (modified, stamp, evaluated) in zip(pending, results):
+        cache.record_result(file_path, modified, stamp, evaluated)
+    cache.save()
     
     log("\n" + "=" * 70, Colors.MAGENTA)
     log("📊 Summary:", Colors.MAGENTA)
     log(f"   Total files scanned: {len(all_files)}", Colors.BLUE)
     log(f"   Files modified: {modified_count}", Colors.GREEN)
     log(f"   Files unchanged: {len(all_files) - modified_count}", Colors.YELLOW)
+    log("\n🔎 Files run / skipped per fix:", Colors.MAGENTA)
+    report_gate_counts()
+    log("\n⏱  Per-fix counters:", Colors.MAGENTA)
+    report_rule_stats()
+    if profiler is not None:
+        log(f"\n🐢 Slowest {args.profile} files (cProfile output):", Colors.MAGENTA)
+        profiler.report()
+    if args.report:
+        write_report(args.report, script='fix-all-types', files=len(all_files),
+                     processed=len(pending), modified=modified_count,
+                     seconds=time.perf_counter() - start)
     log("\n✨ Done! Now run: npm run build", Colors.GREEN)
     log("=" * 70, Colors.MAGENTA)
+    
+    if args.watch:
+        def fix_saved_file(file_path: Path) -> bool:
+            with quiet(args.quiet):
+                modified, stamp, evaluated = process_file(file_path)
+            if modified:
+                output.sync_files([file_path])
+            cache.record_result(file_path, modified, stamp, evaluated)
+            cache.save()
+            return modified
+        
+        watch(directories, project_root, fix_saved_file,
+              poll=args.poll is not None, interval=args.poll or 0.1, images=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
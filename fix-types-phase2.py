@@ -4,10 +4,26 @@ Enhanced TypeScript Type Fixer Script - Phase 2
 Fixes remaining useState<any> and adds proper type imports
 """
 
+import argparse
 import os
-import re
+import sys
+import time
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterator, Optional, Tuple
+
+from codemod import check, output
+from codemod.cache import CACHE_DIR, FileCache
+from codemod.console import quiet
+from codemod.discover import ScannedFile, scan_sources
+from codemod.imports import import_index
+from codemod.instrument import (FileProfiler, add_arguments, report_rule_stats, run_rule,
+                                set_rule_budget, write_report)
+from codemod.lexer import search_code, sub_code
+from codemod.output import write_source
+from codemod.parallel import map_files
+from codemod.rules import script_stage
+from codemod.schema import load_schema
+from codemod.walk import walk_files
 
 class Colors:
     GREEN = '\033[92m'
@@ -19,6 +35,8 @@ class Colors:
 def log(message: str, color: str = Colors.BLUE):
     print(f"{color}{message}{Colors.END}")
 
+SCHEMA = load_schema()
+
 def fix_useState_any(content: str, file_path: str) -> Tuple[str, bool]:
     """Fix useState<any> with proper types"""
     modified = False
@@ -34,28 +52,21 @@ def fix_useState_any(content: str, file_path: str) -> Tuple[str, bool]:
         (r'useState<any\[\]>\(\[\]\)', 'useState<any[]>([])'),
     ]
     
-    # Determine the appropriate type based on the file and variable name
-    if 'blog' in file_path.lower() or 'packages' in file_path.lower():
-        table_type = 'Tables<"packages">'
-    elif 'destination' in file_path.lower():
-        table_type = 'Tables<"destinations">'
-    elif 'experience' in file_path.lower():
-        table_type = 'Tables<"experiences">'
-    elif 'journey' in file_path.lower():
-        table_type = 'Tables<"journeys">'
-    elif 'enquir' in file_path.lower():
-        table_type = 'Tables<"enquiries">'
+    # Determine the appropriate type based on the file path
+    table_name = SCHEMA.table_for_path(file_path)
+    if table_name is not None:
+        table_type = f'Tables<"{table_name}">'
     else:
         table_type = 'any'  # Fallback
     
     for pattern, _ in patterns:
-        if re.search(pattern, content):
+        if search_code(pattern, content):
             if '(null)' in pattern:
                 replacement = f'useState<{table_type} | null>(null)'
             else:
                 replacement = f'useState<{table_type}[]>([])'
             
-            content = re.sub(pattern, replacement, content)
+            content = sub_code(pattern, replacement, content)
             modified = True
             log(f"  ✓ Fixed useState<any> -> {replacement}", Colors.GREEN)
             
@@ -68,20 +79,13 @@ def fix_useState_any(content: str, file_path: str) -> Tuple[str, bool]:
 
 def add_types_import(content: str) -> str:
     """Add Tables import from Supabase types"""
-    # Find the first import statement
-    import_pattern = r'^(import\s+.*?;?\n)'
-    match = re.search(import_pattern, content, re.MULTILINE)
+    # Goes before the first import; the index skips it if Tables is imported
+    new_content = import_index(content).add(
+        'import type { Tables } from "@/integrations/supabase/types";')
+    if new_content != content:
+        log(f"  ✓ Added Tables type import", Colors.GREEN)
     
-    if match:
-        first_import = match.group(0)
-        new_import = 'import type { Tables } from "@/integrations/supabase/types";\n'
-        
-        # Check if it's already there
-        if new_import.strip() not in content:
-            content = content.replace(first_import, new_import + first_import, 1)
-            log(f"  ✓ Added Tables type import", Colors.GREEN)
-    
-    return content
+    return new_content
 
 def fix_blog_page_types(content: str, file_path: str) -> Tuple[str, bool]:
     """Specifically fix blog page type issues"""
@@ -91,7 +95,7 @@ def fix_blog_page_types(content: str, file_path: str) -> Tuple[str, bool]:
         # Fix blogPost state
         if 'const [blogPost, setBlogPost] = React.useState<any>(null)' in content or \
            'const [blogPost, setBlogPost] = useState<any>(null)' in content:
-            content = re.sub(
+            content = sub_code(
                 r'useState<any>\(null\)',
                 'useState<Tables<"packages"> | null>(null)',
                 content,
@@ -103,7 +107,7 @@ def fix_blog_page_types(content: str, file_path: str) -> Tuple[str, bool]:
         # Fix relatedPosts state
         if 'const [relatedPosts, setRelatedPosts] = React.useState<any[]>([])' in content or \
            'const [relatedPosts, setRelatedPosts] = useState<any[]>([])' in content:
-            content = re.sub(
+            content = sub_code(
                 r'useState<any\[\]>\(\[\]\)',
                 'useState<Tables<"packages">[]>([])',
                 content
@@ -129,8 +133,8 @@ def fix_destinations_page(content: str, file_path: str) -> Tuple[str, bool]:
         ]
         
         for pattern, replacement in patterns:
-            if re.search(pattern, content):
-                content = re.sub(pattern, replacement, content)
+            if search_code(pattern, content):
+                content = sub_code(pattern, replacement, content)
                 modified = True
                 log(f"  ✓ Fixed destination type", Colors.GREEN)
         
@@ -151,8 +155,8 @@ def fix_experiences_page(content: str, file_path: str) -> Tuple[str, bool]:
         ]
         
         for pattern, replacement in patterns:
-            if re.search(pattern, content):
-                content = re.sub(pattern, replacement, content)
+            if search_code(pattern, content):
+                content = sub_code(pattern, replacement, content)
                 modified = True
                 log(f"  ✓ Fixed experience type", Colors.GREEN)
         
@@ -176,8 +180,8 @@ def fix_journeys_page(content: str, file_path: str) -> Tuple[str, bool]:
         ]
         
         for pattern, replacement in patterns:
-            if re.search(pattern, content):
-                content = re.sub(pattern, replacement, content)
+            if search_code(pattern, content):
+                content = sub_code(pattern, replacement, content)
                 modified = True
                 log(f"  ✓ Fixed journeys page types", Colors.GREEN)
         
@@ -186,42 +190,64 @@ def fix_journeys_page(content: str, file_path: str) -> Tuple[str, bool]:
     
     return content, modified
 
-def process_file(file_path: Path) -> bool:
-    """Process a single file and apply all fixes"""
+ANY_STATE_MARKER = 'useState<any'
+
+def needs_processing(content: str) -> bool:
+    """Check whether a file has any useState<any left to fix"""
+    return ANY_STATE_MARKER in content
+
+# Literals each fix cannot act without (used by the single-pass pipeline to
+# skip fixes on files that lack all of them)
+RULE_ANCHORS = {
+    'fix_blog_page_types': ('setBlogPost', 'setRelatedPosts'),
+    'fix_destinations_page': ('setDestination',),
+    'fix_experiences_page': ('setExperience',),
+    'fix_journeys_page': ('setJourney', 'setDays'),
+    'fix_useState_any': (ANY_STATE_MARKER,),
+}
+
+# The fixes above as the pipeline registers them, for per-rule cache keys
+STAGE = script_stage('fix-types-phase2', sys.modules[__name__])
+
+def process_file(file_path: Path, original_content: Optional[str] = None) -> bool:
+    """Process a single file and apply all fixes
+    
+    Discovery already holds the text of the files it found, so it can be
+    passed in to avoid reading them a second time.
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            original_content = f.read()
+        if original_content is None:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                original_content = f.read()
         
         content = original_content
         file_modified = False
         
         # Skip if no useState<any> found
-        if 'useState<any' not in content:
+        if not needs_processing(content):
             return False
         
         log(f"\n📝 Processing: {file_path.relative_to(Path.cwd())}", Colors.BLUE)
         
         # Apply specific fixes based on file type
-        content, modified = fix_blog_page_types(content, str(file_path))
+        content, modified = run_rule('fix_blog_page_types', fix_blog_page_types, content, str(file_path))
         file_modified = file_modified or modified
         
-        content, modified = fix_destinations_page(content, str(file_path))
+        content, modified = run_rule('fix_destinations_page', fix_destinations_page, content, str(file_path))
         file_modified = file_modified or modified
         
-        content, modified = fix_experiences_page(content, str(file_path))
+        content, modified = run_rule('fix_experiences_page', fix_experiences_page, content, str(file_path))
         file_modified = file_modified or modified
         
-        content, modified = fix_journeys_page(content, str(file_path))
+        content, modified = run_rule('fix_journeys_page', fix_journeys_page, content, str(file_path))
         file_modified = file_modified or modified
         
         # Generic fix for remaining cases
-        content, modified = fix_useState_any(content, str(file_path))
+        content, modified = run_rule('fix_useState_any', fix_useState_any, content, str(file_path))
         file_modified = file_modified or modified
         
         # Write back if modified
-        if file_modified and content != original_content:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+        if file_modified and content != original_content and write_source(file_path, content):
             log(f"✅ File updated successfully", Colors.GREEN)
             return True
         else:
@@ -233,30 +259,43 @@ def process_file(file_path: Path) -> bool:
         log(f"❌ Error processing {file_path}: {str(e)}", Colors.RED)
         return False
 
-def find_files_with_any(directory: Path) -> List[Path]:
-    """Find all TypeScript files with useState<any>"""
-    patterns = ['**/*.ts', '**/*.tsx']
-    files = []
+def process_scanned(scanned: ScannedFile) -> bool:
+    """Process a file found by find_files_with_any using the text it read"""
+    return process_file(scanned.path, scanned.content)
+
+def find_files_with_any(directory: Path, cache: FileCache) -> Iterator[ScannedFile]:
+    """Stream TypeScript files with useState<any>, reading each file once
     
-    for pattern in patterns:
-        for file_path in directory.glob(pattern):
-            # Skip excluded directories
-            excluded = {'node_modules', '.next', 'dist', 'build', '.git'}
-            if any(ex in file_path.parts for ex in excluded):
-                continue
-            
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    if 'useState<any' in content:
-                        files.append(file_path)
-            except:
-                pass
+    The bytes are checked for the marker before decoding; files without it
+    are recorded as clean in the cache and never decoded.
+    """
+    candidates = (f for f in walk_files(directory) if not cache.is_fresh(f))
     
-    return files
+    for scanned in scan_sources(candidates, ANY_STATE_MARKER.encode()):
+        if scanned.content is not None and needs_processing(scanned.content):
+            yield scanned
+        else:
+            cache.record(scanned.path, [STAGE.gate_key], scanned.stamp)
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Enhanced TypeScript Type Fixer - Phase 2")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='number of worker processes, 0 for one per CPU (default: 1)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='process every file, ignoring the incremental cache')
+    check.add_arguments(parser)
+    output.add_arguments(parser)
+    add_arguments(parser)
+    return parser.parse_args()
 
 def main():
     """Main execution function"""
+    args = parse_args()
+    output.configure(args.fsync)
+    set_rule_budget(args.rule_budget)
+    start = time.perf_counter()
+    
     log("🚀 Enhanced TypeScript Type Fixer - Phase 2", Colors.BLUE)
     log("=" * 50, Colors.BLUE)
     
@@ -269,15 +308,26 @@ def main():
         if dir_path.exists():
             directories_to_process.append(dir_path)
     
+    cache = FileCache.for_script(project_root, STAGE, enabled=not args.no_cache,
+                                 inputs={'schema': SCHEMA.digest})
+    
     # Find all files with useState<any>
     all_files = []
     for directory in directories_to_process:
         log(f"\n📂 Scanning directory: {directory}", Colors.BLUE)
-        files = find_files_with_any(directory)
+        files = list(find_files_with_any(directory, cache))
         all_files.extend(files)
         log(f"   Found {len(files)} files with useState<any>", Colors.BLUE)
     
+    if args.check:
+        sys.exit(check.run_check(project_root, [scanned.path for scanned in all_files],
+                                 ['fix-types-phase2'], args))
+    
+    if cache.hits:
+        log(f"   Skipped {cache.hits} files unchanged since last run", Colors.BLUE)
+    
     if not all_files:
+        cache.save()
         log("\n✅ No files with useState<any> found! All types are properly defined.", Colors.GREEN)
         return
     
@@ -285,10 +335,21 @@ def main():
     log("=" * 50, Colors.BLUE)
     
     # Process all files
-    modified_count = 0
-    for file_path in all_files:
-        if process_file(file_path):
-            modified_count += 1
+    profiler = None
+    process, jobs = process_scanned, args.jobs
+    if args.profile:
+        profiler = FileProfiler(args.profile, Path(CACHE_DIR) / 'profiles' / 'fix-types-phase2')
+        process, jobs = profiler.wrap(process_scanned), 1
+    
+    with quiet(args.quiet):
+        results = map_files(process, all_files, jobs)
+    modified_count = sum(1 for modified in results if modified)
+    output.sync_files(scanned.path for scanned, modified in zip(all_files, results) if modified)
+    
+    for scanned, modified in zip(all_files, results):
+        cache.record_result(scanned.path, modified, scanned.stamp,
+                            [] if modified else STAGE.evaluated_keys(scanned.content))
+    cache.save()
     
     # Summary
     log("\n" + "=" * 50, Colors.BLUE)
@@ -296,6 +357,14 @@ def main():
     log(f"   Total files processed: {len(all_files)}", Colors.BLUE)
     log(f"   Files modified: {modified_count}", Colors.GREEN)
     log(f"   Files unchanged: {len(all_files) - modified_count}", Colors.YELLOW)
+    log("\n⏱  Per-fix counters:", Colors.BLUE)
+    report_rule_stats()
+    if profiler is not None:
+        log(f"\n🐢 Slowest {args.profile} files (cProfile output):", Colors.BLUE)
+        profiler.report()
+    if args.report:
+        write_report(args.report, script='fix-types-phase2', files=len(all_files),
+                     modified=modified_count, seconds=time.perf_counter() - start)
     log("\n✨ Done! Run 'npm run build' to verify fixes.", Colors.GREEN)
 
 if __name__ == "__main__":
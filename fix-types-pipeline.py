@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+TypeScript Fixer Pipeline
+Runs the rules of fix-types.py, fix-types-phase2.py and fix-all-types.py in
+one pass: each file is read once, fixed in memory and written at most once.
+
+Usage:
+    python fix-types-pipeline.py            # fix app/ and components/
+    python fix-types-pipeline.py --jobs 8   # spread files over 8 processes
+    python fix-types-pipeline.py --compare  # time against the three scripts
+    python fix-types-pipeline.py --no-cache # ignore .codemod-cache/ and re-check everything
+    python fix-types-pipeline.py --quiet --report report.json  # summary only, JSON counters
+    python fix-types-pipeline.py --profile 5    # cProfile the five slowest files
+    python fix-types-pipeline.py --schema-diff  # after regenerating types.ts, only
+                                                # process files touching changed tables
+"""
+
+import argparse
+import filecmp
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from codemod.anchors import report_gate_counts
+from codemod import check, output
+from codemod.cache import CACHE_DIR, FileCache
+from codemod.console import Colors, log, quiet
+from codemod.derivatives import load_manifest
+from codemod.images import load_images
+from codemod.impact import limit_to_schema_changes
+from codemod.instrument import (FileProfiler, add_arguments, report_rule_stats, set_rule_budget,
+                                write_report)
+from codemod.pipeline import find_files, run
+from codemod.rules import build_registry, registry_fingerprints
+from codemod.schema import TYPES_PATH, load_schema
+from codemod.scripts import PROJECT_ROOT, SCRIPT_FILES
+
+SEQUENTIAL_SCRIPTS = ['fix-types.py', 'fix-types-phase2.py', 'fix-all-types.py']
+
+
+def copy_workspace(project_root: Path, target: Path):
+    """Copy the sources and tooling needed to run the fixers into target"""
+    for dir_name in ['app', 'components']:
+        if (project_root / dir_name).exists():
+            shutil.copytree(project_root / dir_name, target / dir_name)
+    if (project_root / TYPES_PATH).exists():
+        (target / TYPES_PATH).parent.mkdir(parents=True)
+        shutil.copy2(project_root / TYPES_PATH, target / TYPES_PATH)
+    shutil.copytree(PROJECT_ROOT / 'codemod', target / 'codemod',
+                    ignore=shutil.ignore_patterns('__pycache__'))
+    for script in list(SCRIPT_FILES.values()) + [Path(__file__).name]:
+        shutil.copy2(PROJECT_ROOT / script, target / script)
+
+
+def timed_run(commands, cwd: Path) -> float:
+    """Run each command in cwd and return the total wall-clock time"""
+    start = time.perf_counter()
+    for command in commands:
+        subprocess.run(command, cwd=cwd, stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def trees_match(left: Path, right: Path) -> bool:
+    """Compare two directory trees file by file"""
+    comparison = filecmp.dircmp(left, right)
+    pending = [comparison]
+    while pending:
+        current = pending.pop()
+        if current.left_only or current.right_only or current.funny_files:
+            return False
+        _, mismatch, errors = filecmp.cmpfiles(current.left, current.right,
+                                               current.common_files, shallow=False)
+        if mismatch or errors:
+            return False
+        pending.extend(current.subdirs.values())
+    return True
+
+
+def compare(project_root: Path):
+    """Time the pipeline against running the three scripts in sequence"""
+    with tempfile.TemporaryDirectory() as tmp:
+        sequential_dir = Path(tmp) / 'sequential'
+        pipeline_dir = Path(tmp) / 'pipeline'
+        copy_workspace(project_root, sequential_dir)
+        copy_workspace(project_root, pipeline_dir)
+
+        sequential_time = timed_run(
+            [[sys.executable, script] for script in SEQUENTIAL_SCRIPTS], sequential_dir)
+        pipeline_time = timed_run(
+            [[sys.executable, Path(__file__).name]], pipeline_dir)
+
+        identical = all(
+            trees_match(sequential_dir / d, pipeline_dir / d)
+            for d in ['app', 'components'] if (sequential_dir / d).exists()
+        )
+
+    log("\n⏱  Wall-clock comparison", Colors.MAGENTA)
+    log(f"   Three scripts in sequence: {sequential_time:.3f}s", Colors.BLUE)
+    log(f"   Single-pass pipeline:      {pipeline_time:.3f}s", Colors.BLUE)
+    if pipeline_time > 0:
+        log(f"   Speed-up: {sequential_time / pipeline_time:.2f}x", Colors.GREEN)
+    if identical:
+        log("   Output identical to the sequential run", Colors.GREEN)
+    else:
+        log("   ❌ Output differs from the sequential run", Colors.RED)
+
+
+def main():
+    """Main execution"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--compare', action='store_true',
+                        help='time the pipeline against the three scripts on a scratch copy')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='number of worker processes, 0 for one per CPU (default: 1)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='process every file, ignoring the incremental cache')
+    parser.add_argument('--schema-diff', action='store_true',
+                        help='when types.ts changed, only process files using the changed tables')
+    check.add_arguments(parser)
+    output.add_arguments(parser)
+    add_arguments(parser)
+    args = parser.parse_args()
+    output.configure(args.fsync)
+    set_rule_budget(args.rule_budget)
+
+    project_root = Path.cwd()
+
+    if args.compare:
+        compare(project_root)
+        return
+
+    log("🚀 TypeScript Fixer Pipeline", Colors.MAGENTA)
+    log("=" * 70, Colors.MAGENTA)
+
+    start = time.perf_counter()
+    stages = build_registry()
+    schema = load_schema(project_root)
+    images = load_images(project_root, args.jobs)
+    cache = FileCache(project_root, 'pipeline',
+                      registry_fingerprints(stages) if not args.no_cache else {},
+                      enabled=not args.no_cache,
+                      inputs={'schema': schema.digest, 'images': images.digest,
+                              'derivatives': load_manifest(project_root).digest})
+    if args.check:
+        sys.exit(check.run_check(project_root, find_files(project_root, stages), None, args,
+                                 cache))
+    if args.schema_diff and cache.enabled:
+        log("\n🧬 Schema diff:", Colors.MAGENTA)
+        limit_to_schema_changes(project_root, find_files(project_root, stages), cache, schema)
+    profiler = None
+    if args.profile:
+        profiler = FileProfiler(args.profile, project_root / CACHE_DIR / 'profiles' / 'pipeline')
+    with quiet(args.quiet):
+        total, modified_count, cached_count = run(project_root, stages, args.jobs, cache,
+                                                  profiler)
+    elapsed = time.perf_counter() - start
+
+    log("\n" + "=" * 70, Colors.MAGENTA)
+    log("📊 Summary:", Colors.MAGENTA)
+    log(f"   Total files scanned: {total}", Colors.BLUE)
+    log(f"   Files modified: {modified_count}", Colors.GREEN)
+    log(f"   Files unchanged: {total - modified_count}", Colors.YELLOW)
+    log(f"   Skipped (cached): {cached_count}", Colors.YELLOW)
+    log(f"   Wall-clock time: {elapsed:.3f}s", Colors.BLUE)
+    log("\n🔎 Files run / skipped per rule:", Colors.MAGENTA)
+    report_gate_counts()
+    log("\n⏱  Per-rule counters:", Colors.MAGENTA)
+    report_rule_stats()
+    if profiler is not None:
+        log(f"\n🐢 Slowest {args.profile} files (cProfile output):", Colors.MAGENTA)
+        profiler.report()
+    if args.report:
+        write_report(args.report, script='pipeline', files=total,
+                     processed=total - cached_count, modified=modified_count,
+                     seconds=elapsed)
+    log("\n✨ Done! Now run: npm run build", Colors.GREEN)
+    log("=" * 70, Colors.MAGENTA)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,32 +4,53 @@ Script to update TypeScript files to use Supabase generated types.
 Adds import statement and replaces custom type definitions with Tables<"tablename">.
 """
 
+import argparse
 import os
-import re
+import sys
+import time
 from pathlib import Path
 
+from codemod import check, output
+from codemod.cache import CACHE_DIR, FileCache, read_source
+from codemod.console import quiet
+from codemod.declarations import scan_declarations
+from codemod.edits import EditBuffer
+from codemod.imports import import_index
+from codemod.instrument import (FileProfiler, add_arguments, report_rule_stats, run_rule,
+                                set_rule_budget, write_report)
+from codemod.lexer import search_code, sub_code
+from codemod.output import write_source
+from codemod.pipeline import FileResult
+from codemod.rules import script_stage
+from codemod.schema import load_schema
+from codemod.walk import walk_files
+
+# Tables, columns and type names parsed from integrations/supabase/types.ts
+SCHEMA = load_schema()
+
 # Mapping of type/interface names to their corresponding Supabase table names
-TYPE_MAPPINGS = {
-    'Enquiry': 'enquiries',
-    'Experience': 'experiences',
-    'Journey': 'journeys',
-    'MealPlan': 'meal_plans',
-    'DiningSchedule': 'dining_schedule',
-    'Package': 'packages',
-    'Activity': 'resort_activities',
-    'GalleryItem': 'resort_gallery',
-    'ResortPackage': 'resort_packages',
-}
+TYPE_MAPPINGS = SCHEMA.tables_by_type
+
+# Fields that are boolean | null in Supabase types
+NULLABLE_BOOLEAN_FIELDS = SCHEMA.nullable_columns('boolean')
 
 # Types that should remain as custom interfaces (no direct table mapping)
 SKIP_TYPES = {'AdminUser', 'PendingUser'}
 
+# Literals each fix cannot act without (used by the single-pass pipeline to
+# skip fixes on files that lack all of them)
+RULE_ANCHORS = {
+    'add_import_after_react': ('import ',),
+    'replace_type_definitions': tuple(TYPE_MAPPINGS),
+    'add_null_coalescing_for_booleans': tuple(NULLABLE_BOOLEAN_FIELDS),
+}
+
 IMPORT_STATEMENT = 'import type { Tables } from "@/integrations/supabase/types";'
 
 
 def has_supabase_import(content: str) -> bool:
     """Check if file already has Supabase types import."""
-    return 'from "@/integrations/supabase/types"' in content
+    return import_index(content).imports_from('@/integrations/supabase/types')
 
 
 def add_import_after_react(content: str) -> str:
@@ -37,93 +58,106 @@ def add_import_after_react(content: str) -> str:
     if has_supabase_import(content):
         return content
     
-    # Find the last import statement
-    lines = content.split('\n')
-    last_import_idx = -1
-    
-    for idx, line in enumerate(lines):
-        if line.strip().startswith('import '):
-            last_import_idx = idx
-    
-    if last_import_idx >= 0:
-        lines.insert(last_import_idx + 1, IMPORT_STATEMENT)
-        return '\n'.join(lines)
-    
-    return content
+    # After the last import statement (multi-line ones included)
+    return import_index(content).add(IMPORT_STATEMENT, at='last')
 
 
 def replace_type_definitions(content: str) -> str:
     """Replace custom type/interface definitions with Supabase Tables types."""
+    declarations = scan_declarations(content)
+    edits = EditBuffer(content)
     
     for type_name, table_name in TYPE_MAPPINGS.items():
-        # Pattern for type definitions (type TypeName = {...})
-        type_pattern = rf'type\s+{type_name}\s*=\s*\{{[^}}]*\}}'
-        if re.search(type_pattern, content, re.DOTALL):
-            replacement = f'type {type_name} = Tables<"{table_name}">'
-            content = re.sub(type_pattern, replacement, content, flags=re.DOTALL)
+        replacement = f'type {type_name} = Tables<"{table_name}">'
+        
+        # Type definitions (type TypeName = {...}), nested braces included
+        found = [d for d in declarations.find(type_name, 'type') if d.is_plain]
+        if found:
+            for declaration in found:
+                edits.replace(declaration.start, declaration.end, replacement)
             print(f"  ✓ Replaced type {type_name} with Tables<\"{table_name}\">")
         
-        # Pattern for interface definitions (interface TypeName {...})
-        interface_pattern = rf'interface\s+{type_name}\s*\{{[^}}]*\}}'
-        if re.search(interface_pattern, content, re.DOTALL):
-            if type_name not in SKIP_TYPES:
-                replacement = f'type {type_name} = Tables<"{table_name}">'
-                content = re.sub(interface_pattern, replacement, content, flags=re.DOTALL)
-                print(f"  ✓ Replaced interface {type_name} with Tables<\"{table_name}\">")
+        # Interface definitions (interface TypeName {...})
+        found = [d for d in declarations.find(type_name, 'interface') if d.is_plain]
+        if found and type_name not in SKIP_TYPES:
+            for declaration in found:
+                edits.replace(declaration.start, declaration.end, replacement)
+            print(f"  ✓ Replaced interface {type_name} with Tables<\"{table_name}\">")
     
-    return content
+    return edits.apply()
 
 
 def add_null_coalescing_for_booleans(content: str) -> str:
     """Add null coalescing operator (?? false) for boolean fields that can be null."""
     
-    # Fields that are boolean | null in Supabase types
-    nullable_boolean_fields = ['featured', 'approved', 'is_read']
-    
-    for field in nullable_boolean_fields:
+    for field in NULLABLE_BOOLEAN_FIELDS:
+        # The pattern cannot match without `.field`, and finding that is far
+        # cheaper than letting the regex try every position
+        if f'.{field}' not in content:
+            continue
+        
         # Pattern: field: object.field
         # Replace with: field: object.field ?? false
-        pattern = rf'(\s+{field}:\s+\w+\.{field})(?!\s*\?\?)'
+        # (the lookbehind anchors the match at the start of the whitespace, so a
+        # long run of it is scanned once instead of once per character)
+        pattern = rf'(?<!\s)(\s+{field}:\s+\w+\.{field})(?!\s*\?\?)'
         replacement = rf'\1 ?? false'
-        if re.search(pattern, content):
-            content = re.sub(pattern, replacement, content)
+        if search_code(pattern, content):
+            content = sub_code(pattern, replacement, content)
             print(f"  ✓ Added null coalescing for {field}")
     
     return content
 
 
-def process_file(file_path: Path) -> bool:
-    """Process a single TypeScript file."""
+# The rules above as the pipeline registers them, for per-rule cache keys
+STAGE = script_stage('fix-types', sys.modules[__name__])
+
+
+def process_file(file_path: Path) -> FileResult:
+    """Process a single TypeScript file.
+    
+    Returns whether it was rewritten, the stamp of the content read and the
+    cache keys of the rules evaluated on it.
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content, stamp = read_source(file_path)
         
         original_content = content
         
         # Add import statement
-        content = add_import_after_react(content)
+        content = run_rule('add_import_after_react', add_import_after_react, content)
         
         # Replace type definitions
-        content = replace_type_definitions(content)
+        content = run_rule('replace_type_definitions', replace_type_definitions, content)
         
         # Add null coalescing for nullable booleans
-        content = add_null_coalescing_for_booleans(content)
+        content = run_rule('add_null_coalescing_for_booleans',
+                           add_null_coalescing_for_booleans, content)
         
         # Only write if changes were made
-        if content != original_content:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            return True
+        if content != original_content and write_source(file_path, content):
+            return True, stamp, []
         
-        return False
+        return False, stamp, STAGE.evaluated_keys(original_content)
     
     except Exception as e:
         print(f"  ✗ Error processing {file_path}: {e}")
-        return False
+        return False, None, []
 
 
 def main():
     """Main function to process all TypeScript files in components folder."""
+    parser = argparse.ArgumentParser(description="Update components to use Supabase generated types.")
+    parser.add_argument('--no-cache', action='store_true',
+                        help='process every file, ignoring the incremental cache')
+    check.add_arguments(parser)
+    output.add_arguments(parser)
+    add_arguments(parser)
+    args = parser.parse_args()
+    output.configure(args.fsync)
+    set_rule_budget(args.rule_budget)
+    start = time.perf_counter()
+    
     # Get components folder path (adjust as needed)
     components_dir = Path('./components')
     
@@ -133,29 +167,60 @@ def main():
         return
     
     # Find all .tsx and .ts files
-    ts_files = list(components_dir.rglob('*.tsx')) + list(components_dir.rglob('*.ts'))
+    ts_files = list(walk_files(components_dir))
     
     if not ts_files:
         print(f"No TypeScript files found in {components_dir}")
         return
     
     print(f"Found {len(ts_files)} TypeScript files in {components_dir}")
+    
+    cache = FileCache.for_script(Path.cwd(), STAGE, inputs={'schema': SCHEMA.digest},
+                                 enabled=not args.no_cache)
+    if args.check:
+        sys.exit(check.run_check(Path.cwd(), ts_files, ['fix-types'], args, cache))
+    
+    pending = [f for f in ts_files if not cache.is_fresh(f)]
+    if cache.hits:
+        print(f"Skipping {cache.hits} files unchanged since last run")
     print("-" * 60)
     
-    modified_count = 0
+    profiler = None
+    process = process_file
+    if args.profile:
+        profiler = FileProfiler(args.profile, Path(CACHE_DIR) / 'profiles' / 'fix-types')
+        process = profiler.wrap(process_file)
     
-    for file_path in ts_files:
-        print(f"\nProcessing: {file_path.relative_to(components_dir)}")
-        
-        if process_file(file_path):
-            modified_count += 1
-            print(f"  ✓ File updated successfully")
-        else:
-            print(f"  ○ No changes needed")
+    modified_count = 0
+    written = []
+    
+    with quiet(args.quiet):
+        for file_path in pending:
+            print(f"\nProcessing: {file_path.relative_to(components_dir)}")
+            
+            modified, stamp, evaluated = process(file_path)
+            cache.record_result(file_path, modified, stamp, evaluated)
+            if modified:
+                modified_count += 1
+                written.append(file_path)
+                print(f"  ✓ File updated successfully")
+            else:
+                print(f"  ○ No changes needed")
+    
+    output.sync_files(written)
+    cache.save()
     
     print("\n" + "=" * 60)
     print(f"Summary: Modified {modified_count} out of {len(ts_files)} files")
     print("=" * 60)
+    report_rule_stats()
+    if profiler is not None:
+        print(f"\nSlowest {args.profile} files (cProfile output):")
+        profiler.report()
+    if args.report:
+        write_report(args.report, script='fix-types', files=len(ts_files),
+                     processed=len(pending), modified=modified_count,
+                     seconds=time.perf_counter() - start)
 
 
 if __name__ == '__main__':